@@ -0,0 +1,158 @@
+"""
+Batch uploads: many videos, or zip/tar archives of them, under one batch id.
+
+Each video in a batch becomes an ordinary translation record (status "queued"
+until a worker picks it up), so /translation/{id} and its event streams work
+for single items too. Archives are listed up front, so the batch knows its
+total, and extracted one video at a time as processing slots free up, so a
+large archive never has to be unpacked in full.
+
+Batches are kept in this process, like resumable upload sessions.
+"""
+import os
+import uuid
+import hashlib
+import tarfile
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from fastapi import HTTPException
+import uploads
+from worker_pool import WORKER_COUNT
+
+# Videos of one batch processed at the same time; the rest of the queue stays
+# free for interactive uploads
+BATCH_PARALLELISM = int(os.environ.get("ASL_BATCH_PARALLELISM", WORKER_COUNT))
+
+# Most videos one batch may contain, and total request size
+MAX_BATCH_ITEMS = int(os.environ.get("ASL_MAX_BATCH_ITEMS", 1000))
+MAX_BATCH_BYTES = int(os.environ.get("ASL_MAX_BATCH_BYTES", 5 * 1024 * 1024 * 1024))
+
+# Seconds between attempts to claim a worker slot when the queue is full
+BATCH_RETRY_INTERVAL = float(os.environ.get("ASL_BATCH_RETRY_INTERVAL", 1.0))
+
+# Finished batches remembered for status requests
+MAX_BATCHES = int(os.environ.get("ASL_MAX_BATCHES", 1000))
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+VIDEO_SUFFIXES = (".mp4", ".webm", ".mov", ".avi", ".mkv", ".m4v", ".mpg", ".mpeg")
+
+# batch_id -> batch, oldest first
+batch_sessions = OrderedDict()
+
+
+def is_archive(filename) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def is_video_name(name) -> bool:
+    return name.lower().endswith(VIDEO_SUFFIXES) and not os.path.basename(name).startswith(".")
+
+
+def list_videos(archive_path) -> list:
+    """Names of the video files in a zip or tar archive, in archive order"""
+    try:
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                return [m.filename for m in archive.infolist()
+                        if not m.is_dir() and is_video_name(m.filename)]
+        with tarfile.open(archive_path) as archive:
+            return [m.name for m in archive if m.isfile() and is_video_name(m.name)]
+    except (zipfile.BadZipFile, tarfile.TarError, OSError) as e:
+        raise HTTPException(status_code=400, detail=f"Cannot read archive: {e}")
+
+
+def _copy(source, file_path):
+    """Copy an archive member to file_path; returns its sha256 hex digest"""
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "wb") as f:
+            while True:
+                chunk = source.read(uploads.CHUNK_SIZE)
+                if not chunk:
+                    break
+                # Trust the bytes, not the sizes the archive declares
+                written += len(chunk)
+                if written > uploads.MAX_UPLOAD_BYTES:
+                    raise ValueError(f"Video exceeds the {uploads.MAX_UPLOAD_BYTES} byte upload limit")
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return digest.hexdigest()
+
+
+def extract_videos(archive_path, items):
+    """
+    Generator: extract the archive members named by items (member -> item) in
+    archive order, yielding (item, file_path, video_hash, error) for each.
+    An archive can hold several members with the same name; only the first is
+    extracted, matching the de-duplicated listing the items were made from.
+    Blocking; run each step in a thread.
+    """
+    remaining = dict(items)
+
+    def extract(item, source):
+        file_path = uploads.upload_path(item["translation_id"], item["filename"])
+        try:
+            return item, file_path, _copy(source, file_path), None
+        except Exception as e:
+            return item, None, None, str(e)
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                item = None if member.is_dir() else remaining.pop(member.filename, None)
+                if item is not None:
+                    with archive.open(member) as source:
+                        yield extract(item, source)
+    else:
+        with tarfile.open(archive_path) as archive:
+            for member in archive:
+                item = remaining.pop(member.name, None) if member.isfile() else None
+                if item is not None:
+                    yield extract(item, archive.extractfile(member))
+
+
+def create_batch() -> dict:
+    batch = {
+        "batch_id": str(uuid.uuid4()),
+        "items": [],
+        "created_at": datetime.now(),
+        "finished_at": None,
+    }
+    batch_sessions[batch["batch_id"]] = batch
+    while len(batch_sessions) > MAX_BATCHES:
+        oldest = next(iter(batch_sessions.values()))
+        if oldest["finished_at"] is None:
+            break
+        batch_sessions.popitem(last=False)
+    return batch
+
+
+def add_item(batch: dict, filename: str, member: str = None) -> dict:
+    if len(batch["items"]) >= MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {MAX_BATCH_ITEMS} videos")
+    item = {
+        "translation_id": str(uuid.uuid4()),
+        "filename": os.path.basename(filename) or "video",
+        "member": member,
+    }
+    batch["items"].append(item)
+    return item
+
+
+def get_batch(batch_id: str) -> dict:
+    batch = batch_sessions.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
+def discard_files(paths):
+    for path in paths:
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,157 @@
+"""
+Micro-batching front end for asl_model.predict.
+
+Every 10-frame window from every video and live session is queued here.
+A single thread drains the queue, stacks up to max_batch_size windows into one
+predict call and hands each row of the output back to whoever submitted it.
+
+A window that doesn't fit the model's input shape fails at submit(), and when
+a whole batch fails its windows are retried one by one, so a bad window only
+fails the caller that sent it, not the other jobs it was batched with.
+"""
+import os
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
+import numpy as np
+import metrics
+
+# Largest batch sent to the model, and how long the first window in a batch
+# may wait for others to join it
+MAX_BATCH_SIZE = int(os.environ.get("ASL_MAX_BATCH_SIZE", 32))
+MAX_WAIT_MS = float(os.environ.get("ASL_MAX_WAIT_MS", 5))
+
+
+class BatchPredictor:
+    def __init__(self, model, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+
+        # (frames, features) each window must have; None matches any size
+        input_shape = getattr(model, "input_shape", None)
+        self.window_shape = tuple(input_shape[1:]) if input_shape else None
+
+        # Statistics, updated only by the batching thread
+        self.batches = 0
+        self.windows = 0
+        self.total_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_predict = 0.0
+        self.retried_batches = 0
+        self.failed_windows = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="batch-predictor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, window) -> concurrent.futures.Future:
+        """Queue one (frames, features) window; the future resolves to its prediction row"""
+        future = concurrent.futures.Future()
+        shape = np.shape(window)
+        if self.window_shape is not None and (
+                len(shape) != len(self.window_shape) or
+                any(want is not None and got != want for got, want in zip(shape, self.window_shape))):
+            future.set_exception(ValueError(
+                f"Window shape {shape} doesn't match the model input {self.window_shape}"))
+            return future
+        self._queue.put((window, future, time.perf_counter()))
+        return future
+
+    async def predict(self, windows) -> np.ndarray:
+        """Predict a stack of windows from async code; returns (len(windows), classes)"""
+        if len(windows) == 0:
+            return np.zeros((0, 0))
+        futures = [asyncio.wrap_future(self.submit(w)) for w in windows]
+        return np.stack(await asyncio.gather(*futures))
+
+    def stats(self) -> dict:
+        batches = self.batches or 1
+        windows = self.windows or 1
+        return {
+            "batches": self.batches,
+            "windows": self.windows,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "mean_batch_size": self.windows / batches,
+            "mean_batch_fill": self.windows / (batches * self.max_batch_size),
+            "mean_queue_wait_ms": self.total_wait / windows * 1000.0,
+            "max_queue_wait_ms": self.max_queue_wait * 1000.0,
+            "mean_predict_ms": self.total_predict / batches * 1000.0,
+            "retried_batches": self.retried_batches,
+            "failed_windows": self.failed_windows,
+            "queued": self._queue.qsize(),
+        }
+
+    def _collect(self):
+        """Block for the first window, then gather more until full or out of time"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop on the next loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            try:
+                inputs = np.stack([window for window, _, _ in batch])
+                outputs = self.model.predict(inputs, verbose=0)
+            except Exception as e:
+                if len(batch) == 1:
+                    self.failed_windows += 1
+                    batch[0][1].set_exception(e)
+                    continue
+                # Find the bad window(s) without failing their neighbours
+                self.retried_batches += 1
+                outputs = [self._predict_one(window, future) for window, future, _ in batch]
+            finished = time.perf_counter()
+
+            for row, (_, future, enqueued) in zip(outputs, batch):
+                if row is None:
+                    continue
+                future.set_result(row)
+                wait = started - enqueued
+                self.total_wait += wait
+                self.max_queue_wait = max(self.max_queue_wait, wait)
+
+            self.batches += 1
+            self.windows += len(batch)
+            metrics.BATCH_SIZE.observe(len(batch))
+            self.total_predict += finished - started
+            metrics.STAGE_SECONDS.observe(finished - started, "predict")
+
+    def _predict_one(self, window, future):
+        """Predict a single window; fails only its own future on error"""
+        try:
+            return self.model.predict(np.asarray(window)[np.newaxis], verbose=0)[0]
+        except Exception as e:
+            self.failed_windows += 1
+            future.set_exception(e)
+            return None
@@ -0,0 +1,285 @@
+"""
+Throughput and latency benchmark for the translation pipeline.
+
+Two modes:
+
+  stages - runs each step of process_asl_video in this process on synthetic
+           videos and times it separately: decode, Holistic landmarking,
+           keypoint extraction, asl_model.predict (one window at a time and
+           batched), sentence post-processing and grammar correction.
+
+      python bench_pipeline.py stages --seconds 10 --width 1280 --height 720
+
+  e2e    - uploads synthetic videos to running API servers and measures time
+           from upload to completed translation. Point it at main.py and at
+           the mock main1.py to separate server overhead from model cost.
+
+      python bench_pipeline.py e2e --target real=http://127.0.0.1:8000 \\
+          --target mock=http://127.0.0.1:8001 --videos 20 --concurrency 4
+
+Results are printed as JSON and can be saved with --output.
+"""
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import platform
+import tempfile
+import urllib.request
+import concurrent.futures
+from datetime import datetime
+
+import numpy as np
+import cv2
+
+
+def make_video(path, seconds, width, height, fps=30):
+    """Write a synthetic clip: a torso and two hands moving over a background"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write video {path}")
+    frames = int(seconds * fps)
+    cx, cy = width // 2, height // 2
+    for i in range(frames):
+        image = np.full((height, width, 3), 60, dtype=np.uint8)
+        t = i / fps
+        cv2.rectangle(image, (cx - width // 10, cy - height // 8), (cx + width // 10, cy + height // 2), (90, 120, 200), -1)
+        cv2.circle(image, (cx, cy - height // 4), height // 12, (150, 180, 230), -1)
+        for side in (-1, 1):
+            hx = int(cx + side * width // 6 + np.sin(t * 3 + side) * width // 12)
+            hy = int(cy + np.cos(t * 2 + side) * height // 10)
+            cv2.circle(image, (hx, hy), height // 25, (160, 190, 240), -1)
+        writer.write(image)
+    writer.release()
+    return frames
+
+
+def summarize(values_ms):
+    if not values_ms:
+        return None
+    values = sorted(values_ms)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+    return {
+        "count": len(values),
+        "total_ms": round(sum(values), 3),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def bench_stages(options, video_path):
+    from recognition import WINDOW_SIZE, join_signs
+    from my_functions import image_process, keypoint_extraction, layout_size, create_holistic
+    from preprocess import FramePreprocessor
+    results = {}
+
+    # Decode
+    frames, decode_ms = [], []
+    cap = cv2.VideoCapture(video_path)
+    while True:
+        (ret, image), ms = timed(cap.read)
+        if not ret:
+            break
+        frames.append(image)
+        decode_ms.append(ms)
+    cap.release()
+    results["decode"] = summarize(decode_ms)
+
+    # Holistic landmarking and keypoint extraction
+    keypoints = np.zeros((len(frames), layout_size()), dtype=np.float32)
+    try:
+        preprocess_ms, landmark_ms, extract_ms = [], [], []
+        preprocessor = FramePreprocessor(roi=options.roi)
+        with create_holistic(options.profile) as holistic:
+            for i, image in enumerate(frames):
+                (image, box), ms = timed(preprocessor.prepare, image)
+                preprocess_ms.append(ms)
+                landmarks, ms = timed(image_process, image, holistic)
+                landmark_ms.append(ms)
+                _, ms = timed(keypoint_extraction, landmarks, out=keypoints[i])
+                preprocessor.update(landmarks, keypoints[i], box)
+                extract_ms.append(ms)
+        results["preprocess"] = summarize(preprocess_ms)
+        results["preprocess"].update(preprocessor.stats())
+        results["landmark"] = summarize(landmark_ms)
+        results["keypoint_extraction"] = summarize(extract_ms)
+    except ImportError as e:
+        results["landmark"] = results["keypoint_extraction"] = {"skipped": str(e)}
+
+    # Prediction, one window per call (old path) and batched
+    count = len(keypoints) // WINDOW_SIZE
+    windows = keypoints[:count * WINDOW_SIZE].reshape(count, WINDOW_SIZE, -1)
+    try:
+        import inference
+        model = inference.load_model(options.backend, options.model, options.int8)
+        model.predict(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32), verbose=0)
+        if windows.shape[-1] != model.input_shape[-1]:
+            windows = np.zeros((count,) + tuple(model.input_shape[1:]), dtype=np.float32)
+        single = [timed(model.predict, w[np.newaxis], verbose=0)[1] for w in windows]
+        results["predict_single"] = summarize(single)
+        for size in options.batch_sizes:
+            batched = [timed(model.predict, windows[i:i + size], verbose=0)[1]
+                       for i in range(0, len(windows), size)]
+            summary = summarize(batched)
+            if summary:
+                summary["per_window_ms"] = round(summary["total_ms"] / max(1, len(windows)), 3)
+            results[f"predict_batch_{size}"] = summary
+    except Exception as e:
+        results["predict_single"] = {"skipped": str(e)}
+
+    # Post-processing on a sentence of the length this clip would produce
+    words = ["hello", "my", "name", "a", "b", "c", "thank", "you", "please", "good"]
+    sentence = [random.choice(words) for _ in range(max(1, count // 2))]
+    post_ms = [timed(join_signs, sentence)[1] for _ in range(options.repeat)]
+    results["postprocess"] = summarize(post_ms)
+
+    # Grammar correction, uncached, through the configured backend
+    import grammar
+    backend = grammar.load_backend(options.grammar)
+    raw_text = join_signs(sentence)
+    grammar_ms = [timed(backend.correct_many, [raw_text])[1] for _ in range(options.repeat)]
+    results["grammar"] = summarize(grammar_ms)
+    results["grammar"]["backend"] = backend.name
+
+    return len(frames), results
+
+
+def run_stages(options):
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(options.videos):
+            path = os.path.join(tmp, f"bench_{i}.mp4")
+            make_video(path, options.seconds, options.width, options.height, options.fps)
+            started = time.perf_counter()
+            frames, stages = bench_stages(options, path)
+            elapsed = time.perf_counter() - started
+            runs.append({"frames": frames, "elapsed_s": round(elapsed, 3), "stages": stages})
+    return {"mode": "stages", "runs": runs}
+
+
+def upload(base_url, path):
+    """POST a video to /upload as multipart/form-data; returns the translation id"""
+    boundary = uuid.uuid4().hex
+    with open(path, "rb") as f:
+        data = f.read()
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(path)}"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(
+        base_url.rstrip("/") + "/upload", data=body, method="POST",
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["translation_id"]
+
+
+def wait_for(base_url, translation_id, timeout, interval=0.1):
+    deadline = time.perf_counter() + timeout
+    url = base_url.rstrip("/") + f"/translation/{translation_id}"
+    while time.perf_counter() < deadline:
+        with urllib.request.urlopen(url) as response:
+            record = json.loads(response.read())
+        if record["status"] in ("completed", "failed"):
+            return record
+        time.sleep(interval)
+    return {"status": "timeout"}
+
+
+def one_job(base_url, path, timeout):
+    started = time.perf_counter()
+    try:
+        translation_id = upload(base_url, path)
+        uploaded = time.perf_counter()
+        record = wait_for(base_url, translation_id, timeout)
+    except Exception as e:
+        return {"status": "error", "error": repr(e)}
+    finished = time.perf_counter()
+    return {
+        "status": record["status"],
+        "upload_ms": (uploaded - started) * 1000,
+        "total_ms": (finished - started) * 1000,
+    }
+
+
+def run_e2e(options):
+    targets = dict(t.split("=", 1) if "=" in t else (t, t) for t in options.target)
+    report = {"mode": "e2e", "targets": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.mp4")
+        frames = make_video(path, options.seconds, options.width, options.height, options.fps)
+        report["video"] = {"frames": frames, "bytes": os.path.getsize(path)}
+
+        for name, base_url in targets.items():
+            started = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(options.concurrency) as pool:
+                jobs = list(pool.map(lambda _: one_job(base_url, path, options.timeout),
+                                     range(options.videos)))
+            elapsed = time.perf_counter() - started
+            statuses = {}
+            for job in jobs:
+                statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+            report["targets"][name] = {
+                "url": base_url,
+                "elapsed_s": round(elapsed, 3),
+                "videos_per_sec": round(len(jobs) / elapsed, 3),
+                "frames_per_sec": round(len(jobs) * frames / elapsed, 1),
+                "statuses": statuses,
+                "upload": summarize([j["upload_ms"] for j in jobs if "upload_ms" in j]),
+                "latency": summarize([j["total_ms"] for j in jobs if "total_ms" in j]),
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ASL translation pipeline")
+    parser.add_argument("mode", choices=("stages", "e2e"))
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of each synthetic video")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--videos", type=int, default=3, help="videos to process")
+    parser.add_argument("--backend", default="keras", help="[stages] keras, tflite or onnx")
+    parser.add_argument("--model", help="[stages] model file (default: the backend's export path)")
+    parser.add_argument("--int8", action="store_true", help="[stages] use the int8-quantized export")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32], help="[stages] predict batch sizes")
+    parser.add_argument("--profile", default="balanced", help="[stages] Holistic profile")
+    parser.add_argument("--roi", action="store_true", help="[stages] crop to the tracked signer")
+    parser.add_argument("--grammar", default="rules", help="[stages] grammar backend to time")
+    parser.add_argument("--repeat", type=int, default=20, help="[stages] repetitions for fast stages")
+    parser.add_argument("--target", action="append", default=[], help="[e2e] name=base_url, repeatable")
+    parser.add_argument("--concurrency", type=int, default=4, help="[e2e] uploads in flight")
+    parser.add_argument("--timeout", type=float, default=300.0, help="[e2e] seconds to wait per video")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    options = parser.parse_args()
+
+    if options.mode == "e2e" and not options.target:
+        parser.error("e2e needs at least one --target")
+
+    results = run_stages(options) if options.mode == "stages" else run_e2e(options)
+    results["timestamp"] = datetime.now().isoformat()
+    results["host"] = platform.node()
+    results["config"] = {k: v for k, v in vars(options).items() if k != "output"}
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+In-process publish/subscribe for translation status and progress.
+
+process_asl_video publishes "status" events when a record changes and
+"progress" events while a video is being processed; the SSE and WebSocket
+endpoints turn them into a push stream so clients don't have to poll.
+"""
+import os
+import asyncio
+
+# Events buffered per subscriber; a slow client loses the oldest ones
+SUBSCRIBER_QUEUE_SIZE = int(os.environ.get("ASL_EVENT_QUEUE_SIZE", 64))
+
+# Seconds between progress events for one job
+PROGRESS_INTERVAL = float(os.environ.get("ASL_PROGRESS_INTERVAL", 0.25))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class JobEvents:
+    def __init__(self):
+        # translation_id -> set of subscriber queues
+        self._subscribers = {}
+        # translation_id -> last progress event, for clients that join late
+        self._progress = {}
+
+    def subscribe(self, translation_id) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(translation_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, translation_id, queue):
+        queues = self._subscribers.get(translation_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[translation_id]
+
+    def publish(self, translation_id, event: dict):
+        if event.get("type") == "progress":
+            self._progress[translation_id] = event
+        elif event.get("status") in TERMINAL_STATUSES:
+            self._progress.pop(translation_id, None)
+
+        for queue in self._subscribers.get(translation_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def latest_progress(self, translation_id):
+        return self._progress.get(translation_id)
+
+
+def status_event(translation_id, record) -> dict:
+    return {
+        "type": "status",
+        "translation_id": translation_id,
+        "status": record["status"],
+        "translated_text": record.get("translated_text"),
+        "confidence": record.get("confidence"),
+        "processed_at": record.get("processed_at"),
+        "error": record.get("error"),
+    }
@@ -0,0 +1,225 @@
+"""
+Export the Keras sign classifier for the faster runtimes in inference.py and
+check that the exports still agree with it.
+
+    # float32 and int8 TFLite, float32 and int8 ONNX
+    python export_model.py export --format tflite onnx --int8
+
+    # accuracy against the labels in data/, and agreement with Keras
+    python export_model.py check --backend keras tflite onnx --int8
+
+The validation set uses the training layout: data/<action>/<sequence>/,
+each sequence either a folder of <frame>.npy files or a single (frames,
+features) .npy file. Labels come from os.listdir(data), the same order the
+API uses for `actions`. Every WINDOW_SIZE-frame window of a sequence is one
+sample. `check` always runs the Keras model first as the reference, and exits
+non-zero if it can't be loaded or an export's top-1 agreement with it falls
+below --min-agreement.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+import inference
+from recognition import WINDOW_SIZE
+
+DATA_PATH = os.path.join('data')
+
+
+def load_sequence(path):
+    if os.path.isdir(path):
+        frames = sorted((f for f in os.listdir(path) if f.endswith(".npy")),
+                        key=lambda f: int(os.path.splitext(f)[0]))
+        return np.stack([np.load(os.path.join(path, f)) for f in frames]) if frames else None
+    if path.endswith(".npy"):
+        return np.load(path)
+    return None
+
+
+def load_windows(data_path=DATA_PATH, window_size=WINDOW_SIZE, limit=None):
+    """Returns (windows, labels, actions) from a data/<action>/<sequence> tree"""
+    actions = np.array(os.listdir(data_path))
+    windows, labels = [], []
+    for label, action in enumerate(actions):
+        action_dir = os.path.join(data_path, action)
+        if not os.path.isdir(action_dir):
+            continue
+        for name in sorted(os.listdir(action_dir)):
+            sequence = load_sequence(os.path.join(action_dir, name))
+            if sequence is None:
+                continue
+            for start in range(0, len(sequence) - window_size + 1, window_size):
+                windows.append(sequence[start:start + window_size])
+                labels.append(label)
+    if not windows:
+        raise SystemExit(f"No sequences found under '{data_path}'")
+    windows = np.asarray(windows, dtype=np.float32)
+    labels = np.asarray(labels)
+    if limit and len(windows) > limit:
+        keep = np.random.default_rng(0).choice(len(windows), limit, replace=False)
+        windows, labels = windows[keep], labels[keep]
+    return windows, labels, actions
+
+
+def export_tflite(model, path, int8, calibration):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if int8:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if calibration is not None:
+            # Calibrate activation ranges on real windows for full int8
+            converter.representative_dataset = lambda: ([w[np.newaxis]] for w in calibration)
+    try:
+        data = converter.convert()
+    except Exception as e:
+        # Recurrent layers some TF versions can't lower to builtin ops
+        print(f"Builtin-only conversion failed ({e}), retrying with TF ops enabled")
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS
+        ]
+        converter._experimental_lower_tensor_list_ops = False
+        data = converter.convert()
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def export_onnx(model, path, int8):
+    import tensorflow as tf
+    import tf2onnx
+    spec = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="keypoints")]
+    float_path = path if not int8 else path.replace(".int8", "")
+    if not int8 or not os.path.exists(float_path):
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=float_path)
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(float_path, path, weight_type=QuantType.QInt8)
+
+
+def export(options):
+    from tensorflow.keras.models import load_model
+    model = load_model(options.model)
+
+    calibration = None
+    if options.int8 and "tflite" in options.format:
+        try:
+            calibration, _, _ = load_windows(options.data, limit=options.calibration_windows)
+        except SystemExit as e:
+            print(f"{e}; int8 TFLite will quantize weights only")
+
+    for fmt in options.format:
+        variants = [False, True] if options.int8 else [False]
+        for int8 in variants:
+            path = inference.export_path(fmt, int8, options.model)
+            started = time.perf_counter()
+            if fmt == "tflite":
+                export_tflite(model, path, int8, calibration)
+            else:
+                export_onnx(model, path, int8)
+            print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KB) "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+
+def evaluate(model, windows, batch_size):
+    outputs, elapsed = [], 0.0
+    for start in range(0, len(windows), batch_size):
+        batch = windows[start:start + batch_size]
+        started = time.perf_counter()
+        outputs.append(np.asarray(model.predict(batch, verbose=0)))
+        elapsed += time.perf_counter() - started
+    return np.concatenate(outputs), elapsed
+
+
+def check(options):
+    windows, labels, actions = load_windows(options.data, limit=options.limit)
+    print(f"{len(windows)} windows across {len(actions)} actions")
+
+    # Keras always runs first, whatever the order of --backend, since every
+    # export is compared against it
+    candidates = [("keras", False)]
+    for backend in options.backend:
+        if backend == "keras":
+            continue
+        candidates.append((backend, False))
+        if options.int8:
+            candidates.append((backend, True))
+
+    report, reference = {}, None
+    failed = False
+    for backend, int8 in candidates:
+        name = backend + ("-int8" if int8 else "")
+        path = inference.export_path(backend, int8, options.model)
+        try:
+            model = inference.load_model(backend, path, int8)
+        except Exception as e:
+            report[name] = {"skipped": str(e)}
+            if backend == "keras" and len(candidates) > 1:
+                # Nothing to compare the exports with
+                failed = True
+                break
+            continue
+
+        # Warm up once so tracing/allocation isn't counted
+        model.predict(windows[:options.batch_size], verbose=0)
+        probs, elapsed = evaluate(model, windows, options.batch_size)
+        predicted = probs.argmax(axis=1)
+        result = {
+            "path": path,
+            "accuracy": round(float((predicted == labels).mean()), 4),
+            "ms_per_window": round(elapsed / len(windows) * 1000, 4),
+        }
+        if backend == "keras":
+            reference = probs
+        else:
+            agreement = float((predicted == reference.argmax(axis=1)).mean())
+            result["agreement_with_keras"] = round(agreement, 4)
+            result["max_abs_diff"] = round(float(np.abs(probs - reference).max()), 5)
+            if agreement < options.min_agreement:
+                failed = True
+        report[name] = result
+
+    print(json.dumps(report, indent=2))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if failed:
+        if reference is None:
+            print("The Keras reference model could not be loaded, so no export was checked")
+        else:
+            print(f"An export agrees with Keras on fewer than {options.min_agreement:.1%} of windows")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the ASL model and check exports for parity")
+    parser.add_argument("--model", default=inference.MODEL_PATH, help="Keras SavedModel path")
+    parser.add_argument("--data", default=DATA_PATH, help="data/<action>/<sequence> validation tree")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write TFLite/ONNX exports next to the model")
+    export_parser.add_argument("--format", nargs="+", choices=("tflite", "onnx"), default=["tflite"])
+    export_parser.add_argument("--int8", action="store_true", help="also write int8-quantized exports")
+    export_parser.add_argument("--calibration-windows", type=int, default=500,
+                               help="windows from --data used to calibrate int8 TFLite")
+
+    check_parser = commands.add_parser("check", help="compare backends on the validation set")
+    check_parser.add_argument("--backend", nargs="+", choices=tuple(inference.BACKENDS),
+                              default=["keras", "tflite", "onnx"])
+    check_parser.add_argument("--int8", action="store_true", help="also check int8 exports")
+    check_parser.add_argument("--batch-size", type=int, default=32)
+    check_parser.add_argument("--limit", type=int, help="sample at most this many windows")
+    check_parser.add_argument("--min-agreement", type=float, default=0.99,
+                              help="lowest top-1 agreement with Keras an export may have")
+    check_parser.add_argument("--output", help="write the report as JSON to this file")
+
+    options = parser.parse_args()
+    if options.command == "export":
+        export(options)
+    else:
+        check(options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Grammar correction for finished sign sentences.
+
+Backends are pluggable (ASL_GRAMMAR_BACKEND):
+    local  - LanguageTool running on this machine
+    public - the public LanguageTool HTTP API
+    rules  - a small rule-based corrector with no dependencies
+    none   - return the raw sentence unchanged
+
+"local" only works offline once it is installed: it needs the
+language_tool_python package, Java 8+ on PATH, and the LanguageTool server,
+which language_tool_python downloads to $LTP_PATH (default
+~/.cache/language_tool_python) on first use. Fetch it once on a machine with
+network access, e.g.
+    python -c "import language_tool_python as l; l.LanguageTool('en-GB').close()"
+or set ASL_GRAMMAR_DOWNLOAD=1 to let the API download it at startup. If any
+of these is missing, the rule-based corrector is used and the reason is
+logged and shown in /stats.
+
+GrammarCorrector sits in front of the backend with an LRU cache keyed on the
+raw sentence, batches sentences from concurrent jobs into one backend call,
+and gives up after a hard timeout, returning the raw text instead. Backend
+calls run on their own GRAMMAR_THREADS threads, so a hung call can't tie up
+the event loop's default executor; while every thread is busy, sentences
+are returned uncorrected instead of queueing.
+"""
+import os
+import re
+import shutil
+import asyncio
+import concurrent.futures
+from collections import OrderedDict
+
+GRAMMAR_BACKEND = os.environ.get("ASL_GRAMMAR_BACKEND", "local")
+GRAMMAR_LANGUAGE = os.environ.get("ASL_GRAMMAR_LANGUAGE", "en-GB")
+
+# Sentences remembered, how long to wait for others to share a call,
+# and the longest a correction may take before the raw text is used
+GRAMMAR_CACHE_SIZE = int(os.environ.get("ASL_GRAMMAR_CACHE_SIZE", 1024))
+GRAMMAR_BATCH_WAIT_MS = float(os.environ.get("ASL_GRAMMAR_BATCH_WAIT_MS", 20))
+GRAMMAR_TIMEOUT = float(os.environ.get("ASL_GRAMMAR_TIMEOUT", 2.0))
+GRAMMAR_THREADS = int(os.environ.get("ASL_GRAMMAR_THREADS", 2))
+
+# Let language_tool_python download the LanguageTool server if it's missing
+GRAMMAR_DOWNLOAD = os.environ.get("ASL_GRAMMAR_DOWNLOAD", "0") == "1"
+
+# Sign sentences never contain blank lines, so they can be sent as paragraphs
+_SEPARATOR = "\n\n"
+
+
+class GrammarBackend:
+    name = "none"
+    # Why the configured backend wasn't used, if it wasn't
+    fallback_reason = None
+
+    def correct_many(self, texts: list) -> list:
+        return list(texts)
+
+
+class RuleBasedBackend(GrammarBackend):
+    """Fixes spacing, capitalization and final punctuation"""
+    name = "rules"
+
+    def correct(self, text: str) -> str:
+        text = re.sub(r"\s+", " ", text).strip()
+        if not text:
+            return text
+        text = re.sub(r"\bi\b", "I", text)
+        text = text[0].upper() + text[1:]
+        if text[-1] not in ".!?":
+            text += "."
+        return text
+
+    def correct_many(self, texts: list) -> list:
+        return [self.correct(text) for text in texts]
+
+
+class LanguageToolBackend(GrammarBackend):
+    """Runs a batch as one LanguageTool request, one paragraph per sentence"""
+
+    def __init__(self, tool, name):
+        self.tool = tool
+        self.name = name
+
+    def correct_many(self, texts: list) -> list:
+        corrected = self.tool.correct(_SEPARATOR.join(texts)).split(_SEPARATOR)
+        if len(corrected) != len(texts):
+            # A correction merged or split paragraphs; do them one at a time
+            corrected = [self.tool.correct(text) for text in texts]
+        return corrected
+
+
+def languagetool_path() -> str:
+    """Where language_tool_python keeps the LanguageTool server"""
+    return os.environ.get("LTP_PATH") or os.path.join(os.path.expanduser("~"), ".cache", "language_tool_python")
+
+
+def missing_local_requirements(download=GRAMMAR_DOWNLOAD) -> list:
+    """What the local backend needs but this machine doesn't have"""
+    missing = []
+    try:
+        import language_tool_python  # noqa: F401
+    except ImportError:
+        missing.append("the language_tool_python package")
+    if shutil.which("java") is None:
+        missing.append("Java 8+ on PATH")
+    path = languagetool_path()
+    installed = os.path.isdir(path) and any(n.startswith("LanguageTool") for n in os.listdir(path))
+    if not installed and not download:
+        missing.append(f"the LanguageTool server in {path} (or ASL_GRAMMAR_DOWNLOAD=1)")
+    return missing
+
+
+def load_backend(name=GRAMMAR_BACKEND, language=GRAMMAR_LANGUAGE) -> GrammarBackend:
+    """Create the configured backend, falling back to rules if it can't start"""
+    if name == "none":
+        return GrammarBackend()
+    if name == "rules":
+        return RuleBasedBackend()
+    try:
+        if name == "local":
+            missing = missing_local_requirements()
+            if missing:
+                raise RuntimeError("missing " + ", ".join(missing))
+        import language_tool_python
+        if name == "public":
+            return LanguageToolBackend(language_tool_python.LanguageToolPublicAPI(language), "public")
+        return LanguageToolBackend(language_tool_python.LanguageTool(language), "local")
+    except Exception as e:
+        print(f"WARNING: grammar backend '{name}' unavailable ({e}); using rule-based correction")
+        backend = RuleBasedBackend()
+        backend.fallback_reason = f"{name}: {e}"
+        return backend
+
+
+class GrammarCorrector:
+    def __init__(self, backend, cache_size=GRAMMAR_CACHE_SIZE,
+                 batch_wait_ms=GRAMMAR_BATCH_WAIT_MS, timeout=GRAMMAR_TIMEOUT, threads=GRAMMAR_THREADS):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.timeout = timeout
+        self.threads = threads
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads, thread_name_prefix="grammar")
+        # Backend calls still running, including ones we stopped waiting for
+        self._running = 0
+
+        self._cache = OrderedDict()
+        # raw text -> future shared by every job waiting on that sentence
+        self._pending = {}
+        self._flush_task = None
+
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+
+    async def correct(self, raw_text: str) -> str:
+        if not raw_text:
+            return raw_text
+
+        if raw_text in self._cache:
+            self._cache.move_to_end(raw_text)
+            self.hits += 1
+            return self._cache[raw_text]
+        self.misses += 1
+
+        future = self._pending.get(raw_text)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[raw_text] = future
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+        # Shielded so one cancelled job doesn't cancel the shared result
+        return await asyncio.shield(future)
+
+    async def _flush(self):
+        """Wait briefly for more sentences, then correct them all in one call"""
+        await asyncio.sleep(self.batch_wait)
+        batch, self._pending = self._pending, {}
+        self._flush_task = None
+        texts = list(batch)
+
+        if self._running >= self.threads:
+            # Earlier calls are hung; don't queue more work behind them
+            self.skipped += 1
+            for raw_text in texts:
+                if not batch[raw_text].done():
+                    batch[raw_text].set_result(raw_text)
+            return
+
+        self._running += 1
+        call = self._executor.submit(self.backend.correct_many, texts)
+        loop = asyncio.get_running_loop()
+        # Done callbacks run on the grammar thread; count the call finished on ours
+        call.add_done_callback(lambda _: loop.call_soon_threadsafe(self._call_done))
+        try:
+            corrected = await asyncio.wait_for(asyncio.wrap_future(call), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            corrected = texts
+        except Exception as e:
+            print(f"Grammar correction failed: {e}")
+            self.errors += 1
+            corrected = texts
+        else:
+            for raw_text, text in zip(texts, corrected):
+                self._remember(raw_text, text)
+
+        for raw_text, text in zip(texts, corrected):
+            if not batch[raw_text].done():
+                batch[raw_text].set_result(text)
+
+    def _call_done(self):
+        self._running -= 1
+
+    def _remember(self, raw_text, text):
+        self._cache[raw_text] = text
+        self._cache.move_to_end(raw_text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "cache_entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "skipped_busy": self.skipped,
+            "fallback_reason": self.backend.fallback_reason,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
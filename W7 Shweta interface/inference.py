@@ -0,0 +1,135 @@
+"""
+Runtimes for the sign classifier.
+
+The API only needs `input_shape` and `predict(batch, verbose=0)`, so the same
+network can run through any of (ASL_MODEL_BACKEND):
+    keras   - the SavedModel in MODEL_PATH through TensorFlow (default)
+    tflite  - a .tflite export, run by tflite_runtime or tf.lite
+    onnx    - a .onnx export, run by ONNX Runtime on CPU
+
+Exports are made with export_model.py, which also checks that they agree with
+the Keras model. ASL_MODEL_INT8=1 picks the int8-quantized export, and
+ASL_MODEL_FILE overrides the file altogether.
+"""
+import os
+import numpy as np
+
+MODEL_PATH = 'my_model'
+MODEL_BACKEND = os.environ.get("ASL_MODEL_BACKEND", "keras")
+MODEL_INT8 = os.environ.get("ASL_MODEL_INT8", "0") == "1"
+MODEL_FILE = os.environ.get("ASL_MODEL_FILE")
+
+# Threads each runtime may use for one predict call; 0 lets it decide
+MODEL_THREADS = int(os.environ.get("ASL_MODEL_THREADS", 0))
+
+EXTENSIONS = {"tflite": ".tflite", "onnx": ".onnx"}
+
+
+def export_path(backend, int8=False, base=MODEL_PATH) -> str:
+    """Where export_model.py writes, and the backends look for, an export"""
+    if backend == "keras":
+        return base
+    return base + (".int8" if int8 else "") + EXTENSIONS[backend]
+
+
+class KerasModel:
+    name = "keras"
+
+    def __init__(self, path):
+        from tensorflow.keras.models import load_model
+        self.model = load_model(path)
+        self.input_shape = tuple(self.model.input_shape)
+
+    def predict(self, batch, verbose=0):
+        return self.model.predict(batch, verbose=verbose)
+
+
+class TFLiteModel:
+    """
+    TFLite interpreters with fixed batch sizes. Each batch is zero-padded up
+    to the next power of two, and each of those sizes has its own interpreter,
+    allocated on first use, so BatchPredictor's varying batch sizes never
+    reallocate tensors on the hot path. Not thread safe; the API only calls
+    it from the batching thread.
+    """
+    name = "tflite"
+
+    def __init__(self, path):
+        self._model_file = path
+        # batch size -> (interpreter, input details, output details)
+        self._interpreters = {}
+        interpreter, model_input, model_output = self._create(None)
+        self.input_shape = (None,) + tuple(int(d) for d in model_input["shape"][1:])
+        self._interpreters[int(model_input["shape"][0])] = (interpreter, model_input, model_output)
+
+    def _create(self, batch_size):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        interpreter = Interpreter(model_path=self._model_file, num_threads=MODEL_THREADS or None)
+        if batch_size is not None:
+            model_input = interpreter.get_input_details()[0]
+            interpreter.resize_tensor_input(model_input["index"], (batch_size,) + self.input_shape[1:])
+        interpreter.allocate_tensors()
+        return interpreter, interpreter.get_input_details()[0], interpreter.get_output_details()[0]
+
+    def predict(self, batch, verbose=0):
+        batch = np.asarray(batch, dtype=np.float32)
+        count = len(batch)
+        size = 1 << max(0, count - 1).bit_length()
+        if size != count:
+            padded = np.zeros((size,) + batch.shape[1:], dtype=np.float32)
+            padded[:count] = batch
+            batch = padded
+        entry = self._interpreters.get(size)
+        if entry is None:
+            entry = self._interpreters[size] = self._create(size)
+        interpreter, model_input, model_output = entry
+
+        # Fully quantized exports take and return int8 tensors
+        scale, zero_point = model_input["quantization"]
+        if model_input["dtype"] != np.float32 and scale:
+            batch = np.round(batch / scale + zero_point).astype(model_input["dtype"])
+        interpreter.set_tensor(model_input["index"], batch)
+        interpreter.invoke()
+
+        output = interpreter.get_tensor(model_output["index"])[:count]
+        scale, zero_point = model_output["quantization"]
+        if model_output["dtype"] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxModel:
+    name = "onnx"
+
+    def __init__(self, path):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if MODEL_THREADS:
+            options.intra_op_num_threads = MODEL_THREADS
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        # Symbolic dimensions (the batch) come back as strings
+        self.input_shape = tuple(d if isinstance(d, int) else None for d in model_input.shape)
+
+    def predict(self, batch, verbose=0):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self.session.run(None, {self._input_name: batch})[0]
+
+
+BACKENDS = {"keras": KerasModel, "tflite": TFLiteModel, "onnx": OnnxModel}
+
+
+def load_model(backend=MODEL_BACKEND, path=MODEL_FILE, int8=MODEL_INT8):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    path = path or export_path(backend, int8)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {backend} model at '{path}'; create it with export_model.py")
+    model = BACKENDS[backend](path)
+    model.path = path
+    model.int8 = int8
+    return model
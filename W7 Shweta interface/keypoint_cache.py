@@ -0,0 +1,168 @@
+"""
+On-disk cache of extracted keypoint sequences, keyed by a hash of the video.
+
+Each entry is a .npy file that is memory-mapped on read, so a cache hit costs
+almost nothing until the windows are actually predicted. When the cache grows
+past max_bytes the least recently used entries are deleted.
+
+Entries live under a version directory derived from the settings that shape
+the keypoints, so changing them starts a fresh cache instead of returning
+arrays the model can't use.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from my_functions import KEYPOINT_LAYOUT, HOLISTIC_PROFILE, layout_size
+import preprocess
+import pipeline
+
+CACHE_DIR = os.environ.get("ASL_CACHE_DIR", "keypoint_cache")
+
+# Total size of cached .npy files before eviction starts (default 2 GB)
+CACHE_MAX_BYTES = int(os.environ.get("ASL_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+# Bump when the extractor itself changes; settings are covered by cache_version()
+CACHE_FORMAT = "v1"
+
+
+def cache_version(layout=KEYPOINT_LAYOUT, **settings) -> str:
+    """Directory name for keypoints extracted with this layout and these settings"""
+    version = f"{CACHE_FORMAT}-{layout}-{layout_size(layout)}"
+    if settings:
+        blob = json.dumps(settings, sort_keys=True).encode()
+        version += "-" + hashlib.sha256(blob).hexdigest()[:12]
+    return version
+
+
+def extraction_settings() -> dict:
+    """Settings that change the keypoints extracted from a video"""
+    settings = {"profile": HOLISTIC_PROFILE, "max_side": preprocess.MAX_FRAME_SIDE}
+    if preprocess.ROI_TRACKING:
+        settings["roi"] = [preprocess.ROI_MARGIN, preprocess.ROI_MIN_SIZE, preprocess.ROI_REDETECT_FRAMES]
+    if pipeline.FRAME_SKIP:
+        settings["frame_skip"] = [pipeline.TARGET_FPS, pipeline.MOTION_THRESHOLD,
+                                  pipeline.MOTION_WIDTH, pipeline.MAX_REUSED_FRAMES]
+    return settings
+
+
+CACHE_VERSION = cache_version(**extraction_settings())
+
+
+def hash_file(path, chunk_size=1024 * 1024) -> str:
+    """sha256 of a file on disk, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class KeypointCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, version=CACHE_VERSION,
+                 features=None):
+        self.directory = os.path.join(directory, version)
+        self.max_bytes = max_bytes
+        # Feature count every entry must have
+        self.features = features or layout_size()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # digest -> file size, least recently used first
+        self._entries = OrderedDict()
+        self._total = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.npy")
+
+    def _load_index(self):
+        """Rebuild the LRU order from access times of files already on disk"""
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npy") or name.endswith(".tmp.npy"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            found.append((stat.st_mtime, name[:-len(".npy")], stat.st_size))
+        for _, digest, size in sorted(found):
+            self._entries[digest] = size
+            self._total += size
+
+    def get(self, digest):
+        """Memory-mapped keypoints for a video hash, or None"""
+        if not digest:
+            return None
+        with self._lock:
+            known = digest in self._entries
+            if known:
+                self._entries.move_to_end(digest)
+        keypoints = self._load(digest) if known else None
+        with self._lock:
+            if keypoints is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return keypoints
+
+    def _load(self, digest):
+        path = self._path(digest)
+        try:
+            # mtime records recency for the next restart
+            os.utime(path)
+            keypoints = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            self._forget(digest)
+            return None
+        if keypoints.ndim != 2 or keypoints.shape[1] != self.features:
+            # Written under other settings; predicting it would fail the whole batch
+            del keypoints
+            self._forget(digest)
+            self._discard(digest)
+            return None
+        return keypoints
+
+    def put(self, digest, keypoints):
+        """Store a (frames, features) sequence and evict old entries if needed"""
+        if not digest:
+            return
+        path = self._path(digest)
+        tmp_path = os.path.join(self.directory, f"{digest}.{threading.get_ident()}.tmp.npy")
+        np.save(tmp_path, np.asarray(keypoints, dtype=np.float32))
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            self._total += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            evicted = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old)
+
+        for old in evicted:
+            self._discard(old)
+
+    def _discard(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _forget(self, digest):
+        with self._lock:
+            self._total -= self._entries.pop(digest, 0)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
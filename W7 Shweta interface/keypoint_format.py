@@ -0,0 +1,70 @@
+"""
+Wire format for clients that run MediaPipe themselves and send keypoints.
+
+The body is a raw little-endian tensor of shape (frames, features), row-major,
+in the same layout keypoint_extraction produces. Its shape is described by a
+versioned header:
+
+    X-Keypoints-Format: v=1; dtype=float16; frames=120; features=126
+"""
+import os
+import numpy as np
+
+FORMAT_HEADER = "X-Keypoints-Format"
+FORMAT_VERSION = "1"
+
+DTYPES = {
+    "float32": np.dtype('<f4'),
+    "float16": np.dtype('<f2'),
+}
+
+# Longest sequence accepted in one request (20 minutes at 30 fps)
+MAX_FRAMES = int(os.environ.get("ASL_MAX_KEYPOINT_FRAMES", 30 * 60 * 20))
+
+
+def parse_format(header: str) -> dict:
+    """Parse the format header into {"dtype", "frames", "features"}; raises ValueError"""
+    if not header:
+        raise ValueError(f"Missing {FORMAT_HEADER} header")
+
+    fields = {}
+    for part in header.split(";"):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Malformed {FORMAT_HEADER} field: {part.strip()!r}")
+        fields[key.strip().lower()] = value.strip()
+
+    if fields.get("v") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported keypoint format version {fields.get('v')!r}, expected {FORMAT_VERSION}")
+
+    dtype = DTYPES.get(fields.get("dtype", "float32"))
+    if dtype is None:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}")
+
+    try:
+        frames = int(fields["frames"])
+        features = int(fields["features"])
+    except (KeyError, ValueError):
+        raise ValueError("frames and features must be given as integers")
+    if frames <= 0 or features <= 0:
+        raise ValueError("frames and features must be positive")
+    if frames > MAX_FRAMES:
+        raise ValueError(f"At most {MAX_FRAMES} frames per request")
+
+    return {"dtype": dtype, "frames": frames, "features": features}
+
+
+def expected_size(spec: dict) -> int:
+    return spec["frames"] * spec["features"] * spec["dtype"].itemsize
+
+
+def decode_keypoints(body: bytes, spec: dict) -> np.ndarray:
+    """Turn a request body into a float32 (frames, features) array; raises ValueError"""
+    if len(body) != expected_size(spec):
+        raise ValueError(f"Body is {len(body)} bytes, header describes {expected_size(spec)}")
+    keypoints = np.frombuffer(body, dtype=spec["dtype"]).reshape(spec["frames"], spec["features"])
+    if not np.isfinite(keypoints).all():
+        raise ValueError("Keypoints contain NaN or infinite values")
+    return keypoints.astype(np.float32)
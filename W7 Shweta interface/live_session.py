@@ -0,0 +1,62 @@
+"""
+State for one live translation WebSocket.
+
+Each connection owns a Holistic instance (MediaPipe tracking is stateful, so it
+can't be shared between signers) and a single thread that runs it in frame
+order. Keypoints go into a SignRecognizer, whose windows share the same
+BatchPredictor as uploaded videos.
+"""
+import os
+import asyncio
+import concurrent.futures
+import numpy as np
+from recognition import SignRecognizer
+from my_functions import image_process, keypoint_extraction, layout_size, create_holistic
+from preprocess import FramePreprocessor
+
+# Most live connections one API process will serve at a time
+MAX_LIVE_SESSIONS = int(os.environ.get("ASL_MAX_LIVE_SESSIONS", 8))
+
+# Frames allowed to wait for landmarking; older ones are dropped
+LIVE_FRAME_BACKLOG = int(os.environ.get("ASL_LIVE_FRAME_BACKLOG", 2))
+
+active_sessions = 0
+
+
+class LiveSession:
+    def __init__(self, batcher, actions):
+        self.holistic = create_holistic()
+        self.preprocessor = FramePreprocessor()
+        self.recognizer = SignRecognizer(batcher, actions)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.dropped = 0
+
+        # Reused for every frame; the recognizer copies it into its ring buffer
+        self._row = np.zeros((1, layout_size()), dtype=np.float32)
+
+    def _landmark(self, data: bytes):
+        """Decode one compressed frame and return its keypoints as a (1, features) array"""
+        import cv2
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        image, box = self.preprocessor.prepare(image)
+        results = image_process(image, self.holistic)
+        keypoint_extraction(results, out=self._row[0])
+        self.preprocessor.update(results, self._row[0], box)
+        return self._row
+
+    async def push_frame(self, data: bytes) -> list:
+        """Landmark a frame; returns any signs recognized because of it"""
+        loop = asyncio.get_running_loop()
+        keypoints = await loop.run_in_executor(self.executor, self._landmark, data)
+        if keypoints is None:
+            return []
+        self.recognizer.feed(keypoints)
+        return await self.recognizer.drain()
+
+    def close(self):
+        # Runs after any frame still being landmarked
+        self.executor.submit(self.holistic.close)
+        self.executor.shutdown(wait=False)
@@ -1,12 +1,17 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 import uuid
 import os
-import aiofiles
-from typing import Optional
+import json
+import time
+from typing import List, Optional, Union
 import asyncio
 from datetime import datetime
+from translation_store import open_store
+import uploads
+import batches
 
 app = FastAPI(title="ASL Translation API", version="1.0.0")
 
@@ -33,239 +38,871 @@ class TranslationResult(BaseModel):
     processed_at: Optional[datetime] = None
     error: Optional[str] = None
 
-# In-memory store (use Redis/DB in production)
-translations_store = {}
+class UploadInitRequest(BaseModel):
+    filename: str
+    content_type: str = "video/webm"
+    total_size: Optional[int] = None
+    # Start translating while chunks are still arriving (browser recorder)
+    progressive: bool = False
+
+class UploadStatus(BaseModel):
+    upload_id: str
+    offset: int
+    total_size: Optional[int] = None
+    chunk_size: int
+    max_size: int
+
+# Bounded in-memory store, or SQLite shared by all workers (ASL_STORE=sqlite)
+translations_store = open_store()
 
 # Import your ML modules
 import numpy as np
-import cv2
-import mediapipe as mp
-from tensorflow.keras.models import load_model
-import language_tool_python
-import string
-# from my_functions import *  # Uncomment and make sure my_functions.py is in your path
-
-# Initialize your model and tools (do this once at startup)
-try:
-    # Load your trained model
-    asl_model = load_model('my_model')
+import grammar
+import inference
+import worker_pool
+import pipeline
+from worker_pool import InferencePool, PoolFullError
+from batching import BatchPredictor
+from recognition import SignRecognizer, join_signs
+from keypoint_cache import KeypointCache, hash_file
+import live_session
+from live_session import LiveSession
+import keypoint_format
+from my_functions import KEYPOINT_LAYOUT, layout_size
+import events
+from events import JobEvents, status_event
+import metrics
+
+# Worker processes run MediaPipe Holistic; prediction happens here so
+# windows from every job can be batched together
+inference_pool = InferencePool()
+
+# Keypoints of videos we've already landmarked, keyed by content hash
+keypoint_cache = KeypointCache()
+
+# Status and progress pushed to /translation/{id}/events and /ws/translation/{id}
+job_events = JobEvents()
+
+metrics.Gauge("asl_store_translations", "Translation records held in the store", lambda: len(translations_store))
+metrics.Gauge("asl_queue_pending", "Jobs holding an inference queue slot", lambda: inference_pool.pending)
+
+# Model and tools, filled in by warm_up() after the server starts. TensorFlow,
+# MediaPipe and LanguageTool are imported there, not here, so the process can
+# answer /health within a second of launch; /ready reports when they're hot.
+asl_model = None
+actions = None
+grammar_tool = None
+batcher = None
+ready = False
+startup_error = None
+startup_seconds = None
+warmup_task = None
+sweeper_task = None
+
+def load_models():
+    """Load and warm up the model and grammar backend (blocking; runs in a thread)"""
+    global asl_model, actions, grammar_tool, batcher
+    
+    # Load your trained model through the configured runtime (keras/tflite/onnx)
+    model = inference.load_model()
+    print(f"Model loaded from '{model.path}' with the {model.name} backend")
+    if model.input_shape[-1] != layout_size():
+        print(f"Warning: model expects {model.input_shape[-1]} features per frame but "
+              f"the '{KEYPOINT_LAYOUT}' keypoint layout has {layout_size()}; set ASL_KEYPOINT_LAYOUT")
+    
+    # Trace predict for every power-of-two batch size up to a full batch
+    # (the sizes the TFLite backend pads to) so the first requests don't
+    # pay for it
+    predictor = BatchPredictor(model)
+    window = np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32)
+    size = 1
+    while True:
+        model.predict(np.repeat(window, size, axis=0), verbose=0)
+        if size >= predictor.max_batch_size:
+            break
+        size *= 2
     
     # Load action labels
-    PATH = os.path.join('data')
-    actions = np.array(os.listdir(PATH))
+    labels = np.array(os.listdir(worker_pool.DATA_PATH))
+    
+    # Initialize grammar correction (local backend, cached and batched)
+    backend = grammar.load_backend()
+    backend.correct_many(["hello my name"])
+    
+    predictor.start()
+    asl_model, actions, batcher = model, labels, predictor
+    grammar_tool = grammar.GrammarCorrector(backend)
+
+async def warm_up():
+    global ready, startup_error, startup_seconds
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, load_models)
+        # Each worker runs a dummy frame through Holistic as it starts
+        await inference_pool.wait_ready()
+    except Exception as e:
+        startup_error = str(e)
+        print(f"Error loading model: {e}")
+        return
+    startup_seconds = time.perf_counter() - started
+    ready = True
+    print(f"ASL model and tools ready in {startup_seconds:.1f}s")
+
+@app.on_event("startup")
+async def start_workers():
+    global warmup_task, sweeper_task
+    inference_pool.start()
+    warmup_task = asyncio.create_task(warm_up())
+    sweeper_task = asyncio.create_task(sweep_uploads())
+
+@app.on_event("shutdown")
+async def stop_workers():
+    if warmup_task is not None:
+        warmup_task.cancel()
+    if sweeper_task is not None:
+        sweeper_task.cancel()
+    inference_pool.shutdown()
+    if grammar_tool:
+        grammar_tool.close()
+    if batcher is not None:
+        batcher.stop()
+
+async def predict_signs(keypoints: np.ndarray) -> list:
+    """Run every 10-frame window of a complete keypoint sequence through the batcher"""
+    recognizer = SignRecognizer(batcher, actions)
+    recognizer.feed(keypoints)
+    return await recognizer.finish()
+
+async def build_translation(sentence: list) -> dict:
+    """Turn the recognized signs into a corrected sentence"""
+    if not sentence:
+        return {
+            "text": "No signs detected",
+            "raw_text": "",
+            "confidence": 0.0
+        }
     
-    # Initialize grammar correction tool
-    grammar_tool = language_tool_python.LanguageToolPublicAPI('en-UK')
+    raw_text = join_signs(sentence)
     
-    print("ASL model and tools loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    asl_model = None
-    actions = None
-    grammar_tool = None
+    # Apply grammar correction; falls back to raw_text on timeout
+    if grammar_tool:
+        started = time.perf_counter()
+        corrected_text = await grammar_tool.correct(raw_text)
+        metrics.GRAMMAR_SECONDS.observe(time.perf_counter() - started)
+    else:
+        corrected_text = raw_text
+    
+    return {
+        "text": corrected_text,
+        "raw_text": raw_text,
+        "confidence": 0.9  # You could calculate average confidence
+    }
+
+def empty_record(status: str) -> dict:
+    return {
+        "status": status,
+        "translated_text": None,
+        "confidence": None,
+        "processed_at": None,
+        "error": None
+    }
 
-async def process_asl_video(video_path: str, translation_id: str):
+def save_record(translation_id: str, record: dict):
+    """Write a translation record and notify anyone watching it"""
+    translations_store[translation_id] = record
+    job_events.publish(translation_id, status_event(translation_id, record))
+    if record["status"] in events.TERMINAL_STATUSES:
+        metrics.JOBS.inc(record["status"])
+
+def publish_progress(translation_id: str, recognizer: SignRecognizer, skipped_frames: Optional[int] = None):
+    event = {
+        "type": "progress",
+        "translation_id": translation_id,
+        "frames": recognizer.frames,
+        "signs": list(recognizer.sentence),
+        "partial_text": join_signs(recognizer.sentence)
+    }
+    # Known once the worker has finished the video
+    if skipped_frames is not None:
+        event["skipped_frames"] = skipped_frames
+    job_events.publish(translation_id, event)
+
+async def plan_segments(video_path: Union[str, bytes]) -> list:
+    """Frame ranges to landmark in parallel; a single range unless the video is long and workers are idle"""
+    # In-memory videos aren't split: every segment would get its own copy
+    if not pipeline.SEGMENT_SECONDS or not isinstance(video_path, str):
+        return [(0, None)]
+    loop = asyncio.get_running_loop()
+    try:
+        frame_count, fps = await loop.run_in_executor(None, pipeline.probe_video, video_path)
+    except Exception:
+        return [(0, None)]
+    # This job already holds one slot; other jobs' slots are taken as busy workers
+    idle = inference_pool.workers - inference_pool.pending + 1
+    return pipeline.plan_segments(frame_count, fps, max(1, idle))
+
+async def landmark_video(translation_id: str, video_path: Union[str, bytes], frame_stats: dict,
+                         end_marker: Optional[str] = None):
     """
-    Process ASL video with your ML model
+    Yield a video's keypoint chunks in frame order. Long videos are split into
+    segments landmarked by several workers at once; later segments are held
+    back until the ones before them are done, so the recognizer sees one
+    continuous stream and windows spanning a boundary come out as before.
+    A video still being uploaded (end_marker) is followed by one worker.
     """
+    segments = [(0, None)] if end_marker else await plan_segments(video_path)
+    if len(segments) == 1:
+        async for chunk in inference_pool.stream(worker_pool.stream_video, translation_id, video_path,
+                                                 0, None, 0, end_marker, stats=frame_stats):
+            yield chunk
+        return
+    
+    outputs = [asyncio.Queue() for _ in segments]
+    
+    async def pump(i, first_frame, frame_count):
+        stats = {}
+        try:
+            async for chunk in inference_pool.stream(
+                    worker_pool.stream_video, f"{translation_id}:{i}", video_path, first_frame, frame_count,
+                    pipeline.SEGMENT_WARMUP_FRAMES, stats=stats, release=False):
+                outputs[i].put_nowait(chunk)
+        except Exception as e:
+            outputs[i].put_nowait(e)
+            return
+        for key, value in stats.items():
+            frame_stats[key] = frame_stats.get(key, 0) + value
+        outputs[i].put_nowait(None)
+    
+    tasks = [asyncio.create_task(pump(i, first, count)) for i, (first, count) in enumerate(segments)]
     try:
-async def process_asl_video(video_path: str, translation_id: str):
+        for output in outputs:
+            while True:
+                item = await output.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+        inference_pool.release()
+
+async def process_asl_video(video_path: Union[str, bytes], translation_id: str, video_hash: Optional[str] = None,
+                            end_marker: Optional[str] = None):
     """
-    Process ASL video using your MediaPipe + TensorFlow model
+    Process ASL video using your MediaPipe + TensorFlow model.
+    video_path is a file, deleted when processing ends either way, or the
+    video's bytes (ASL_INGEST=memory).
     """
     try:
         if asl_model is None or actions is None:
+            inference_pool.release()
             raise Exception("Model not loaded properly")
         
-        def run_asl_prediction(video_path):
-            """Your ASL prediction logic adapted for video files"""
-            sentence = []
-            keypoints = []
-            last_prediction = []
+        loop = asyncio.get_running_loop()
+        cached = keypoint_cache.get(video_hash)
+        
+        if cached is not None:
+            # Seen this exact video before: skip decode and Holistic
+            inference_pool.release()
+            started = time.perf_counter()
+            sentence = await predict_signs(cached)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "predict_cached")
+        else:
+            # Decode and landmark in worker processes while windows are
+            # predicted here as soon as they arrive, batched with those of
+            # other in-flight jobs. This job's queue slot is released when
+            # the stream ends.
+            recognizer = SignRecognizer(batcher, actions)
+            chunks = []
+            last_progress = 0.0
+            frame_stats = {}
+            async for chunk in landmark_video(translation_id, video_path, frame_stats, end_marker):
+                recognizer.feed(chunk)
+                chunks.append(chunk)
+                
+                # Report frames and signs so far, at most every PROGRESS_INTERVAL
+                added = recognizer.poll()
+                now = loop.time()
+                if added or now - last_progress >= events.PROGRESS_INTERVAL:
+                    publish_progress(translation_id, recognizer)
+                    last_progress = now
+            # Queue wait and predict are recorded where they happen (worker
+            # pool, batcher); the worker reports its own stages
+            streamed = time.perf_counter()
+            for stage in ("decode", "landmark", "extract"):
+                metrics.STAGE_SECONDS.observe(frame_stats.get(f"{stage}_seconds", 0.0), stage)
             
-            # Open the video file instead of camera
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                raise Exception(f"Cannot open video file: {video_path}")
+            skipped = frame_stats.get("skipped", 0)
+            metrics.FRAMES.inc("skipped", amount=skipped)
+            metrics.FRAMES.inc("landmarked", amount=frame_stats.get("frames", 0) - skipped)
             
-            # Create holistic object for sign prediction
-            with mp.solutions.holistic.Holistic(
-                min_detection_confidence=0.75, 
-                min_tracking_confidence=0.75
-            ) as holistic:
-                
-                while cap.isOpened():
-                    ret, image = cap.read()
-                    if not ret:
-                        break
-                    
-                    # Process the image and obtain sign landmarks
-                    # You'll need to import your functions or recreate them
-                    results = image_process(image, holistic)  # From your my_functions.py
-                    
-                    # Extract keypoints from the pose landmarks
-                    keypoints.append(keypoint_extraction(results))  # From your my_functions.py
-                    
-                    # Check if 10 frames have been accumulated
-                    if len(keypoints) == 10:
-                        # Convert keypoints list to numpy array
-                        keypoints_array = np.array(keypoints)
-                        
-                        # Make prediction using your loaded model
-                        prediction = asl_model.predict(keypoints_array[np.newaxis, :, :])
-                        
-                        # Clear keypoints for next set of frames
-                        keypoints = []
-                        
-                        # Check if prediction confidence is above 0.9
-                        if np.amax(prediction) > 0.9:
-                            predicted_action = actions[np.argmax(prediction)]
-                            
-                            # Check if different from last prediction
-                            if last_prediction != predicted_action:
-                                sentence.append(predicted_action)
-                                last_prediction = predicted_action
-                
-                cap.release()
+            sentence = await recognizer.finish()
+            publish_progress(translation_id, recognizer, skipped)
+            finished = time.perf_counter()
+            metrics.STAGE_SECONDS.observe(finished - streamed, "predict_tail")
             
-            # Post-process the sentence
-            if sentence:
-                # Capitalize first word
-                sentence[0] = sentence[0].capitalize()
-                
-                # Handle letter combinations (your alphabet logic)
-                processed_sentence = []
-                i = 0
-                while i < len(sentence):
-                    current_word = sentence[i]
-                    
-                    # Check for letter combinations
-                    if i < len(sentence) - 1:
-                        next_word = sentence[i + 1]
-                        if (current_word in string.ascii_lowercase or 
-                            current_word in string.ascii_uppercase) and \
-                           (next_word in string.ascii_lowercase or 
-                            next_word in string.ascii_uppercase):
-                            # Combine letters
-                            combined = current_word + next_word
-                            processed_sentence.append(combined.capitalize())
-                            i += 2  # Skip next word since we combined it
-                            continue
-                    
-                    processed_sentence.append(current_word)
-                    i += 1
-                
-                # Join words into sentence
-                raw_text = ' '.join(processed_sentence)
-                
-                # Apply grammar correction
-                if grammar_tool:
-                    corrected_text = grammar_tool.correct(raw_text)
-                    return {
-                        "text": corrected_text,
-                        "raw_text": raw_text,
-                        "confidence": 0.9  # You could calculate average confidence
-                    }
-                else:
-                    return {
-                        "text": raw_text,
-                        "raw_text": raw_text,
-                        "confidence": 0.9
-                    }
-            else:
-                return {
-                    "text": "No signs detected",
-                    "raw_text": "",
-                    "confidence": 0.0
-                }
+            if video_hash and chunks:
+                await loop.run_in_executor(None, keypoint_cache.put, video_hash, np.concatenate(chunks))
+                metrics.STAGE_SECONDS.observe(time.perf_counter() - finished, "cache_write")
         
-        # Run your model in a thread pool to avoid blocking
-        import concurrent.futures
-        import functools
-        
-        loop = asyncio.get_event_loop()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            result = await loop.run_in_executor(
-                executor, 
-                functools.partial(run_asl_prediction, video_path)
-            )
+        started = time.perf_counter()
+        result = await build_translation(sentence)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, "translate")
         
         # Extract results
         translated_text = result.get("text", "")
         confidence = result.get("confidence", 0.0)
         
         # Update store
-        translations_store[translation_id] = {
+        save_record(translation_id, {
             "status": "completed",
             "translated_text": translated_text,
             "confidence": confidence,
             "processed_at": datetime.now(),
             "error": None
-        }
-        
-        # Clean up video file
-        if os.path.exists(video_path):
-            os.remove(video_path)
+        })
             
     except Exception as e:
-        translations_store[translation_id] = {
+        save_record(translation_id, {
             "status": "failed",
             "translated_text": None,
             "confidence": None,
             "processed_at": datetime.now(),
             "error": str(e)
-        }
+        })
+    finally:
+        # Clean up video file
+        uploads.discard_video(video_path)
+
+def upload_in_use(owner: str) -> bool:
+    """Whether an upload, translation or batch id still needs its files"""
+    if owner in uploads.upload_sessions:
+        return True
+    batch = batches.batch_sessions.get(owner)
+    if batch is not None and batch["finished_at"] is None:
+        return True
+    record = translations_store.get(owner)
+    return record is not None and record["status"] in ("queued", "processing")
+
+async def sweep_uploads():
+    """Delete files left in uploads/ by jobs that crashed or never started"""
+    while True:
+        try:
+            removed = uploads.sweep_orphans(upload_in_use)
+            if removed:
+                print(f"Removed {removed} orphaned upload files")
+        except Exception as e:
+            print(f"Upload sweep failed: {e}")
+        await asyncio.sleep(uploads.SWEEP_INTERVAL)
+
+def require_ready():
+    """Tell clients to come back later while the model is still loading"""
+    if not ready or inference_pool.restarting:
+        if ready:
+            detail = "Worker processes are restarting, please retry later"
+        else:
+            detail = startup_error or "Model is still loading, please retry later"
+        raise HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(worker_pool.RETRY_AFTER)}
+        )
+
+def reserve_worker_slot():
+    """Claim a place in the inference queue or tell the client to back off"""
+    require_ready()
+    try:
+        inference_pool.reserve()
+    except PoolFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Translation queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+async def claim_worker_slot():
+    """Wait for a place in the inference queue instead of turning the job away"""
+    while True:
+        try:
+            inference_pool.reserve()
+            return
+        except PoolFullError:
+            await asyncio.sleep(batches.BATCH_RETRY_INTERVAL)
 
 @app.get("/")
 async def root():
     return {"message": "ASL Translation API", "status": "running"}
 
+# Liveness: the process is up and serving requests
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now()}
 
-@app.post("/upload", response_model=TranslationResponse)
-async def upload_video(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
-):
-    # Validate file type
+# Readiness: the model, grammar backend and worker processes are loaded and warm
+@app.get("/ready")
+async def readiness_check():
+    if ready and inference_pool.restarting:
+        return JSONResponse(status_code=503, content={"status": "restarting", "error": None})
+    if ready:
+        return {"status": "ready", "startup_seconds": startup_seconds}
+    return JSONResponse(
+        status_code=503,
+        content={"status": "failed" if startup_error else "starting", "error": startup_error}
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+async def get_stats():
+    """Batching and queue statistics (for debugging/admin)"""
+    return {
+        "queue": {"pending": inference_pool.pending, "capacity": inference_pool.capacity,
+                  "worker_restarts": inference_pool.restarts},
+        "model": {"backend": asl_model.name, "path": asl_model.path, "int8": asl_model.int8} if asl_model else None,
+        "batching": batcher.stats() if batcher else None,
+        "keypoint_cache": keypoint_cache.stats(),
+        "grammar": grammar_tool.stats() if grammar_tool else None
+    }
+
+# Reject oversized uploads from the Content-Length header, before the body is read
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method in ("POST", "PUT"):
+        if request.url.path.startswith("/upload"):
+            limit = uploads.MAX_UPLOAD_BYTES
+        elif request.url.path == "/batch":
+            limit = batches.MAX_BATCH_BYTES
+        else:
+            limit = None
+        content_length = request.headers.get("content-length")
+        # Allow a little room for multipart boundaries and headers
+        if limit and content_length and content_length.isdigit() and int(content_length) > limit + 64 * 1024:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds the {limit} byte limit"}
+            )
+    return await call_next(request)
+
+def start_translation(background_tasks: BackgroundTasks, file_path: Union[str, bytes], translation_id: str,
+                      video_hash: Optional[str] = None):
+    """Register a new translation and queue the video for processing"""
+    # Initialize translation record
+    save_record(translation_id, empty_record("processing"))
+    
+    # Start background processing
+    background_tasks.add_task(process_asl_video, file_path, translation_id, video_hash)
+    
+    return TranslationResponse(
+        translation_id=translation_id,
+        status="processing",
+        message="Video uploaded successfully and is being processed"
+    )
+
+# /upload parses its own multipart body (uploads.StreamedUpload), so the
+# "file" field is described here for the API docs
+UPLOAD_FORM = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": ["file"],
+    "properties": {"file": {"type": "string", "format": "binary"}}
+}}}}}
+
+@app.post("/upload", response_model=TranslationResponse, openapi_extra=UPLOAD_FORM)
+async def upload_video(background_tasks: BackgroundTasks, request: Request):
+    # Read up to the file's part headers and validate its type
+    file = await uploads.StreamedUpload(request).open()
     if not file.content_type.startswith('video/'):
         raise HTTPException(status_code=400, detail="File must be a video")
     
     # Generate unique ID
     translation_id = str(uuid.uuid4())
     
-    # Create uploads directory if it doesn't exist
-    os.makedirs("uploads", exist_ok=True)
-    
-    # Save uploaded file
-    file_path = f"uploads/{translation_id}_{file.filename}"
+    # Refuse before saving anything if we can't process it
+    reserve_worker_slot()
     
+    # Save uploaded file to disk chunk by chunk, or keep it in memory if
+    # it's small enough (ASL_INGEST=memory)
+    started = time.perf_counter()
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        if uploads.INGEST_MODE == "memory":
+            spill_path = uploads.upload_path(translation_id, file.filename, uploads.spool_dir())
+            file_path, written, video_hash = await uploads.receive_upload(file, spill_path)
+        else:
+            file_path = uploads.upload_path(translation_id, file.filename)
+            written, video_hash = await uploads.save_upload_stream(file, file_path)
+    except HTTPException:
+        inference_pool.release()
+        raise
     except Exception as e:
+        inference_pool.release()
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    metrics.UPLOAD_SECONDS.observe(time.perf_counter() - started)
+    metrics.UPLOAD_BYTES.observe(written)
     
-    # Initialize translation record
-    translations_store[translation_id] = {
-        "status": "processing",
-        "translated_text": None,
-        "confidence": None,
-        "processed_at": None,
+    return start_translation(background_tasks, file_path, translation_id, video_hash)
+
+# Resumable uploads: init -> PUT chunks at an offset -> finalize
+# A progressive upload starts translating at init, under the upload id, and
+# finalize only marks the end of the data
+@app.post("/upload/init", response_model=UploadStatus)
+async def init_upload(body: UploadInitRequest, background_tasks: BackgroundTasks):
+    if not body.content_type.startswith('video/'):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    
+    if body.progressive:
+        reserve_worker_slot()
+    try:
+        session = uploads.init_session(body.filename, body.content_type, body.total_size)
+    except Exception:
+        if body.progressive:
+            inference_pool.release()
+        raise
+    
+    if body.progressive:
+        session["progressive"] = True
+        save_record(session["upload_id"], empty_record("processing"))
+        background_tasks.add_task(process_recording, session)
+    return upload_status(session)
+
+async def process_recording(session: dict):
+    """Translate a progressive upload, following its .part file as it grows"""
+    try:
+        await process_asl_video(session["part_path"], session["upload_id"],
+                                end_marker=uploads.end_marker(session))
+    finally:
+        uploads.discard_progressive(session)
+
+@app.get("/upload/{upload_id}", response_model=UploadStatus)
+async def get_upload(upload_id: str):
+    """Lets a client that lost its connection find out where to resume"""
+    return upload_status(uploads.get_session(upload_id))
+
+@app.put("/upload/{upload_id}", response_model=UploadStatus)
+async def append_upload(upload_id: str, offset: int, request: Request):
+    session = uploads.get_session(upload_id)
+    await uploads.append_chunk(session, request, offset)
+    return upload_status(session)
+
+@app.post("/upload/{upload_id}/finalize", response_model=TranslationResponse)
+async def finalize_upload(upload_id: str, background_tasks: BackgroundTasks):
+    session = uploads.get_session(upload_id)
+    if session.get("progressive"):
+        received = uploads.session_offset(session)
+        uploads.end_progressive(session)
+        metrics.UPLOAD_SECONDS.observe((datetime.now() - session["created_at"]).total_seconds())
+        metrics.UPLOAD_BYTES.observe(received)
+        return TranslationResponse(
+            translation_id=upload_id,
+            status="processing",
+            message="Recording received; translation is finishing"
+        )
+    
+    reserve_worker_slot()
+    try:
+        file_path = uploads.finalize_session(session)
+        metrics.UPLOAD_SECONDS.observe((datetime.now() - session["created_at"]).total_seconds())
+        metrics.UPLOAD_BYTES.observe(os.path.getsize(file_path))
+        loop = asyncio.get_running_loop()
+        video_hash = await loop.run_in_executor(None, hash_file, file_path)
+    except Exception:
+        inference_pool.release()
+        raise
+    return start_translation(background_tasks, file_path, upload_id, video_hash)
+
+@app.delete("/upload/{upload_id}")
+async def cancel_upload(upload_id: str):
+    session = uploads.get_session(upload_id)
+    if session.get("progressive"):
+        # The worker stops and the translation fails with "Upload cancelled"
+        uploads.end_progressive(session, "cancel")
+    else:
+        uploads.discard_session(session)
+    return {"message": "Upload cancelled"}
+
+# Batch uploads: many videos and/or zip/tar archives of videos under one id.
+# Each video is also an ordinary translation, visible at /translation/{id}.
+@app.post("/batch")
+async def upload_batch(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...)):
+    require_ready()
+    batch = batches.create_batch()
+    loop = asyncio.get_running_loop()
+    sources = []
+    saved = []
+    
+    def discard():
+        batches.discard_files(saved)
+        batches.batch_sessions.pop(batch["batch_id"], None)
+    
+    try:
+        for file in files:
+            if batches.is_archive(file.filename):
+                archive_path = uploads.upload_path(batch["batch_id"], file.filename)
+                saved.append(archive_path)
+                await uploads.save_upload_stream(file, archive_path, limit=batches.MAX_BATCH_BYTES)
+                members = await loop.run_in_executor(None, batches.list_videos, archive_path)
+                items = {}
+                for member in dict.fromkeys(members):
+                    items[member] = batches.add_item(batch, member, member=member)
+                sources.append({"archive": archive_path, "items": items})
+            elif (file.content_type or "").startswith("video/"):
+                item = batches.add_item(batch, file.filename)
+                file_path = uploads.upload_path(item["translation_id"], file.filename)
+                saved.append(file_path)
+                _, video_hash = await uploads.save_upload_stream(file, file_path)
+                sources.append({"item": item, "path": file_path, "hash": video_hash})
+            else:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"'{file.filename}' is neither a video nor a zip/tar archive"
+                )
+        if not batch["items"]:
+            raise HTTPException(status_code=400, detail="No videos found in the upload")
+    except HTTPException:
+        discard()
+        raise
+    except Exception as e:
+        discard()
+        raise HTTPException(status_code=500, detail=f"Failed to save batch: {str(e)}")
+    
+    for item in batch["items"]:
+        save_record(item["translation_id"], empty_record("queued"))
+    background_tasks.add_task(process_batch, batch, sources)
+    return batch_status(batch, limit=len(batch["items"]))
+
+async def process_batch(batch: dict, sources: list):
+    """Feed a batch's videos into the pipeline, at most BATCH_PARALLELISM at a time"""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(batches.BATCH_PARALLELISM)
+    running = set()
+    
+    async def run(item, file_path, video_hash):
+        try:
+            await claim_worker_slot()
+            save_record(item["translation_id"], empty_record("processing"))
+            await process_asl_video(file_path, item["translation_id"], video_hash)
+        finally:
+            slots.release()
+    
+    def start(item, file_path, video_hash):
+        task = asyncio.create_task(run(item, file_path, video_hash))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    
+    try:
+        for source in sources:
+            if "path" in source:
+                await slots.acquire()
+                start(source["item"], source["path"], source["hash"])
+                continue
+            
+            # Extract the next video only when there's a slot to process it
+            extractor = batches.extract_videos(source["archive"], source["items"])
+            try:
+                while True:
+                    await slots.acquire()
+                    entry = await loop.run_in_executor(None, next, extractor, None)
+                    if entry is None:
+                        slots.release()
+                        break
+                    item, file_path, video_hash, error = entry
+                    if error:
+                        slots.release()
+                        save_record(item["translation_id"], {**empty_record("failed"),
+                                                             "processed_at": datetime.now(), "error": error})
+                        continue
+                    start(item, file_path, video_hash)
+            except Exception as e:
+                slots.release()
+                print(f"Batch {batch['batch_id']}: cannot read {source['archive']}: {e}")
+            finally:
+                extractor.close()
+                batches.discard_files([source["archive"]])
+        
+        await asyncio.gather(*running)
+    finally:
+        # Anything never started (unreadable archive, shutdown) is failed, not left queued
+        for item in batch["items"]:
+            record = translations_store.get(item["translation_id"])
+            if record is not None and record["status"] == "queued":
+                save_record(item["translation_id"], {**empty_record("failed"), "processed_at": datetime.now(),
+                                                     "error": "Video was not processed"})
+        batch["finished_at"] = datetime.now()
+
+def batch_status(batch: dict, limit: int = 100, offset: int = 0) -> dict:
+    """Aggregate progress of a batch plus one page of per-item results"""
+    counts = {}
+    items = []
+    for i, item in enumerate(batch["items"]):
+        record = translations_store.get(item["translation_id"]) or empty_record("expired")
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+        if offset <= i < offset + limit:
+            items.append({
+                "translation_id": item["translation_id"],
+                "filename": item["filename"],
+                "status": record["status"],
+                "translated_text": record["translated_text"],
+                "confidence": record["confidence"],
+                "error": record["error"]
+            })
+    
+    total = len(batch["items"])
+    done = sum(counts.get(status, 0) for status in events.TERMINAL_STATUSES + ("expired",))
+    return {
+        "batch_id": batch["batch_id"],
+        "status": "completed" if batch["finished_at"] else "processing",
+        "total": total,
+        "done": done,
+        "progress": done / total if total else 1.0,
+        "counts": counts,
+        "created_at": batch["created_at"],
+        "finished_at": batch["finished_at"],
+        "limit": limit,
+        "offset": offset,
+        "items": items
+    }
+
+@app.get("/batch/{batch_id}")
+async def get_batch(batch_id: str, limit: int = 100, offset: int = 0):
+    return batch_status(batches.get_batch(batch_id), max(0, min(limit, 1000)), max(0, offset))
+
+def upload_status(session: dict) -> UploadStatus:
+    return UploadStatus(
+        upload_id=session["upload_id"],
+        offset=uploads.session_offset(session),
+        total_size=session["total_size"],
+        chunk_size=uploads.CHUNK_SIZE,
+        max_size=uploads.MAX_UPLOAD_BYTES
+    )
+
+# Clients that run MediaPipe locally send keypoints instead of video;
+# see keypoint_format.py for the body layout and header
+@app.post("/keypoints", response_model=TranslationResult)
+async def translate_keypoints(request: Request):
+    require_ready()
+    
+    try:
+        spec = keypoint_format.parse_format(request.headers.get(keypoint_format.FORMAT_HEADER))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    features = asl_model.input_shape[-1]
+    if spec["features"] != features:
+        raise HTTPException(status_code=400, detail=f"Model expects {features} features per frame")
+    
+    # Never read more than the header promised
+    size = keypoint_format.expected_size(spec)
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > size:
+            raise HTTPException(status_code=413, detail=f"Body is larger than the {size} bytes described")
+    
+    try:
+        keypoints = keypoint_format.decode_keypoints(bytes(body), spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    sentence = await predict_signs(keypoints)
+    result = await build_translation(sentence)
+    
+    translation_id = str(uuid.uuid4())
+    record = {
+        "status": "completed",
+        "translated_text": result["text"],
+        "confidence": result["confidence"],
+        "processed_at": datetime.now(),
         "error": None
     }
+    save_record(translation_id, record)
     
-    # Start background processing
-    background_tasks.add_task(process_asl_video, file_path, translation_id)
+    return TranslationResult(translation_id=translation_id, **record)
+
+# Live translation: the browser sends compressed frames (JPEG/WebP) as binary
+# messages and gets each new sign back as soon as its window is predicted.
+# Sending {"type": "end"} returns the grammar-corrected sentence.
+@app.websocket("/ws/translate")
+async def live_translate(ws: WebSocket):
+    await ws.accept()
     
-    return TranslationResponse(
-        translation_id=translation_id,
-        status="processing",
-        message="Video uploaded successfully and is being processed"
-    )
+    try:
+        require_ready()
+    except HTTPException as e:
+        # Same answer as the HTTP endpoints; 1013: try again later
+        await ws.send_json({"type": "error", "error": e.detail,
+                            "retry_after": int(e.headers["Retry-After"])})
+        await ws.close(code=1013)
+        return
+    if live_session.active_sessions >= live_session.MAX_LIVE_SESSIONS:
+        # 1013: try again later
+        await ws.send_json({"type": "error", "error": "Too many live sessions"})
+        await ws.close(code=1013)
+        return
+    
+    live_session.active_sessions += 1
+    loop = asyncio.get_running_loop()
+    try:
+        session = await loop.run_in_executor(None, LiveSession, batcher, actions)
+    except Exception as e:
+        live_session.active_sessions -= 1
+        await ws.send_json({"type": "error", "error": str(e)})
+        await ws.close(code=1011)
+        return
+    frames = asyncio.Queue(maxsize=live_session.LIVE_FRAME_BACKLOG)
+    
+    async def receive_frames():
+        """Read frames as fast as they come, keeping only the newest few"""
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                await frames.put(None)
+                return
+            if message.get("bytes"):
+                if frames.full():
+                    frames.get_nowait()
+                    session.dropped += 1
+                frames.put_nowait(message["bytes"])
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if isinstance(control, dict) and control.get("type") == "end":
+                    await frames.put("end")
+                    return
+    
+    reader = asyncio.create_task(receive_frames())
+    try:
+        await ws.send_json({"type": "ready"})
+        while True:
+            frame = await frames.get()
+            if frame is None:
+                return
+            if frame == "end":
+                break
+            
+            for sign in await session.push_frame(frame):
+                await ws.send_json({
+                    "type": "sign",
+                    "sign": sign,
+                    "sentence": join_signs(session.recognizer.sentence),
+                    "frames": session.recognizer.frames,
+                    "dropped": session.dropped
+                })
+        
+        result = await build_translation(session.recognizer.sentence)
+        await ws.send_json({"type": "final", **result})
+        await ws.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        session.close()
+        live_session.active_sessions -= 1
 
 @app.get("/translation/{translation_id}", response_model=TranslationResult)
 async def get_translation(translation_id: str):
@@ -283,13 +920,83 @@ async def get_translation(translation_id: str):
         error=data["error"]
     )
 
+# Seconds between checks of the shared store while waiting for events;
+# covers jobs that another uvicorn worker is processing
+STATUS_POLL_INTERVAL = float(os.environ.get("ASL_STATUS_POLL_INTERVAL", 2.0))
+
+async def translation_events(translation_id: str):
+    """Yield status/progress events for a translation until it finishes"""
+    queue = job_events.subscribe(translation_id)
+    try:
+        record = translations_store.get(translation_id)
+        if record is None:
+            yield {"type": "error", "error": "Translation not found"}
+            return
+        yield status_event(translation_id, record)
+        if record["status"] in events.TERMINAL_STATUSES:
+            return
+        
+        progress = job_events.latest_progress(translation_id)
+        if progress:
+            yield progress
+        
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=STATUS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                record = translations_store.get(translation_id)
+                if record is None:
+                    yield {"type": "error", "error": "Translation not found"}
+                    return
+                if record["status"] in events.TERMINAL_STATUSES:
+                    yield status_event(translation_id, record)
+                    return
+                yield {"type": "ping"}
+                continue
+            
+            yield event
+            if event["type"] == "status" and event["status"] in events.TERMINAL_STATUSES:
+                return
+    finally:
+        job_events.unsubscribe(translation_id, queue)
+
+@app.get("/translation/{translation_id}/events")
+async def stream_translation(translation_id: str):
+    """Server-Sent Events stream of status and progress updates"""
+    if translation_id not in translations_store:
+        raise HTTPException(status_code=404, detail="Translation not found")
+    
+    async def event_stream():
+        async for event in translation_events(translation_id):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws/translation/{translation_id}")
+async def watch_translation(ws: WebSocket, translation_id: str):
+    """WebSocket version of /translation/{id}/events"""
+    await ws.accept()
+    try:
+        async for event in translation_events(translation_id):
+            await ws.send_text(json.dumps(event, default=str))
+        await ws.close()
+    except WebSocketDisconnect:
+        pass
+
 @app.get("/translations")
-async def list_translations():
-    """Get all translations (for debugging/admin)"""
+async def list_translations(status: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """Page through translations, newest first (for debugging/admin)"""
+    limit = max(1, min(limit, 500))
+    total, items = translations_store.page(status=status, limit=limit, offset=max(0, offset))
     return {
-        "translations": [
-            {"id": tid, **data} for tid, data in translations_store.items()
-        ]
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "translations": items
     }
 
 @app.delete("/translation/{translation_id}")
@@ -7,6 +7,7 @@ import aiofiles
 from typing import Optional
 import asyncio
 from datetime import datetime
+from translation_store import open_store
 
 app = FastAPI(title="ASL Translation API", version="1.0.0")
 
@@ -33,8 +34,8 @@ class TranslationResult(BaseModel):
     processed_at: Optional[datetime] = None
     error: Optional[str] = None
 
-# In-memory store (use Redis/DB in production)
-translations_store = {}
+# Bounded in-memory store, or SQLite shared by all workers (ASL_STORE=sqlite)
+translations_store = open_store()
 
 # Mock ML modules for demo purposes
 import time
@@ -164,12 +165,15 @@ async def get_translation(translation_id: str):
     )
 
 @app.get("/translations")
-async def list_translations():
-    """Get all translations (for debugging/admin)"""
+async def list_translations(status: Optional[str] = None, limit: int = 50, offset: int = 0):
+    """Page through translations, newest first (for debugging/admin)"""
+    limit = max(1, min(limit, 500))
+    total, items = translations_store.page(status=status, limit=limit, offset=max(0, offset))
     return {
-        "translations": [
-            {"id": tid, **data} for tid, data in translations_store.items()
-        ]
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "translations": items
     }
 
 @app.delete("/translation/{translation_id}")
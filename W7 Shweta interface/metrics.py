@@ -0,0 +1,123 @@
+"""
+Counters and histograms for the translation API, exposed at /metrics in the
+Prometheus text format.
+
+Recording is a dict lookup and a couple of additions, so it stays on in
+production. A metric may be updated from several threads (asl_stage_seconds
+gets "predict" from the batching thread and the other stages from the event
+loop), but each labelled series only from one, so updates need no lock. Only
+adding a new series is locked, and render() works on a copy of the series,
+so a scrape never iterates a dict that another thread is growing. Values are
+per process: with several uvicorn workers, scrape each one.
+"""
+import threading
+from bisect import bisect_left
+
+# Bucket upper bounds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(2 ** n for n in range(16, 30, 2))  # 64 KB .. 256 MB
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+registry = []
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        if labels not in self.values:
+            with self._lock:
+                self.values.setdefault(labels, 0)
+        self.values[labels] += amount
+
+    def render(self):
+        with self._lock:
+            values = list(self.values.items())
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Gauge:
+    """A value read when /metrics is scraped, from a zero-argument callable"""
+
+    def __init__(self, name, help, read):
+        self.name = name
+        self.help = help
+        self.read = read
+        registry.append(self)
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception:
+            return
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help, buckets=SECONDS_BUCKETS, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(labels)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self.series = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            with self._lock:
+                series = self.series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self.series.items()]
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                label_text = _labels(self.label_names + ("le",), labels + (bound,))
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {total}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+UPLOAD_BYTES = Histogram("asl_upload_bytes", "Size of uploaded videos", BYTES_BUCKETS)
+UPLOAD_SECONDS = Histogram("asl_upload_seconds", "Time to receive and store an upload")
+QUEUE_WAIT_SECONDS = Histogram("asl_queue_wait_seconds", "Time a video waits for a worker process")
+STAGE_SECONDS = Histogram("asl_stage_seconds", "Time spent in each processing stage", labels=("stage",))
+BATCH_SIZE = Histogram("asl_predict_batch_size", "Windows per asl_model.predict call", BATCH_BUCKETS)
+GRAMMAR_SECONDS = Histogram("asl_grammar_seconds", "Grammar correction latency, including cache hits")
+FRAMES = Counter("asl_frames_total", "Video frames landmarked or skipped as static", labels=("result",))
+JOBS = Counter("asl_jobs_total", "Translations by final status", labels=("status",))
@@ -0,0 +1,138 @@
+"""
+MediaPipe helpers shared by the worker processes and live sessions.
+
+keypoint_extraction writes straight into a caller-supplied float32 row, and
+KeypointRingBuffer keeps the last window_size rows in preallocated memory, so
+the per-frame loop doesn't allocate a new array for every frame.
+"""
+import os
+import numpy as np
+
+# Landmarks per body part and values stored per landmark
+PARTS = {
+    "pose": ("pose_landmarks", 33, 4),        # x, y, z, visibility
+    "face": ("face_landmarks", 468, 3),
+    "left_hand": ("left_hand_landmarks", 21, 3),
+    "right_hand": ("right_hand_landmarks", 21, 3),
+}
+
+# Named keypoint layouts; must match what the model was trained on
+LAYOUTS = {
+    "hands": ("left_hand", "right_hand"),                          # 126 values
+    "pose_hands": ("pose", "left_hand", "right_hand"),             # 258 values
+    "holistic": ("pose", "face", "left_hand", "right_hand"),       # 1662 values
+}
+
+KEYPOINT_LAYOUT = os.environ.get("ASL_KEYPOINT_LAYOUT", "hands")
+
+# Named Holistic settings; "balanced" matches what the model was trained with
+HOLISTIC_PROFILES = {
+    "accurate": {"model_complexity": 2, "min_detection_confidence": 0.75, "min_tracking_confidence": 0.75},
+    "balanced": {"model_complexity": 1, "min_detection_confidence": 0.75, "min_tracking_confidence": 0.75},
+    "fast": {"model_complexity": 0, "min_detection_confidence": 0.5, "min_tracking_confidence": 0.5},
+}
+
+HOLISTIC_PROFILE = os.environ.get("ASL_HOLISTIC_PROFILE", "balanced")
+
+
+def layout_size(layout=KEYPOINT_LAYOUT) -> int:
+    """Number of float values per frame for a layout"""
+    return sum(PARTS[part][1] * PARTS[part][2] for part in LAYOUTS[layout])
+
+
+def create_holistic(profile=HOLISTIC_PROFILE):
+    """Create a MediaPipe Holistic instance with a named profile's settings"""
+    import mediapipe as mp
+
+    if profile not in HOLISTIC_PROFILES:
+        raise ValueError(f"Unknown Holistic profile '{profile}', expected one of {', '.join(HOLISTIC_PROFILES)}")
+    return mp.solutions.holistic.Holistic(**HOLISTIC_PROFILES[profile])
+
+
+def image_process(image, model):
+    """Run a MediaPipe model on a BGR frame and return its results"""
+    import cv2
+
+    # Mark read-only so MediaPipe can use the buffer without copying it
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    image.flags.writeable = False
+    return model.process(image)
+
+
+def keypoint_extraction(results, out=None, layout=KEYPOINT_LAYOUT):
+    """
+    Flatten the landmarks of one frame into `out` (a float32 row of
+    layout_size(layout) values, allocated if not given) and return it.
+    Parts MediaPipe didn't detect are filled with zeros.
+    """
+    if out is None:
+        out = np.empty(layout_size(layout), dtype=np.float32)
+
+    offset = 0
+    for part in LAYOUTS[layout]:
+        field, count, dims = PARTS[part]
+        size = count * dims
+        target = out[offset:offset + size]
+        landmarks = getattr(results, field, None)
+
+        if landmarks is None:
+            target.fill(0.0)
+        elif dims == 4:
+            target[:] = np.fromiter(
+                (v for lm in landmarks.landmark for v in (lm.x, lm.y, lm.z, lm.visibility)),
+                dtype=np.float32, count=size
+            )
+        else:
+            target[:] = np.fromiter(
+                (v for lm in landmarks.landmark for v in (lm.x, lm.y, lm.z)),
+                dtype=np.float32, count=size
+            )
+        offset += size
+
+    return out
+
+
+class KeypointRingBuffer:
+    """
+    Fixed-size history of keypoint rows that produces a window every
+    `stride` frames once `window_size` frames have been seen.
+
+    Rows are written twice, at i and i + window_size, so the latest window is
+    always one contiguous slice and never has to be reassembled.
+    """
+
+    def __init__(self, features, window_size=10, stride=None):
+        self.window_size = window_size
+        self.stride = stride or window_size
+        self.features = features
+        self._data = np.zeros((2 * window_size, features), dtype=np.float32)
+        self._next = 0
+        self._count = 0
+        self._since_window = 0
+
+    def slot(self) -> np.ndarray:
+        """Row to write the next frame into; call commit() afterwards"""
+        return self._data[self._next]
+
+    def commit(self):
+        """Finish the frame written to slot(); returns the new window view or None"""
+        i = self._next
+        self._data[i + self.window_size] = self._data[i]
+        self._next = (i + 1) % self.window_size
+        self._count += 1
+        self._since_window += 1
+
+        if self._count >= self.window_size and self._since_window >= self.stride:
+            self._since_window = 0
+            # Oldest row is the one that will be overwritten next
+            return self._data[self._next:self._next + self.window_size]
+        return None
+
+    def push(self, row):
+        """Copy a row in and commit it"""
+        self.slot()[:] = row
+        return self.commit()
+
+    @property
+    def frames(self) -> int:
+        return self._count
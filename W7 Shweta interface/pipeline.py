@@ -0,0 +1,388 @@
+"""
+Staged decode -> landmark pipeline for a single video.
+
+Decoding runs on its own thread and hands frames to the landmark stage through
+a bounded queue, so cv2 reads ahead while MediaPipe works on the current frame.
+Keypoints leave in small chunks through emit(), which lets the prediction
+stage start on the first window while the rest of the clip is still being
+landmarked.
+
+With ASL_FRAME_SKIP=1, a FrameSkipper runs Holistic only on frames that moved
+since the last landmarked one (and at most ASL_TARGET_FPS of them per second
+of video); the others reuse the previous keypoints, so windows still line up
+with the original frame rate.
+
+Each frame Holistic does see goes through preprocess.FramePreprocessor first
+(resolution cap, optional crop to the tracked signer).
+
+Videos still being uploaded are read through GrowingFile and decoded with
+PyAV, which waits for more bytes instead of stopping at the current end of
+the file, so landmarking keeps pace with a recording in progress. Videos kept
+in memory (bytes instead of a path) are decoded by PyAV from a BytesIO.
+
+Long videos can be split with plan_segments() into frame ranges that
+different workers landmark at the same time; the API stitches the keypoints
+back together in frame order before recognition.
+"""
+import io
+import os
+import time
+import queue
+import threading
+import numpy as np
+from my_functions import image_process, keypoint_extraction, layout_size
+from preprocess import FramePreprocessor
+
+# Decoded frames allowed to wait for the landmark stage
+FRAME_QUEUE_SIZE = int(os.environ.get("ASL_FRAME_QUEUE_SIZE", 32))
+
+# Motion-aware frame skipping (off by default)
+FRAME_SKIP = os.environ.get("ASL_FRAME_SKIP", "0") == "1"
+# Landmarked frames per second of video; 0 = no limit beyond motion
+TARGET_FPS = float(os.environ.get("ASL_TARGET_FPS", 0))
+# Mean absolute grayscale difference (0-255) below which a frame is static
+MOTION_THRESHOLD = float(os.environ.get("ASL_MOTION_THRESHOLD", 2.0))
+# Width frames are shrunk to before differencing
+MOTION_WIDTH = int(os.environ.get("ASL_MOTION_WIDTH", 64))
+# Landmark at least this often even when nothing moves, so tracking stays fresh
+MAX_REUSED_FRAMES = int(os.environ.get("ASL_MAX_REUSED_FRAMES", 30))
+
+# Seconds of video per segment when splitting long videos; 0 = never split
+SEGMENT_SECONDS = float(os.environ.get("ASL_SEGMENT_SECONDS", 0))
+# Frames before a segment landmarked but not emitted, so Holistic's tracking
+# has settled by the segment's first frame
+SEGMENT_WARMUP_FRAMES = int(os.environ.get("ASL_SEGMENT_WARMUP_FRAMES", 15))
+
+# Seconds a progressive upload may go without new data before it's abandoned
+FOLLOW_IDLE_TIMEOUT = float(os.environ.get("ASL_FOLLOW_IDLE_TIMEOUT", 30))
+FOLLOW_POLL_INTERVAL = 0.05
+
+_END = object()
+
+
+def _put(q, item, stop):
+    """Blocking put that gives up once the consumer has stopped"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class FrameSkipper:
+    """Decides which frames need Holistic; the rest reuse the last keypoints"""
+
+    def __init__(self, source_fps, target_fps=TARGET_FPS, threshold=MOTION_THRESHOLD,
+                 width=MOTION_WIDTH, max_reused=MAX_REUSED_FRAMES):
+        # Frames of video per landmarked frame when limited by target_fps
+        self.interval = source_fps / target_fps if target_fps and source_fps > target_fps else 1.0
+        self.threshold = threshold
+        self.width = width
+        self.max_reused = max_reused
+        self.reference = None
+        self.next_due = 0.0
+        self.reused = 0
+        self.skipped = 0
+
+    def _thumbnail(self, image):
+        import cv2
+        height = max(1, image.shape[0] * self.width // image.shape[1])
+        small = cv2.resize(image, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def should_landmark(self, index, image) -> bool:
+        if self.reference is not None and self.reused < self.max_reused:
+            if index < self.next_due:
+                return self._skip()
+            thumbnail = self._thumbnail(image)
+            if np.abs(thumbnail - self.reference).mean() < self.threshold:
+                return self._skip()
+        else:
+            thumbnail = self._thumbnail(image)
+
+        # Compare later frames against this one, so slow movement adds up
+        self.reference = thumbnail
+        self.next_due = index + self.interval
+        self.reused = 0
+        return True
+
+    def _skip(self):
+        self.reused += 1
+        self.skipped += 1
+        return False
+
+
+def probe_video(video_path):
+    """Returns (frame count, fps) from the container; the count may be 0 if unknown"""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise Exception(f"Cannot open video file: {video_path}")
+        return max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+
+
+def plan_segments(frame_count, fps, max_segments, segment_seconds=SEGMENT_SECONDS):
+    """
+    Split a video into at most max_segments (first_frame, frame_count) ranges
+    of at least segment_seconds each. The last range runs to the end of the
+    file (count None), since container frame counts are not always exact.
+    """
+    segment_frames = int(segment_seconds * fps)
+    if segment_frames <= 0 or frame_count <= 0:
+        return [(0, None)]
+    count = min(frame_count // segment_frames, max_segments)
+    if count < 2:
+        return [(0, None)]
+    size = frame_count // count
+    return [(i * size, size) for i in range(count - 1)] + [((count - 1) * size, None)]
+
+
+def _seek(cap, frame) -> bool:
+    """Move cap to frame; False if the container can't seek there exactly"""
+    import cv2
+
+    return cap.set(cv2.CAP_PROP_POS_FRAMES, frame) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame
+
+
+def decode_frames(video_path, frames, stop, info=None, first_frame=0, frame_count=None):
+    """
+    Decode stage: push BGR frames into `frames`, then _END or an exception.
+    Fills info["fps"] before the first frame if given. Only frame_count
+    frames (None = all) starting at first_frame are pushed.
+    """
+    import cv2
+
+    started = time.perf_counter()
+    elapsed = 0.0
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise Exception(f"Cannot open video file: {video_path}")
+        if info is not None:
+            info["fps"] = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        # The FFmpeg backend seeks to the keyframe before first_frame and
+        # decodes forward, dropping frames by timestamp, so each segment only
+        # decodes about one GOP it doesn't keep. Containers that can't seek
+        # exactly are decoded from the start instead.
+        if first_frame and not _seek(cap, first_frame):
+            cap.release()
+            cap = cv2.VideoCapture(video_path)
+            for _ in range(first_frame):
+                if stop.is_set() or not cap.grab():
+                    break
+        read = 0
+        while not stop.is_set() and (frame_count is None or read < frame_count):
+            ret, image = cap.read()
+            if not ret:
+                break
+            read += 1
+            # Time spent waiting on the landmark stage isn't decoding
+            elapsed += time.perf_counter() - started
+            if not _put(frames, image, stop):
+                return
+            started = time.perf_counter()
+        elapsed += time.perf_counter() - started
+    except Exception as e:
+        _put(frames, e, stop)
+        return
+    finally:
+        cap.release()
+        if info is not None:
+            info["decode_seconds"] = elapsed
+    _put(frames, _END, stop)
+
+
+class GrowingFile:
+    """
+    Read-only, non-seekable view of a file that is still being written.
+    read() waits for more bytes until end_marker exists; a marker reading
+    "cancel" aborts the read.
+    """
+
+    def __init__(self, path, end_marker, stop, idle_timeout=FOLLOW_IDLE_TIMEOUT):
+        self._file = open(path, "rb")
+        self.end_marker = end_marker
+        self.stop = stop
+        self.idle_timeout = idle_timeout
+
+    def _ended(self) -> bool:
+        if not os.path.exists(self.end_marker):
+            return False
+        with open(self.end_marker) as f:
+            if f.read().strip() == "cancel":
+                raise Exception("Upload cancelled")
+        return True
+
+    def read(self, size=-1):
+        idle_since = time.monotonic()
+        chunks = []
+        while not self.stop.is_set():
+            # Check before reading: everything was written before the marker
+            ended = self._ended()
+            data = self._file.read(size)
+            if data:
+                if size is not None and size >= 0:
+                    return data
+                chunks.append(data)
+                idle_since = time.monotonic()
+            if ended:
+                break
+            if time.monotonic() - idle_since > self.idle_timeout:
+                raise Exception(f"No new data for {self.idle_timeout:.0f}s, upload abandoned")
+            time.sleep(FOLLOW_POLL_INTERVAL)
+        return b"".join(chunks)
+
+    def close(self):
+        self._file.close()
+
+
+def decode_file_object(source, frames, stop, info=None, first_frame=0, frame_count=None):
+    """
+    Decode stage for a file-like source, through PyAV; same contract as
+    decode_frames. For a GrowingFile, decode time includes waiting for upload data.
+    """
+    started = time.perf_counter()
+    elapsed = 0.0
+    try:
+        import av
+        with av.open(source, mode="r") as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            if info is not None:
+                info["fps"] = float(stream.average_rate or 30.0)
+            index = 0
+            read = 0
+            for frame in container.decode(stream):
+                if stop.is_set() or (frame_count is not None and read >= frame_count):
+                    break
+                index += 1
+                if index <= first_frame:
+                    continue
+                read += 1
+                image = frame.to_ndarray(format="bgr24")
+                elapsed += time.perf_counter() - started
+                if not _put(frames, image, stop):
+                    return
+                started = time.perf_counter()
+            elapsed += time.perf_counter() - started
+    except Exception as e:
+        _put(frames, e, stop)
+        return
+    finally:
+        if info is not None:
+            info["decode_seconds"] = elapsed
+    _put(frames, _END, stop)
+
+
+def decode_growing_file(video_path, frames, stop, info, end_marker):
+    """Decode stage for a video still being uploaded; same contract as decode_frames"""
+    try:
+        source = GrowingFile(video_path, end_marker, stop)
+    except Exception as e:
+        _put(frames, e, stop)
+        return
+    try:
+        decode_file_object(source, frames, stop, info)
+    finally:
+        source.close()
+
+
+def stream_keypoints(video_path, holistic, emit, chunk_frames, frame_skip=FRAME_SKIP,
+                     first_frame=0, frame_count=None, warmup=0, end_marker=None):
+    """
+    Landmark stage: run Holistic on frames as the decoder produces them and
+    pass float32 (frames, features) chunks of chunk_frames rows to emit().
+    With first_frame/frame_count only that range is emitted, after `warmup`
+    earlier frames have been landmarked and discarded. With end_marker the
+    file is followed as it grows until the marker appears. video_path may
+    also be the video's bytes.
+    Returns {"frames": decoded, "skipped": frames that reused keypoints,
+    "cropped": frames landmarked from a crop, "redetects": times tracking was
+    lost, and "decode_seconds", "landmark_seconds" (preprocessing + Holistic),
+    "extract_seconds" (keypoint rows) of work in each stage}.
+    """
+    warmup = min(warmup, first_frame)
+    frames = queue.Queue(maxsize=FRAME_QUEUE_SIZE)
+    stop = threading.Event()
+    info = {}
+    first_decoded = first_frame - warmup
+    decoded_count = None if frame_count is None else frame_count + warmup
+    if end_marker is not None:
+        target, args = decode_growing_file, (video_path, frames, stop, info, end_marker)
+    elif isinstance(video_path, (bytes, bytearray)):
+        target, args = decode_file_object, (io.BytesIO(video_path), frames, stop, info,
+                                            first_decoded, decoded_count)
+    else:
+        target, args = decode_frames, (video_path, frames, stop, info, first_decoded, decoded_count)
+    decoder = threading.Thread(
+        target=target,
+        args=args,
+        name="decode",
+        daemon=True
+    )
+    decoder.start()
+
+    # Keypoints are written straight into the chunk that will be emitted
+    features = layout_size()
+    chunk = np.empty((chunk_frames, features), dtype=np.float32)
+    filled = 0
+    count = 0
+    skipper = None
+    preprocessor = FramePreprocessor()
+    previous = np.zeros(features, dtype=np.float32)
+    timings = {"landmark_seconds": 0.0, "extract_seconds": 0.0}
+
+    def landmark(image, row):
+        started = time.perf_counter()
+        image, box = preprocessor.prepare(image)
+        results = image_process(image, holistic)
+        landmarked = time.perf_counter()
+        keypoint_extraction(results, out=row)
+        preprocessor.update(results, row, box)
+        timings["landmark_seconds"] += landmarked - started
+        timings["extract_seconds"] += time.perf_counter() - landmarked
+
+    try:
+        while True:
+            item = frames.get()
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            if warmup:
+                # Only here to settle tracking before the segment starts;
+                # the row is overwritten by the first real frame
+                landmark(item, chunk[filled])
+                warmup -= 1
+                continue
+            if frame_skip and skipper is None:
+                skipper = FrameSkipper(info.get("fps", 30.0))
+
+            if skipper is None or skipper.should_landmark(count, item):
+                # Process the image and obtain sign landmarks
+                landmark(item, chunk[filled])
+            else:
+                chunk[filled] = previous
+            previous = chunk[filled]
+            filled += 1
+            count += 1
+
+            if filled == chunk_frames:
+                emit(chunk)
+                chunk = np.empty((chunk_frames, features), dtype=np.float32)
+                filled = 0
+
+        if filled:
+            emit(chunk[:filled])
+    finally:
+        stop.set()
+        decoder.join()
+
+    return {"frames": count, "skipped": skipper.skipped if skipper else 0, **preprocessor.stats(),
+            "decode_seconds": info.get("decode_seconds", 0.0), **timings}
@@ -0,0 +1,162 @@
+"""
+Frame preparation before Holistic.
+
+Frames larger than MAX_FRAME_SIDE are shrunk first, which doesn't change the
+normalized landmarks. With ASL_ROI_TRACKING=1, frames are also cropped to a box
+around the signer's pose and hands from the previous frame. Landmarks found in
+a crop are mapped back to full-frame coordinates, so keypoints look the same
+to the model either way. When tracking is lost, or every ROI_REDETECT_FRAMES
+frames, the next frame goes in whole so Holistic can find the signer again.
+"""
+import os
+import numpy as np
+from my_functions import PARTS, LAYOUTS, KEYPOINT_LAYOUT
+
+# Longest side, in pixels, of the image given to Holistic; 0 = no limit
+MAX_FRAME_SIDE = int(os.environ.get("ASL_MAX_FRAME_SIDE", 960))
+
+ROI_TRACKING = os.environ.get("ASL_ROI_TRACKING", "0") == "1"
+# Padding around the landmarks, as a fraction of the box's size on each side
+ROI_MARGIN = float(os.environ.get("ASL_ROI_MARGIN", 0.3))
+# Smallest crop, as a fraction of the frame's width and height
+ROI_MIN_SIZE = float(os.environ.get("ASL_ROI_MIN_SIZE", 0.4))
+# Frames between full-frame passes, to catch a hand entering from outside
+ROI_REDETECT_FRAMES = int(os.environ.get("ASL_ROI_REDETECT_FRAMES", 60))
+
+# Upper-body pose landmarks (face, shoulders, arms, hands); legs are often off-screen
+_UPPER_BODY = range(0, 23)
+_MIN_VISIBILITY = 0.5
+
+
+def cap_resolution(image, max_side=MAX_FRAME_SIDE):
+    """Shrink an image so its longest side is at most max_side"""
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return image
+
+    import cv2
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class FramePreprocessor:
+    """
+    Per-video (or per-session) state: the current crop box, in normalized
+    full-frame coordinates as (x0, y0, x1, y1), or None for the whole frame.
+    """
+
+    def __init__(self, roi=ROI_TRACKING, max_side=MAX_FRAME_SIDE, margin=ROI_MARGIN,
+                 min_size=ROI_MIN_SIZE, redetect_every=ROI_REDETECT_FRAMES, layout=KEYPOINT_LAYOUT):
+        self.roi = roi
+        self.max_side = max_side
+        self.margin = margin
+        self.min_size = min_size
+        self.redetect_every = redetect_every
+        self.layout = layout
+        self.box = None
+        self._since_full = 0
+
+        self.cropped = 0
+        self.redetects = 0
+
+    def prepare(self, image):
+        """Returns (image for Holistic, box it was cut from or None)"""
+        box = self.box if self.roi else None
+        if box is not None and self._since_full >= self.redetect_every:
+            box = None
+        if box is None:
+            self._since_full = 0
+            return cap_resolution(image, self.max_side), None
+
+        height, width = image.shape[:2]
+        x0, y0 = int(box[0] * width), int(box[1] * height)
+        x1, y1 = int(np.ceil(box[2] * width)), int(np.ceil(box[3] * height))
+        self._since_full += 1
+        self.cropped += 1
+        return cap_resolution(image[y0:y1, x0:x1], self.max_side), (x0 / width, y0 / height, x1 / width, y1 / height)
+
+    def update(self, results, row, box):
+        """
+        Map a keypoint row extracted from a crop back to full-frame
+        coordinates (in place), and choose the box for the next frame.
+        """
+        if box is not None:
+            self._remap(results, row, box)
+        if not self.roi:
+            return
+
+        bounds = self._bounds(results, box)
+        if bounds is None:
+            # Lost the signer: look at the whole next frame
+            if self.box is not None:
+                self.redetects += 1
+            self.box = None
+            return
+
+        # Keep the current box while everything stays comfortably inside it,
+        # since Holistic tracks better when its input doesn't shift
+        if self.box is not None and box is not None:
+            inset_x = (self.box[2] - self.box[0]) * self.margin / 4
+            inset_y = (self.box[3] - self.box[1]) * self.margin / 4
+            if (bounds[0] >= self.box[0] + inset_x and bounds[1] >= self.box[1] + inset_y and
+                    bounds[2] <= self.box[2] - inset_x and bounds[3] <= self.box[3] - inset_y):
+                return
+        self.box = self._expand(bounds)
+
+    def _remap(self, results, row, box):
+        x0, y0, x1, y1 = box
+        scale_x, scale_y = x1 - x0, y1 - y0
+        offset = 0
+        for part in LAYOUTS[self.layout]:
+            field, count, dims = PARTS[part]
+            size = count * dims
+            # Parts that weren't detected stay all zeros
+            if getattr(results, field, None) is not None:
+                points = row[offset:offset + size].reshape(count, dims)
+                points[:, 0] = points[:, 0] * scale_x + x0
+                points[:, 1] = points[:, 1] * scale_y + y0
+                # z shares x's scale in MediaPipe
+                points[:, 2] *= scale_x
+            offset += size
+
+    def _bounds(self, results, box):
+        """Normalized full-frame bounding box of the visible upper body and hands"""
+        xs, ys = [], []
+        pose = getattr(results, "pose_landmarks", None)
+        if pose is not None:
+            for i in _UPPER_BODY:
+                lm = pose.landmark[i]
+                if lm.visibility >= _MIN_VISIBILITY:
+                    xs.append(lm.x)
+                    ys.append(lm.y)
+        for field in ("left_hand_landmarks", "right_hand_landmarks"):
+            hand = getattr(results, field, None)
+            if hand is not None:
+                xs.extend(lm.x for lm in hand.landmark)
+                ys.extend(lm.y for lm in hand.landmark)
+        if not xs:
+            return None
+
+        left, top, right, bottom = min(xs), min(ys), max(xs), max(ys)
+        if box is not None:
+            scale_x, scale_y = box[2] - box[0], box[3] - box[1]
+            left, right = box[0] + left * scale_x, box[0] + right * scale_x
+            top, bottom = box[1] + top * scale_y, box[1] + bottom * scale_y
+        return left, top, right, bottom
+
+    def _expand(self, bounds):
+        left, top, right, bottom = bounds
+        width = max(right - left, 1e-3) * (1 + 2 * self.margin)
+        height = max(bottom - top, 1e-3) * (1 + 2 * self.margin)
+        width, height = min(1.0, max(width, self.min_size)), min(1.0, max(height, self.min_size))
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        x0 = min(max(0.0, cx - width / 2), 1.0 - width)
+        y0 = min(max(0.0, cy - height / 2), 1.0 - height)
+        if width >= 1.0 and height >= 1.0:
+            return None
+        return x0, y0, x0 + width, y0 + height
+
+    def stats(self) -> dict:
+        return {"cropped": self.cropped, "redetects": self.redetects}
@@ -0,0 +1,120 @@
+"""
+Windowed sign prediction for a stream of keypoints.
+
+Frames arrive in chunks of any size and go into a KeypointRingBuffer; every
+window it produces is sent to the BatchPredictor straight away, and
+predictions are read back in window order so de-duplication against
+last_prediction behaves exactly like a single loop.
+"""
+import os
+import string
+import asyncio
+from collections import deque
+import numpy as np
+from my_functions import KeypointRingBuffer
+
+# Frames per prediction window and minimum confidence for a sign
+WINDOW_SIZE = int(os.environ.get("ASL_WINDOW_SIZE", 10))
+THRESHOLD = 0.9
+
+# Frames between the starts of consecutive windows; less than WINDOW_SIZE
+# gives overlapping windows
+WINDOW_STRIDE = int(os.environ.get("ASL_WINDOW_STRIDE", WINDOW_SIZE))
+
+
+def join_signs(sentence: list) -> str:
+    """Capitalize and combine spelled letters into the uncorrected sentence"""
+    if not sentence:
+        return ""
+
+    sentence = list(sentence)
+
+    # Capitalize first word
+    sentence[0] = sentence[0].capitalize()
+
+    # Handle letter combinations (your alphabet logic)
+    processed_sentence = []
+    i = 0
+    while i < len(sentence):
+        current_word = sentence[i]
+
+        # Check for letter combinations
+        if i < len(sentence) - 1:
+            next_word = sentence[i + 1]
+            if (current_word in string.ascii_lowercase or
+                current_word in string.ascii_uppercase) and \
+               (next_word in string.ascii_lowercase or
+                next_word in string.ascii_uppercase):
+                # Combine letters
+                combined = current_word + next_word
+                processed_sentence.append(combined.capitalize())
+                i += 2  # Skip next word since we combined it
+                continue
+
+        processed_sentence.append(current_word)
+        i += 1
+
+    # Join words into sentence
+    return ' '.join(processed_sentence)
+
+
+class SignRecognizer:
+    def __init__(self, batcher, actions, window_size=WINDOW_SIZE, stride=WINDOW_STRIDE,
+                 threshold=THRESHOLD):
+        self.batcher = batcher
+        self.actions = actions
+        self.window_size = window_size
+        self.stride = stride
+        self.threshold = threshold
+
+        self.sentence = []
+        self.last_prediction = []
+        self._ring = None
+        self._pending = deque()
+
+    @property
+    def frames(self) -> int:
+        return self._ring.frames if self._ring is not None else 0
+
+    def feed(self, keypoints):
+        """Add (frames, features) keypoints and queue any windows they complete"""
+        if self._ring is None:
+            self._ring = KeypointRingBuffer(keypoints.shape[1], self.window_size, self.stride)
+        for row in keypoints:
+            window = self._ring.push(row)
+            if window is not None:
+                # The ring is overwritten by later frames, so the batcher gets a copy
+                self._pending.append(asyncio.wrap_future(self.batcher.submit(window.copy())))
+
+    def poll(self) -> list:
+        """Accept predictions that are already back, in order, without waiting"""
+        added = []
+        while self._pending and self._pending[0].done():
+            sign = self._accept(self._pending.popleft().result())
+            if sign is not None:
+                added.append(sign)
+        return added
+
+    async def drain(self) -> list:
+        """Wait for every queued window and return the signs they added"""
+        added = []
+        while self._pending:
+            sign = self._accept(await self._pending[0])
+            self._pending.popleft()
+            if sign is not None:
+                added.append(sign)
+        return added
+
+    async def finish(self) -> list:
+        await self.drain()
+        return self.sentence
+
+    def _accept(self, prediction):
+        # Keep confident predictions that differ from the last one
+        if np.amax(prediction) > self.threshold:
+            predicted_action = self.actions[np.argmax(prediction)]
+            if self.last_prediction != predicted_action:
+                self.sentence.append(str(predicted_action))
+                self.last_prediction = predicted_action
+                return str(predicted_action)
+        return None
@@ -0,0 +1,48 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+import batches
+import uploads
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    return tmp_path
+
+
+def write_tar(path, members):
+    with tarfile.open(path, "w") as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+
+
+# zipfile warns about the duplicate name but writes it
+@pytest.mark.filterwarnings("ignore:Duplicate name")
+@pytest.mark.parametrize("write", [write_tar, write_zip])
+def test_repeated_member_names_are_extracted_once(upload_dir, write):
+    archive_path = str(upload_dir / "batch.archive")
+    write(archive_path, [("a.mp4", b"first"), ("notes.txt", b"x"), ("a.mp4", b"second")])
+
+    members = batches.list_videos(archive_path)
+    assert members == ["a.mp4", "a.mp4"]
+    batch = batches.create_batch()
+    items = {member: batches.add_item(batch, member, member=member) for member in dict.fromkeys(members)}
+
+    extracted = list(batches.extract_videos(archive_path, items))
+    assert len(extracted) == 1
+    item, file_path, video_hash, error = extracted[0]
+    assert item is items["a.mp4"] and error is None
+    assert open(file_path, "rb").read() == b"first"
+    batches.batch_sessions.pop(batch["batch_id"])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from batching import BatchPredictor
+
+
+class SumModel:
+    """Predicts each window's sum; any window containing NaN fails the call"""
+    input_shape = (None, 3, 2)
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, batch, verbose=0):
+        batch = np.asarray(batch)
+        self.calls.append(len(batch))
+        if np.isnan(batch).any():
+            raise ValueError("bad window")
+        return batch.sum(axis=(1, 2))[:, np.newaxis]
+
+
+def submit_all(predictor, windows):
+    # Queue everything before the thread starts so it lands in one batch
+    futures = [predictor.submit(w) for w in windows]
+    predictor.start()
+    try:
+        return [f.exception(timeout=5) or f.result() for f in futures]
+    finally:
+        predictor.stop()
+
+
+def test_windows_are_predicted_in_one_batch():
+    model = SumModel()
+    predictor = BatchPredictor(model, max_batch_size=8, max_wait_ms=50)
+    results = submit_all(predictor, [np.full((3, 2), i, np.float32) for i in range(4)])
+    assert [float(r[0]) for r in results] == [0, 6, 12, 18]
+    assert model.calls == [4]
+
+
+def test_bad_window_fails_only_its_caller():
+    model = SumModel()
+    predictor = BatchPredictor(model, max_batch_size=8, max_wait_ms=50)
+    windows = [np.ones((3, 2), np.float32) for _ in range(3)]
+    windows[1] = np.full((3, 2), np.nan, np.float32)
+
+    results = submit_all(predictor, windows)
+    assert float(results[0][0]) == 6 and float(results[2][0]) == 6
+    assert isinstance(results[1], ValueError)
+    assert predictor.stats()["retried_batches"] == 1
+    assert predictor.stats()["failed_windows"] == 1
+
+
+def test_wrong_shape_is_rejected_at_submit():
+    predictor = BatchPredictor(SumModel())
+    future = predictor.submit(np.ones((3, 5), np.float32))
+    with pytest.raises(ValueError, match="doesn't match"):
+        future.result(timeout=0)
+    assert predictor.stats()["queued"] == 0
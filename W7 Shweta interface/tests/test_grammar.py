@@ -0,0 +1,69 @@
+import time
+import asyncio
+import threading
+
+import grammar
+
+
+class SlowBackend(grammar.GrammarBackend):
+    name = "slow"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def correct_many(self, texts):
+        self.calls += 1
+        self.release.wait(5)
+        return [text.upper() for text in texts]
+
+
+def test_concurrent_sentences_share_one_call_and_are_cached():
+    backend = SlowBackend()
+    backend.release.set()
+    corrector = grammar.GrammarCorrector(backend, batch_wait_ms=10, timeout=1)
+
+    async def run():
+        first = await asyncio.gather(corrector.correct("a b"), corrector.correct("c d"))
+        again = await corrector.correct("a b")
+        return first, again
+
+    assert asyncio.run(run()) == (["A B", "C D"], "A B")
+    assert backend.calls == 1
+    assert corrector.stats()["hits"] == 1
+    corrector.close()
+
+
+def test_hung_backend_times_out_without_queueing_more_calls():
+    backend = SlowBackend()
+    corrector = grammar.GrammarCorrector(backend, batch_wait_ms=0, timeout=0.05, threads=1)
+
+    async def run():
+        timed_out = await corrector.correct("a b")
+        # The hung call still holds the only grammar thread
+        skipped = await corrector.correct("c d")
+        return timed_out, skipped
+
+    started = time.monotonic()
+    assert asyncio.run(run()) == ("a b", "c d")
+    assert time.monotonic() - started < 1
+    stats = corrector.stats()
+    assert stats["timeouts"] == 1
+    assert stats["skipped_busy"] == 1
+    assert backend.calls == 1
+    # Raw text from a timeout isn't cached as the correction
+    assert stats["cache_entries"] == 0
+    backend.release.set()
+    corrector.close()
+
+
+def test_local_backend_reports_what_is_missing(monkeypatch, tmp_path):
+    monkeypatch.setattr(grammar.shutil, "which", lambda name: None)
+    monkeypatch.setenv("LTP_PATH", str(tmp_path))
+    missing = grammar.missing_local_requirements(download=False)
+    assert "Java 8+ on PATH" in missing
+    assert any(str(tmp_path) in item for item in missing)
+
+    backend = grammar.load_backend("local")
+    assert backend.name == "rules"
+    assert "Java" in backend.fallback_reason
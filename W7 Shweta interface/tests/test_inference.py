@@ -0,0 +1,103 @@
+import sys
+import types
+import argparse
+import numpy as np
+import pytest
+
+import inference
+import export_model
+
+
+class FakeInterpreter:
+    """Mimics the tflite Interpreter API; the model sums each window"""
+    allocations = []
+
+    def __init__(self, model_path, num_threads=None):
+        self.shape = (1, 10, 4)
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array(self.shape), "dtype": np.float32, "quantization": (0.0, 0)}]
+
+    def get_output_details(self):
+        return [{"index": 1, "dtype": np.float32, "quantization": (0.0, 0)}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = tuple(shape)
+
+    def allocate_tensors(self):
+        FakeInterpreter.allocations.append(self.shape[0])
+
+    def set_tensor(self, index, value):
+        assert value.shape == self.shape
+        self.value = value
+
+    def invoke(self):
+        self.output = self.value.sum(axis=(1, 2))[:, np.newaxis]
+
+    def get_tensor(self, index):
+        return self.output.copy()
+
+
+@pytest.fixture
+def fake_tflite(monkeypatch):
+    package = types.ModuleType("tflite_runtime")
+    module = types.ModuleType("tflite_runtime.interpreter")
+    module.Interpreter = FakeInterpreter
+    monkeypatch.setitem(sys.modules, "tflite_runtime", package)
+    monkeypatch.setitem(sys.modules, "tflite_runtime.interpreter", module)
+    FakeInterpreter.allocations = []
+
+
+def test_tflite_pads_batches_to_fixed_sizes(fake_tflite):
+    model = inference.TFLiteModel("model.tflite")
+    assert model.input_shape == (None, 10, 4)
+
+    for count in (3, 5, 3, 7, 8, 1):
+        batch = np.ones((count, 10, 4), np.float32)
+        output = model.predict(batch)
+        assert output.shape == (count, 1)
+        assert np.all(output == 40)
+
+    # Exported size 1, then one interpreter each for 4 and 8
+    assert FakeInterpreter.allocations == [1, 4, 8]
+
+
+class FakeModel:
+    def __init__(self, flip):
+        self.flip = flip
+
+    def predict(self, batch, verbose=0):
+        probs = np.zeros((len(batch), 2), np.float32)
+        probs[:, 1 if self.flip else 0] = 1
+        return probs
+
+
+def run_check(monkeypatch, backends, available):
+    loaded = []
+
+    def load_model(backend, path, int8):
+        if backend not in available:
+            raise FileNotFoundError(path)
+        loaded.append(backend)
+        return FakeModel(flip=available[backend])
+
+    windows = np.zeros((4, 10, 4), np.float32)
+    monkeypatch.setattr(export_model, "load_windows", lambda *a, **k: (windows, np.zeros(4, int), ["a", "b"]))
+    monkeypatch.setattr(export_model.inference, "load_model", load_model)
+    options = argparse.Namespace(data=None, limit=None, backend=backends, int8=False, model="m",
+                                 batch_size=2, min_agreement=0.99, output=None)
+    export_model.check(options)
+    return loaded
+
+
+def test_check_compares_against_keras_whatever_the_order(monkeypatch):
+    loaded = run_check(monkeypatch, ["tflite", "keras"], {"keras": False, "tflite": False})
+    assert loaded == ["keras", "tflite"]
+
+    with pytest.raises(SystemExit):
+        run_check(monkeypatch, ["tflite", "onnx"], {"keras": False, "tflite": False, "onnx": True})
+
+
+def test_check_fails_without_the_keras_reference(monkeypatch):
+    with pytest.raises(SystemExit):
+        run_check(monkeypatch, ["tflite"], {"tflite": False})
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+
+import keypoint_cache
+from keypoint_cache import KeypointCache, cache_version
+from my_functions import layout_size
+
+
+def test_version_changes_with_layout():
+    assert cache_version("hands") != cache_version("pose_hands")
+    assert str(layout_size("hands")) in cache_version("hands")
+
+
+def test_entries_are_kept_apart_per_layout(tmp_path):
+    hands = KeypointCache(str(tmp_path), version=cache_version("hands"), features=layout_size("hands"))
+    hands.put("abc", np.ones((12, layout_size("hands")), np.float32))
+
+    pose = KeypointCache(str(tmp_path), version=cache_version("pose_hands"), features=layout_size("pose_hands"))
+    assert pose.get("abc") is None
+    assert hands.get("abc").shape == (12, layout_size("hands"))
+
+
+def test_entry_with_wrong_feature_count_is_rejected_and_removed(tmp_path):
+    cache = KeypointCache(str(tmp_path), version="v", features=126)
+    cache.put("abc", np.ones((12, 258), np.float32))
+
+    assert cache.get("abc") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["misses"] == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), "v", "abc.npy"))
+
+
+def test_hit_returns_stored_keypoints(tmp_path):
+    cache = KeypointCache(str(tmp_path), version="v", features=4)
+    stored = np.arange(12, dtype=np.float32).reshape(3, 4)
+    cache.put("abc", stored)
+
+    assert np.array_equal(cache.get("abc"), stored)
+    assert cache.stats()["hits"] == 1
+    # Survives a restart
+    assert np.array_equal(KeypointCache(str(tmp_path), version="v", features=4).get("abc"), stored)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    row = np.ones((10, 4), np.float32)
+    cache = KeypointCache(str(tmp_path), version="v", features=4, max_bytes=10 ** 9)
+    cache.put("a", row)
+    size = cache.stats()["bytes"]
+    cache.max_bytes = size * 2
+    cache.put("b", row)
+    cache.get("a")
+    cache.put("c", row)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_missing_digest_is_a_miss(tmp_path):
+    cache = KeypointCache(str(tmp_path), version="v", features=4)
+    assert cache.get(None) is None
+    assert cache.get("nope") is None
+    assert cache.stats()["misses"] == 1
+    assert keypoint_cache.CACHE_VERSION.startswith(keypoint_cache.CACHE_FORMAT)
+
+
+def test_version_changes_with_extraction_settings(monkeypatch):
+    base = cache_version(**keypoint_cache.extraction_settings())
+
+    monkeypatch.setattr(keypoint_cache, "HOLISTIC_PROFILE", "fast")
+    profile = cache_version(**keypoint_cache.extraction_settings())
+    monkeypatch.setattr(keypoint_cache.preprocess, "MAX_FRAME_SIDE", 480)
+    max_side = cache_version(**keypoint_cache.extraction_settings())
+    monkeypatch.setattr(keypoint_cache.preprocess, "ROI_TRACKING", True)
+    roi = cache_version(**keypoint_cache.extraction_settings())
+    monkeypatch.setattr(keypoint_cache.pipeline, "FRAME_SKIP", True)
+    frame_skip = cache_version(**keypoint_cache.extraction_settings())
+
+    assert len({base, profile, max_side, roi, frame_skip}) == 5
+    assert cache_version(**keypoint_cache.extraction_settings()) == frame_skip
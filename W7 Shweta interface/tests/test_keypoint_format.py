@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import keypoint_format
+
+
+def test_parse_format_reads_every_field():
+    spec = keypoint_format.parse_format(" v=1 ; DTYPE=float16; frames=120; features=126;")
+    assert spec == {"dtype": np.dtype('<f2'), "frames": 120, "features": 126}
+    assert keypoint_format.expected_size(spec) == 120 * 126 * 2
+
+
+def test_parse_format_defaults_to_float32():
+    spec = keypoint_format.parse_format("v=1; frames=2; features=3")
+    assert spec["dtype"] == np.dtype('<f4')
+
+
+@pytest.mark.parametrize("header, message", [
+    (None, "Missing"),
+    ("", "Missing"),
+    ("v=2; frames=1; features=1", "version"),
+    ("v=1; frames=1; features=1; dtype=int8", "dtype"),
+    ("v=1; frames=ten; features=1", "integers"),
+    ("v=1; features=1", "integers"),
+    ("v=1; frames=0; features=1", "positive"),
+    ("v=1; frames; features=1", "Malformed"),
+    (f"v=1; frames={keypoint_format.MAX_FRAMES + 1}; features=1", "At most"),
+])
+def test_parse_format_rejects_bad_headers(header, message):
+    with pytest.raises(ValueError, match=message):
+        keypoint_format.parse_format(header)
+
+
+def test_decode_keypoints_round_trips_little_endian():
+    spec = keypoint_format.parse_format("v=1; dtype=float16; frames=2; features=3")
+    values = np.arange(6, dtype='<f2').reshape(2, 3)
+    keypoints = keypoint_format.decode_keypoints(values.tobytes(), spec)
+    assert keypoints.dtype == np.float32
+    np.testing.assert_array_equal(keypoints, values.astype(np.float32))
+
+
+def test_decode_keypoints_checks_size_and_values():
+    spec = keypoint_format.parse_format("v=1; frames=1; features=2")
+    with pytest.raises(ValueError, match="header describes 8"):
+        keypoint_format.decode_keypoints(b"\0" * 4, spec)
+    with pytest.raises(ValueError, match="NaN"):
+        keypoint_format.decode_keypoints(np.array([0, np.nan], '<f4').tobytes(), spec)
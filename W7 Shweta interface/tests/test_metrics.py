@@ -0,0 +1,48 @@
+import sys
+import threading
+
+import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test", buckets=(1, 2))
+    metrics.registry.remove(histogram)
+    histogram.observe(0.5)
+    histogram.observe(1.5)
+    histogram.observe(5)
+    lines = list(histogram.render())
+    assert 'test_seconds_bucket{le="1"} 1' in lines
+    assert 'test_seconds_bucket{le="2"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_count 3" in lines
+
+
+def test_series_added_from_another_thread_while_rendering():
+    histogram = metrics.Histogram("test_stage_seconds", "Test", labels=("stage",))
+    metrics.registry.remove(histogram)
+    histogram.observe(0.1, "decode")
+    errors = []
+    done = threading.Event()
+
+    def add_series():
+        # Each new stage adds a series, as the batching thread's first "predict" does
+        for i in range(2000):
+            histogram.observe(0.1, f"stage{i}")
+        done.set()
+
+    # Switch threads often, so series are added mid-render
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer = threading.Thread(target=add_series)
+    writer.start()
+    try:
+        while not done.is_set():
+            list(histogram.render())
+    except RuntimeError as e:
+        errors.append(e)
+    finally:
+        writer.join()
+        sys.setswitchinterval(interval)
+
+    assert errors == []
+    assert len(histogram.series) == 2001
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import pipeline
+from my_functions import layout_size
+
+FRAMES = 40
+
+
+class BrightnessHolistic:
+    """Stands in for Holistic: a left hand whose x is the frame's mean brightness"""
+
+    def process(self, image):
+        x = float(image.mean()) / 255.0
+        hand = SimpleNamespace(landmark=[SimpleNamespace(x=x, y=0.5, z=0.0)] * 21)
+        return SimpleNamespace(left_hand_landmarks=hand, right_hand_landmarks=None,
+                               pose_landmarks=None, face_landmarks=None)
+
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("No MJPG encoder in this OpenCV build")
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), i * 6, np.uint8))
+    writer.release()
+    return path
+
+
+def landmark(video_path, **kwargs):
+    chunks = []
+    stats = pipeline.stream_keypoints(video_path, BrightnessHolistic(), lambda c: chunks.append(c.copy()),
+                                      10, frame_skip=False, **kwargs)
+    return (np.concatenate(chunks) if chunks else np.zeros((0, layout_size()))), stats
+
+
+def test_every_frame_is_emitted_in_order(video):
+    keypoints, stats = landmark(video)
+    assert keypoints.shape == (FRAMES, layout_size())
+    assert stats["frames"] == FRAMES
+    brightness = keypoints[:, 0]
+    assert np.all(np.diff(brightness) > 0)
+
+
+def test_stats_report_each_stage(video):
+    _, stats = landmark(video)
+    for key in ("decode_seconds", "landmark_seconds", "extract_seconds"):
+        assert stats[key] > 0
+
+
+def test_plan_segments_covers_the_video():
+    segments = pipeline.plan_segments(300, 30.0, 4, segment_seconds=2)
+    assert segments == [(0, 75), (75, 75), (150, 75), (225, None)]
+    assert pipeline.plan_segments(50, 30.0, 4, segment_seconds=2) == [(0, None)]
+    assert pipeline.plan_segments(300, 30.0, 1, segment_seconds=2) == [(0, None)]
+    assert pipeline.plan_segments(0, 30.0, 4, segment_seconds=2) == [(0, None)]
+
+
+def test_segments_stitch_back_to_the_whole_video(video):
+    whole, _ = landmark(video)
+    parts = [landmark(video, first_frame=first, frame_count=count, warmup=3)[0]
+             for first, count in pipeline.plan_segments(FRAMES, 30.0, 3, segment_seconds=0.4)]
+    assert len(parts) == 3
+    assert np.array_equal(np.concatenate(parts), whole)
+
+
+@pytest.fixture(scope="module")
+def gop_video(tmp_path_factory):
+    """A clip with keyframes only every few frames, so seeking has to decode forward"""
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("No MPEG-4 encoder in this OpenCV build")
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), i * 6, np.uint8))
+    writer.release()
+    return path
+
+
+def decode(video_path, first_frame, frame_count):
+    import queue
+    import threading
+    frames = queue.Queue()
+    pipeline.decode_frames(video_path, frames, threading.Event(), first_frame=first_frame, frame_count=frame_count)
+    images = []
+    while (image := frames.get()) is not pipeline._END:
+        images.append(image)
+    return images
+
+
+@pytest.mark.parametrize("seekable", [True, False])
+def test_segments_start_on_the_requested_frame(gop_video, monkeypatch, seekable):
+    if not seekable:
+        monkeypatch.setattr(pipeline, "_seek", lambda cap, frame: False)
+    whole = decode(gop_video, 0, None)
+    assert len(whole) == FRAMES
+    for first_frame in (1, 13, 25):
+        segment = decode(gop_video, first_frame, 5)
+        assert len(segment) == 5
+        for got, expected in zip(segment, whole[first_frame:]):
+            assert np.abs(got.astype(int) - expected).mean() < 1
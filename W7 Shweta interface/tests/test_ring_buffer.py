@@ -0,0 +1,37 @@
+import numpy as np
+
+from my_functions import KeypointRingBuffer
+
+
+def push_frames(buffer, count, start=0):
+    windows = []
+    for i in range(start, start + count):
+        window = buffer.push(np.full(buffer.features, i, np.float32))
+        if window is not None:
+            windows.append(window[:, 0].tolist())
+    return windows
+
+
+def test_first_window_after_window_size_frames():
+    buffer = KeypointRingBuffer(features=3, window_size=4)
+    assert push_frames(buffer, 3) == []
+    assert push_frames(buffer, 1, start=3) == [[0, 1, 2, 3]]
+    assert buffer.frames == 4
+
+
+def test_windows_stay_in_frame_order_after_wrapping():
+    buffer = KeypointRingBuffer(features=2, window_size=4)
+    assert push_frames(buffer, 12) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11]]
+
+
+def test_stride_overlaps_windows():
+    buffer = KeypointRingBuffer(features=1, window_size=4, stride=2)
+    assert push_frames(buffer, 8) == [[0, 1, 2, 3], [2, 3, 4, 5], [4, 5, 6, 7]]
+
+
+def test_slot_commit_writes_in_place():
+    buffer = KeypointRingBuffer(features=2, window_size=2)
+    for value in (1, 2):
+        buffer.slot()[:] = value
+        window = buffer.commit()
+    assert window.tolist() == [[1, 1], [2, 2]]
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+import translation_store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(translation_store.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "sqlite":
+            return translation_store.SQLiteStore(str(tmp_path / "store.db"), **kwargs)
+        return translation_store.MemoryStore(**kwargs)
+    return make
+
+
+def record(status="completed", text="hello"):
+    return {"status": status, "translated_text": text, "confidence": 0.9,
+            "processed_at": datetime(2024, 1, 1), "error": None}
+
+
+def test_behaves_like_a_dict(make_store, clock):
+    store = make_store()
+    store["a"] = record("processing", None)
+    assert "a" in store and "b" not in store
+    store["a"] = record()
+    assert store["a"]["translated_text"] == "hello"
+    assert store["a"]["processed_at"] == datetime(2024, 1, 1)
+    del store["a"]
+    assert store.get("a") is None
+    with pytest.raises(KeyError):
+        store["a"]
+    with pytest.raises(KeyError):
+        del store["a"]
+
+
+def test_page_is_newest_first_and_filters_by_status(make_store, clock):
+    store = make_store()
+    for i in range(5):
+        clock.now += 1
+        store[f"t{i}"] = record("failed" if i % 2 else "completed")
+
+    total, rows = store.page(limit=2)
+    assert total == 5
+    assert [row["id"] for row in rows] == ["t4", "t3"]
+    total, rows = store.page(limit=2, offset=4)
+    assert [row["id"] for row in rows] == ["t0"]
+
+    total, rows = store.page(status="completed", limit=10)
+    assert total == 3
+    assert [row["id"] for row in rows] == ["t4", "t2", "t0"]
+    assert store.page(status="failed", offset=1)[1][0]["id"] == "t1"
+    assert store.counts() == {"completed": 3, "failed": 2}
+
+
+def test_update_keeps_creation_time(make_store, clock):
+    store = make_store(ttl=10)
+    store["a"] = record("processing", None)
+    clock.now += 1
+    store["b"] = record()
+    clock.now += 5
+    store["a"] = record()
+    assert [row["id"] for row in store.page()[1]] == ["b", "a"]
+    clock.now += 5
+    # a was created 11s ago; updating it didn't extend its life
+    assert "a" not in store
+    assert "b" in store
+
+
+def test_expired_records_disappear(make_store, clock):
+    store = make_store(ttl=10)
+    store["old"] = record()
+    clock.now += 6
+    store["new"] = record("failed")
+    clock.now += 5
+    assert store.get("old") is None
+    assert store.counts() == {"failed": 1}
+    assert store.page(status="completed") == (0, [])
+    total, rows = store.page()
+    assert (total, [row["id"] for row in rows]) == (1, ["new"])
+    assert len(store) == 1
+
+
+def test_oldest_records_are_evicted_past_max_entries(make_store, clock):
+    store = make_store(max_entries=3)
+    for i in range(5):
+        # SQLiteStore purges at most once a second
+        clock.now += 2
+        store[f"t{i}"] = record()
+    assert len(store) == 3
+    assert [row["id"] for row in store.page()[1]] == ["t4", "t3", "t2"]
+    assert "t0" not in store
@@ -0,0 +1,168 @@
+import os
+import asyncio
+import hashlib
+import pytest
+from fastapi import HTTPException
+
+import uploads
+
+
+class ChunkedRequest:
+    """Stands in for a starlette Request whose body arrives in pieces"""
+
+    def __init__(self, *chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            # Give other requests a chance to run mid-body, as a slow client would
+            await asyncio.sleep(0)
+            yield chunk
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(uploads, "upload_sessions", {})
+    return tmp_path
+
+
+def test_chunks_append_at_the_expected_offset(upload_dir):
+    async def run():
+        session = uploads.init_session("clip.webm", "video/webm", 6)
+        assert await uploads.append_chunk(session, ChunkedRequest(b"abc"), 0) == 3
+        assert await uploads.append_chunk(session, ChunkedRequest(b"d", b"ef"), 3) == 6
+        return session
+
+    session = asyncio.run(run())
+    assert open(session["part_path"], "rb").read() == b"abcdef"
+    path = uploads.finalize_session(session)
+    assert open(path, "rb").read() == b"abcdef"
+    assert session["upload_id"] not in uploads.upload_sessions
+
+
+def test_retried_chunk_is_rejected_with_the_current_offset(upload_dir):
+    async def run():
+        session = uploads.init_session("clip.webm", "video/webm", None)
+        await uploads.append_chunk(session, ChunkedRequest(b"abc"), 0)
+        with pytest.raises(HTTPException) as error:
+            await uploads.append_chunk(session, ChunkedRequest(b"abc"), 0)
+        return session, error.value
+
+    session, error = asyncio.run(run())
+    assert error.status_code == 409
+    assert error.detail["offset"] == 3
+    assert uploads.session_offset(session) == 3
+
+
+def test_concurrent_chunks_at_the_same_offset_are_written_once(upload_dir):
+    async def run():
+        session = uploads.init_session("clip.webm", "video/webm", None)
+        body = [b"x" * 1000] * 50
+        results = await asyncio.gather(
+            uploads.append_chunk(session, ChunkedRequest(*body), 0),
+            uploads.append_chunk(session, ChunkedRequest(*body), 0),
+            return_exceptions=True,
+        )
+        return session, results
+
+    session, results = asyncio.run(run())
+    assert sorted(type(r).__name__ for r in results) == ["HTTPException", "int"]
+    conflict = next(r for r in results if isinstance(r, HTTPException))
+    assert conflict.status_code == 409
+    assert uploads.session_offset(session) == 50000
+
+
+def test_oversized_chunk_is_dropped_and_reports_the_session_limit(upload_dir):
+    async def run():
+        session = uploads.init_session("clip.webm", "video/webm", 5)
+        await uploads.append_chunk(session, ChunkedRequest(b"abc"), 0)
+        with pytest.raises(HTTPException) as error:
+            await uploads.append_chunk(session, ChunkedRequest(b"de", b"fg"), 3)
+        return session, error.value
+
+    session, error = asyncio.run(run())
+    assert error.status_code == 413
+    assert "5 byte" in error.detail
+    assert uploads.session_offset(session) == 3
+
+
+def test_finalize_rejects_incomplete_upload(upload_dir):
+    async def run():
+        session = uploads.init_session("clip.webm", "video/webm", 10)
+        await uploads.append_chunk(session, ChunkedRequest(b"abc"), 0)
+        return session
+
+    session = asyncio.run(run())
+    with pytest.raises(HTTPException) as error:
+        uploads.finalize_session(session)
+    assert error.value.status_code == 400
+    assert error.value.detail["offset"] == 3
+
+
+def test_paths_follow_the_configured_directories(upload_dir, monkeypatch):
+    session = uploads.init_session("clip.webm", "video/webm", 6)
+    assert os.path.dirname(session["part_path"]) == str(upload_dir)
+
+    spool = upload_dir / "spool"
+    monkeypatch.setattr(uploads, "SPOOL_DIR", str(spool))
+    assert uploads.upload_path("id", "clip.webm", uploads.spool_dir()) == str(spool / "id_clip.webm")
+
+
+class MultipartRequest(ChunkedRequest):
+    def __init__(self, body, size=7, boundary="xyz"):
+        super().__init__(*(body[i:i + size] for i in range(0, len(body), size)))
+        self.headers = {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+def multipart_body(data, boundary="xyz"):
+    return (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="note"\r\n\r\n'
+        "hello\r\n"
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="dir/clip.webm"\r\n'
+        "Content-Type: video/webm\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_streamed_upload_reads_the_file_field_from_the_body(upload_dir):
+    data = bytes(range(256)) * 4
+
+    async def run():
+        file = await uploads.StreamedUpload(MultipartRequest(multipart_body(data))).open()
+        video, written, video_hash = await uploads.receive_upload(file, str(upload_dir / "spill"))
+        return file, video, written, video_hash
+
+    file, video, written, video_hash = asyncio.run(run())
+    assert (file.filename, file.content_type) == ("dir/clip.webm", "video/webm")
+    assert video == data and written == len(data)
+    assert video_hash == hashlib.sha256(data).hexdigest()
+    assert not (upload_dir / "spill").exists()
+
+
+def test_streamed_upload_spills_past_the_memory_limit(upload_dir):
+    data = b"v" * 100
+    spill = str(upload_dir / "spill")
+
+    async def run():
+        file = await uploads.StreamedUpload(MultipartRequest(multipart_body(data))).open()
+        return await uploads.receive_upload(file, spill, memory_limit=10)
+
+    assert asyncio.run(run())[:2] == (spill, 100)
+    assert open(spill, "rb").read() == data
+
+
+@pytest.mark.parametrize("body, message", [
+    (multipart_body(b"abc").replace(b'name="file"', b'name="other"'), "Missing 'file'"),
+    (multipart_body(b"abc")[:-12], "ended before"),
+])
+def test_streamed_upload_rejects_bad_bodies(upload_dir, body, message):
+    async def run():
+        file = await uploads.StreamedUpload(MultipartRequest(body)).open()
+        await uploads.receive_upload(file, str(upload_dir / "spill"))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 400
+    assert message in error.value.detail
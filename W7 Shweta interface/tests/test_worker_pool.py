@@ -0,0 +1,58 @@
+import os
+import asyncio
+import multiprocessing
+import concurrent.futures
+
+import pytest
+
+import worker_pool
+
+
+def init_test_worker(queue):
+    worker_pool.results_queue = queue
+
+
+def echo_or_crash(job_id, crash):
+    if crash:
+        # As a segfault in MediaPipe would
+        os._exit(1)
+    worker_pool.results_queue.put((job_id, "keypoints", job_id))
+    worker_pool.results_queue.put((job_id, "done", None))
+
+
+class LightPool(worker_pool.InferencePool):
+    """Forked workers without Holistic"""
+
+    def __init__(self):
+        super().__init__(workers=1, queue_size=1)
+        self.context = multiprocessing.get_context("fork")
+
+    def _new_executor(self, results):
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self.context,
+            initializer=init_test_worker, initargs=(results,)
+        )
+
+
+async def collect(pool, job_id, crash=False):
+    return [chunk async for chunk in pool.stream(echo_or_crash, job_id, crash, release=False)]
+
+
+def test_pool_recovers_from_a_crashed_worker():
+    async def run():
+        pool = LightPool()
+        pool.start()
+        await pool.wait_ready()
+        assert await collect(pool, "a") == ["a"]
+
+        with pytest.raises(Exception, match="restarting"):
+            await collect(pool, "crash", crash=True)
+        assert pool.restarting
+
+        # Waits for the new executor instead of failing on the broken one
+        result = await asyncio.wait_for(collect(pool, "b"), 30)
+        restarting = pool.restarting
+        pool.shutdown()
+        return result, restarting, pool.restarts
+
+    assert asyncio.run(run()) == (["b"], False, 1)
@@ -0,0 +1,248 @@
+"""
+Storage for translation records.
+
+Both backends behave like the dict main.py used to keep (store[id] = record,
+id in store, del store[id]) and add page() for listing by status and
+creation time.
+
+    memory - per-process, bounded by max_entries and a TTL
+    sqlite - a WAL-mode SQLite file shared by every uvicorn worker on the host
+
+Pick one with ASL_STORE; ASL_STORE_PATH sets the SQLite file.
+"""
+import os
+import time
+import sqlite3
+import threading
+from itertools import islice
+from collections import OrderedDict
+from datetime import datetime
+
+STORE_BACKEND = os.environ.get("ASL_STORE", "memory")
+STORE_PATH = os.environ.get("ASL_STORE_PATH", "translations.db")
+
+# Records kept at most, and how long a record lives after it was created
+STORE_MAX_ENTRIES = int(os.environ.get("ASL_STORE_MAX_ENTRIES", 10000))
+STORE_TTL = float(os.environ.get("ASL_STORE_TTL", 24 * 60 * 60))
+
+
+class MemoryStore:
+    def __init__(self, max_entries=STORE_MAX_ENTRIES, ttl=STORE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # id -> record, oldest first; updates keep an entry's position
+        self._records = OrderedDict()
+        # status -> set of ids
+        self._by_status = {}
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        while self._records:
+            oldest_id, oldest = next(iter(self._records.items()))
+            if oldest["created_at"] >= cutoff and len(self._records) <= self.max_entries:
+                break
+            self._drop(oldest_id)
+
+    def _drop(self, translation_id):
+        record = self._records.pop(translation_id)
+        ids = self._by_status.get(record["status"])
+        if ids is not None:
+            ids.discard(translation_id)
+
+    def __setitem__(self, translation_id, record):
+        with self._lock:
+            existing = self._records.get(translation_id)
+            if existing is not None:
+                self._by_status[existing["status"]].discard(translation_id)
+                created_at = existing["created_at"]
+            else:
+                created_at = time.time()
+            self._records[translation_id] = {**record, "created_at": created_at}
+            self._by_status.setdefault(record["status"], set()).add(translation_id)
+            self._expire()
+
+    def __getitem__(self, translation_id):
+        record = self.get(translation_id)
+        if record is None:
+            raise KeyError(translation_id)
+        return record
+
+    def get(self, translation_id):
+        with self._lock:
+            record = self._records.get(translation_id)
+            if record is None or record["created_at"] < time.time() - self.ttl:
+                return None
+            return dict(record)
+
+    def __contains__(self, translation_id):
+        return self.get(translation_id) is not None
+
+    def __delitem__(self, translation_id):
+        with self._lock:
+            if translation_id not in self._records:
+                raise KeyError(translation_id)
+            self._drop(translation_id)
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return len(self._records)
+
+    def page(self, status=None, limit=50, offset=0):
+        """Newest first; returns (total matching, [record with "id"])"""
+        with self._lock:
+            self._expire()
+            if status is None:
+                total = len(self._records)
+                ids = islice(reversed(self._records), offset, offset + limit)
+                return total, [{"id": tid, **self._records[tid]} for tid in ids]
+            else:
+                ids = sorted(
+                    self._by_status.get(status, ()),
+                    key=lambda tid: self._records[tid]["created_at"],
+                    reverse=True
+                )
+            return len(ids), [{"id": tid, **self._records[tid]} for tid in ids[offset:offset + limit]]
+
+    def counts(self) -> dict:
+        with self._lock:
+            self._expire()
+            return {status: len(ids) for status, ids in self._by_status.items() if ids}
+
+
+class SQLiteStore:
+    def __init__(self, path=STORE_PATH, max_entries=STORE_MAX_ENTRIES, ttl=STORE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                translated_text TEXT,
+                confidence REAL,
+                processed_at TEXT,
+                error TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_created ON translations (created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_status ON translations (status, created_at)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _row_to_record(self, row):
+        record = dict(row)
+        if record["processed_at"]:
+            record["processed_at"] = datetime.fromisoformat(record["processed_at"])
+        return record
+
+    def _purge(self, conn):
+        """Drop expired and excess rows, at most once a second per process"""
+        now = time.time()
+        if now - self._last_purge < 1.0:
+            return
+        self._last_purge = now
+        conn.execute("DELETE FROM translations WHERE created_at < ?", (now - self.ttl,))
+        conn.execute("""
+            DELETE FROM translations WHERE id IN (
+                SELECT id FROM translations ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def __setitem__(self, translation_id, record):
+        processed_at = record.get("processed_at")
+        values = (
+            translation_id,
+            record["status"],
+            record.get("translated_text"),
+            record.get("confidence"),
+            processed_at.isoformat() if processed_at else None,
+            record.get("error"),
+            time.time(),
+        )
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                INSERT INTO translations
+                    (id, status, translated_text, confidence, processed_at, error, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    translated_text = excluded.translated_text,
+                    confidence = excluded.confidence,
+                    processed_at = excluded.processed_at,
+                    error = excluded.error
+            """, values)
+            self._purge(conn)
+
+    def __getitem__(self, translation_id):
+        record = self.get(translation_id)
+        if record is None:
+            raise KeyError(translation_id)
+        return record
+
+    def get(self, translation_id):
+        row = self._conn().execute(
+            "SELECT * FROM translations WHERE id = ? AND created_at >= ?",
+            (translation_id, time.time() - self.ttl)
+        ).fetchone()
+        return self._row_to_record(row) if row else None
+
+    def __contains__(self, translation_id):
+        return self.get(translation_id) is not None
+
+    def __delitem__(self, translation_id):
+        conn = self._conn()
+        with conn:
+            deleted = conn.execute("DELETE FROM translations WHERE id = ?", (translation_id,)).rowcount
+        if not deleted:
+            raise KeyError(translation_id)
+
+    def __len__(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM translations WHERE created_at >= ?", (time.time() - self.ttl,)
+        ).fetchone()[0]
+
+    def page(self, status=None, limit=50, offset=0):
+        """Newest first; returns (total matching, [record with "id"])"""
+        cutoff = time.time() - self.ttl
+        conn = self._conn()
+        if status is None:
+            where, params = "created_at >= ?", (cutoff,)
+        else:
+            where, params = "status = ? AND created_at >= ?", (status, cutoff)
+        total = conn.execute(f"SELECT COUNT(*) FROM translations WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM translations WHERE {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            params + (limit, offset)
+        ).fetchall()
+        return total, [self._row_to_record(row) for row in rows]
+
+    def counts(self) -> dict:
+        rows = self._conn().execute(
+            "SELECT status, COUNT(*) FROM translations WHERE created_at >= ? GROUP BY status",
+            (time.time() - self.ttl,)
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+
+def open_store(backend=STORE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteStore()
+    return MemoryStore()
@@ -0,0 +1,379 @@
+"""
+Helpers for receiving video uploads without holding them in memory
+(unless asked to, see ASL_INGEST below).
+
+Plain uploads are copied to disk in CHUNK_SIZE pieces. Large recordings can
+also use the resumable protocol (init / append / finalize) so a client on a
+flaky connection can continue from the last byte the server has.
+
+A progressive session is a resumable upload whose translation starts at init:
+a worker follows the .part file as chunks are appended, and finalizing (or
+cancelling) writes an end marker next to it instead of renaming the file.
+
+Plain uploads are read straight from the request body by StreamedUpload,
+not through UploadFile, whose parser spools parts over 1 MB to a temporary
+file before the handler runs. With ASL_INGEST=memory, uploads up to
+MEMORY_MAX_BYTES are kept as bytes and decoded from memory, never touching
+disk; larger ones spill to SPOOL_DIR (point it at a directory on tmpfs, such
+as /dev/shm/asl-uploads, to skip the disk there too). Files left behind by crashed or cancelled jobs are
+removed by sweep_orphans().
+"""
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import aiofiles
+from typing import Optional, Union
+from datetime import datetime
+from fastapi import HTTPException, Request, UploadFile
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_DIR = "uploads"
+
+# "disk": every upload is written to UPLOAD_DIR; "memory": see above
+INGEST_MODE = os.environ.get("ASL_INGEST", "disk")
+# Largest upload kept in memory, and where bigger ones spill to
+MEMORY_MAX_BYTES = int(os.environ.get("ASL_MEMORY_MAX_BYTES", 64 * 1024 * 1024))
+# Defaults to UPLOAD_DIR; both are looked up when used, see spool_dir()
+SPOOL_DIR = os.environ.get("ASL_SPOOL_DIR")
+
+# Files untouched for this many seconds, and not owned by a live job, upload
+# or batch, are deleted by the sweeper every SWEEP_INTERVAL seconds. With
+# several API processes and the in-memory store, keep it above the longest job.
+ORPHAN_MAX_AGE = float(os.environ.get("ASL_ORPHAN_MAX_AGE", 3600))
+SWEEP_INTERVAL = float(os.environ.get("ASL_SWEEP_INTERVAL", 600))
+
+# Size of each piece read from the client and written to disk
+CHUNK_SIZE = int(os.environ.get("ASL_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# Largest video we accept, in bytes (default 500 MB)
+MAX_UPLOAD_BYTES = int(os.environ.get("ASL_MAX_UPLOAD_BYTES", 500 * 1024 * 1024))
+
+# Resumable upload sessions: upload_id -> session info
+upload_sessions = {}
+
+
+def too_large(limit=MAX_UPLOAD_BYTES):
+    return HTTPException(
+        status_code=413,
+        detail=f"Video exceeds the {limit} byte upload limit"
+    )
+
+
+def spool_dir() -> str:
+    return SPOOL_DIR or UPLOAD_DIR
+
+
+def upload_path(upload_id: str, filename: Optional[str], directory: Optional[str] = None) -> str:
+    """Build a path inside directory (UPLOAD_DIR by default), dropping any directories from filename"""
+    directory = directory or UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.basename(filename or "") or "video"
+    return os.path.join(directory, f"{upload_id}_{name}")
+
+
+class StreamedUpload:
+    """
+    One file field of a multipart/form-data request, parsed as the body
+    arrives. open() reads up to the field's headers; read() then returns its
+    data a body chunk at a time, and b"" at its end.
+    """
+
+    def __init__(self, request: Request, field: str = "file"):
+        self.request = request
+        self.field = field
+        self.filename = None
+        self.content_type = ""
+        self._body = None
+        self._parser = None
+        self._headers = {}
+        self._field = self._value = b""
+        self._current = None
+        self._data = []
+        self._found = False
+        self._done = False
+
+    async def open(self):
+        content_type, options = parse_options_header(self.request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in options:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+        self._body = self.request.stream().__aiter__()
+        self._parser = MultipartParser(options[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        while not self._found:
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail=f"Missing '{self.field}' file field")
+        return self
+
+    async def _feed(self) -> bool:
+        """Parse the next piece of the body; False once it has all been read"""
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+        return True
+
+    async def read(self, size: int = -1) -> bytes:
+        # size is ignored: each call returns at most one body chunk's worth
+        while not self._data and not self._done:
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail="Upload ended before the file did")
+        data = b"".join(self._data)
+        self._data = []
+        return data
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._current = None
+        if not self._found and options.get(b"name", b"").decode() == self.field and b"filename" in options:
+            self._current = self.field
+            self._found = True
+            self.filename = options[b"filename"].decode(errors="replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode()
+
+    def _on_part_data(self, data, start, end):
+        if self._current is not None:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._current is not None:
+            self._current = None
+            self._done = True
+
+
+async def save_upload_stream(file: Union[UploadFile, StreamedUpload], file_path: str, limit: int = MAX_UPLOAD_BYTES,
+                             head: bytes = b"", digest=None):
+    """
+    Copy an UploadFile or StreamedUpload to file_path in bounded chunks, hashing it on the way.
+    head is data already read from file and hashed into digest.
+    Returns (bytes written, sha256 hex digest); removes the partial file on failure.
+    """
+    written = len(head)
+    digest = digest or hashlib.sha256()
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            if head:
+                await f.write(head)
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise too_large(limit)
+                digest.update(chunk)
+                await f.write(chunk)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return written, digest.hexdigest()
+
+
+async def receive_upload(file: Union[UploadFile, StreamedUpload], spill_path: str, limit: int = MAX_UPLOAD_BYTES,
+                         memory_limit: int = MEMORY_MAX_BYTES):
+    """
+    Read an UploadFile or StreamedUpload into memory, spilling to spill_path once it grows past
+    memory_limit. Returns (video, bytes read, sha256 hex digest), where video
+    is the bytes or spill_path.
+    """
+    buffer = bytearray()
+    digest = hashlib.sha256()
+    while len(buffer) <= memory_limit:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            return bytes(buffer), len(buffer), digest.hexdigest()
+        if len(buffer) + len(chunk) > limit:
+            raise too_large(limit)
+        digest.update(chunk)
+        buffer += chunk
+
+    written, video_hash = await save_upload_stream(file, spill_path, limit, head=bytes(buffer), digest=digest)
+    return spill_path, written, video_hash
+
+
+def discard_video(video):
+    """Delete a video's file once its job is over; in-memory videos need nothing"""
+    if isinstance(video, str) and os.path.exists(video):
+        os.remove(video)
+
+
+def init_session(filename: str, content_type: str, total_size: Optional[int]) -> dict:
+    """Start a resumable upload and reserve its .part file on disk"""
+    if total_size is not None and total_size > MAX_UPLOAD_BYTES:
+        raise too_large()
+
+    upload_id = str(uuid.uuid4())
+    part_path = upload_path(upload_id, filename) + ".part"
+    open(part_path, 'wb').close()
+
+    session = {
+        "upload_id": upload_id,
+        "filename": filename,
+        "content_type": content_type,
+        "total_size": total_size,
+        "part_path": part_path,
+        "created_at": datetime.now(),
+        # Held while a chunk is checked and written, so a retry racing the
+        # original request sees the offset it left behind
+        "lock": asyncio.Lock(),
+    }
+    upload_sessions[upload_id] = session
+    return session
+
+
+def get_session(upload_id: str) -> dict:
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+def session_offset(session: dict) -> int:
+    """Bytes received so far; the file on disk is the source of truth"""
+    return os.path.getsize(session["part_path"])
+
+
+async def append_chunk(session: dict, request: Request, offset: int) -> int:
+    """
+    Append the request body to a session's .part file.
+    The client must send the offset it believes the server is at, so a retried
+    chunk that already landed is rejected instead of written twice.
+    Returns the new offset.
+    """
+    async with session["lock"]:
+        current = session_offset(session)
+        if offset != current:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Offset mismatch", "offset": current}
+            )
+
+        limit = session["total_size"] or MAX_UPLOAD_BYTES
+        written = current
+        async with aiofiles.open(session["part_path"], 'ab') as f:
+            async for chunk in request.stream():
+                written += len(chunk)
+                if written > limit:
+                    # Drop whatever this request added and keep the earlier chunks
+                    await f.truncate(current)
+                    raise too_large(limit)
+                await f.write(chunk)
+        return written
+
+
+def check_complete(session: dict):
+    received = session_offset(session)
+    if session["total_size"] is not None and received != session["total_size"]:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Upload incomplete", "offset": received}
+        )
+    if received == 0:
+        raise HTTPException(status_code=400, detail="Upload is empty")
+
+
+def finalize_session(session: dict) -> str:
+    """Close a session and move its data to the final upload path"""
+    check_complete(session)
+
+    file_path = session["part_path"][:-len(".part")]
+    os.replace(session["part_path"], file_path)
+    del upload_sessions[session["upload_id"]]
+    return file_path
+
+
+def discard_session(session: dict):
+    if os.path.exists(session["part_path"]):
+        os.remove(session["part_path"])
+    upload_sessions.pop(session["upload_id"], None)
+
+
+def end_marker(session: dict) -> str:
+    return session["part_path"] + ".end"
+
+
+def end_progressive(session: dict, reason: str = "done"):
+    """Tell the worker following a progressive upload that no more data is coming"""
+    if reason == "done":
+        check_complete(session)
+    with open(end_marker(session), "w") as f:
+        f.write(reason)
+    upload_sessions.pop(session["upload_id"], None)
+
+
+def discard_progressive(session: dict):
+    """Clean up once the translation of a progressive upload has finished"""
+    upload_sessions.pop(session["upload_id"], None)
+    for path in (session["part_path"], end_marker(session)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _age(path) -> float:
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def sweep_orphans(in_use, max_age=ORPHAN_MAX_AGE) -> int:
+    """
+    Delete files in UPLOAD_DIR and SPOOL_DIR older than max_age whose owner
+    (the upload, translation or batch id before the first "_") in_use() says
+    is gone, and resumable sessions abandoned for as long. Returns files removed.
+    """
+    for session in list(upload_sessions.values()):
+        # Progressive sessions end on their own through the worker's idle timeout
+        if not session.get("progressive") and _age(session["part_path"]) > max_age:
+            discard_session(session)
+
+    removed = 0
+    for directory in dict.fromkeys((UPLOAD_DIR, spool_dir())):
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path) or _age(path) <= max_age:
+                continue
+            owner = name.split("_", 1)[0]
+            try:
+                uuid.UUID(owner)
+            except ValueError:
+                # Not one of ours
+                continue
+            if in_use(owner):
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,282 @@
+"""
+Long-lived pool of worker processes for landmark extraction.
+
+Each job gets a fresh MediaPipe Holistic instance: Holistic tracks landmarks
+from frame to frame, and the last frames of one video must not seed the first
+frames of the next. The instance for a worker's next job is built and warmed
+up when the process starts and after each job, so jobs don't wait for graph
+setup. Prediction happens in the
+API process (see batching.py) so windows from different videos can share a
+batch. Jobs are admitted through a bounded queue so the API can turn work
+away instead of piling it up.
+
+A worker that dies (a MediaPipe crash on a bad video, say) breaks the whole
+ProcessPoolExecutor. The jobs it was running fail, and the pool is rebuilt
+with a fresh results queue and warmed-up workers. Until that is done,
+`restarting` is set so the API reports not ready, and new jobs wait.
+"""
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pipeline
+import metrics
+from recognition import WINDOW_SIZE
+from my_functions import create_holistic
+
+DATA_PATH = os.path.join('data')
+
+# Number of worker processes and how many jobs may wait for one
+WORKER_COUNT = int(os.environ.get("ASL_WORKERS", os.cpu_count() or 1))
+QUEUE_SIZE = int(os.environ.get("ASL_QUEUE_SIZE", WORKER_COUNT * 2))
+
+# Seconds a client is told to wait when the queue is full
+RETRY_AFTER = int(os.environ.get("ASL_RETRY_AFTER", 5))
+
+# Keypoint chunks allowed in flight from workers to the API process
+RESULTS_QUEUE_SIZE = int(os.environ.get("ASL_RESULTS_QUEUE_SIZE", 256))
+
+# Per-process state, filled in by init_worker
+spare_holistic = None
+results_queue = None
+
+
+def new_holistic():
+    """A Holistic instance warmed up with a blank frame, which leaves nothing to track"""
+    holistic = create_holistic()
+    holistic.process(np.zeros((480, 640, 3), dtype=np.uint8))
+    return holistic
+
+
+def init_worker(queue):
+    """Runs once in every worker process before it accepts jobs"""
+    global spare_holistic, results_queue
+
+    results_queue = queue
+    spare_holistic = new_holistic()
+    print(f"Worker {os.getpid()} ready")
+
+
+def stream_video(job_id, video_path, first_frame=0, frame_count=None, warmup=0, end_marker=None):
+    """
+    Landmark a video (or the segment of frame_count frames from first_frame,
+    or a progressive upload until end_marker appears) inside a worker
+    process, streaming keypoint chunks back to the API as
+    ("keypoints", chunk) messages followed by ("done", error).
+    video_path may also be the video's bytes, for uploads kept in memory.
+    A ("started", None) message comes first so the API can time queue wait,
+    and ("stats", stream_keypoints' counts and stage timings) precedes
+    "done" on success.
+    """
+    global spare_holistic
+
+    def emit(chunk):
+        results_queue.put((job_id, "keypoints", chunk))
+
+    results_queue.put((job_id, "started", None))
+    error = None
+    holistic = None
+    try:
+        holistic = spare_holistic or new_holistic()
+        spare_holistic = None
+        stats = pipeline.stream_keypoints(video_path, holistic, emit, WINDOW_SIZE,
+                                          first_frame=first_frame, frame_count=frame_count, warmup=warmup,
+                                          end_marker=end_marker)
+        results_queue.put((job_id, "stats", stats))
+    except Exception as e:
+        error = str(e)
+    finally:
+        results_queue.put((job_id, "done", error))
+        if holistic is not None:
+            holistic.close()
+        # Build the next job's instance now that this job's results are out
+        try:
+            spare_holistic = new_holistic()
+        except Exception as e:
+            print(f"Worker {os.getpid()} could not prepare Holistic: {e}")
+
+
+def _ping():
+    return os.getpid()
+
+
+class PoolFullError(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+    def __init__(self, retry_after=RETRY_AFTER):
+        super().__init__("Translation queue is full")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    Wraps a ProcessPoolExecutor with admission control.
+
+    A job holds a slot from reserve() until it finishes; at most
+    workers + queue_size jobs can hold one at a time.
+    """
+
+    def __init__(self, workers=WORKER_COUNT, queue_size=QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        # MediaPipe and TensorFlow do not survive fork(), so workers are spawned fresh
+        self.context = multiprocessing.get_context("spawn")
+        self.pending = 0
+        self.executor = None
+        self.results = None
+        self.streams = {}
+        self._loop = None
+        self._dispatcher = None
+        self._warming = []
+        # Cleared while a broken executor is being replaced
+        self._healthy = asyncio.Event()
+        self._restarter = None
+        self.restarts = 0
+
+    @property
+    def restarting(self):
+        return self._restarter is not None
+
+    def _new_executor(self, results):
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self.context,
+            initializer=init_worker,
+            initargs=(results,)
+        )
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.results = self.context.Queue(maxsize=RESULTS_QUEUE_SIZE)
+        self.executor = self._new_executor(self.results)
+        self._dispatcher = threading.Thread(target=self._dispatch, args=(self.results,),
+                                            name="pool-dispatch", daemon=True)
+        self._dispatcher.start()
+        # Processes are created on demand; touch each one so Holistic loads now
+        self._warming = [self.executor.submit(_ping) for _ in range(self.workers)]
+        self._healthy.set()
+
+    def _broken(self, executor):
+        """Replace executor, once, after one of its processes died"""
+        if executor is not self.executor or self.restarting:
+            return
+        self._healthy.clear()
+        self.restarts += 1
+        self._restarter = self._loop.create_task(self._restart())
+
+    async def _restart(self):
+        print("A worker process died; restarting the worker pool")
+        # A worker killed mid-put can leave the old results queue locked, so
+        # it is abandoned along with its dispatcher rather than reused
+        self._stop(join_timeout=1)
+        while True:
+            try:
+                self.start()
+                await self.wait_ready()
+                break
+            except Exception as e:
+                print(f"Worker pool restart failed ({e}), retrying in {RETRY_AFTER}s")
+                self._stop(join_timeout=1)
+                await asyncio.sleep(RETRY_AFTER)
+        self._restarter = None
+        print("Worker pool restarted")
+
+    async def wait_ready(self):
+        """Wait until the workers started by start() have loaded and warmed up Holistic"""
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in self._warming))
+
+    def shutdown(self):
+        if self._restarter is not None:
+            self._restarter.cancel()
+            self._restarter = None
+        self._stop()
+
+    def _stop(self, join_timeout=None):
+        self._healthy.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self._dispatcher is not None:
+            self.results.cancel_join_thread()
+            self.results.put(None)
+            self._dispatcher.join(join_timeout)
+            self._dispatcher = None
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    def reserve(self):
+        """Claim a queue slot or raise PoolFullError"""
+        if self.pending >= self.capacity:
+            raise PoolFullError()
+        self.pending += 1
+
+    def release(self):
+        self.pending = max(0, self.pending - 1)
+
+    async def stream(self, fn, job_id, *args, stats=None, release=True):
+        """
+        Run fn(job_id, *args) in a worker and yield the chunks it streams back.
+        Raises if the worker reports an error; releases the job's slot at the
+        end unless release is False (one of several streams for the same job).
+        "stats" messages from the worker are merged into the `stats` dict if given.
+        """
+        messages = asyncio.Queue()
+        self.streams[job_id] = messages
+        submitted = time.perf_counter()
+        try:
+            await self._healthy.wait()
+            executor = self.executor
+            try:
+                future = self._loop.run_in_executor(executor, fn, job_id, *args)
+            except BrokenProcessPool:
+                self._broken(executor)
+                raise Exception("A worker process crashed; the worker pool is restarting")
+
+            # A crashed worker never sends "done", so surface its exception instead
+            def on_done(f):
+                if f.cancelled() or f.exception() is None:
+                    return
+                if isinstance(f.exception(), BrokenProcessPool):
+                    self._broken(executor)
+                    messages.put_nowait(("done", "A worker process crashed; the worker pool is restarting"))
+                else:
+                    messages.put_nowait(("done", str(f.exception())))
+            future.add_done_callback(on_done)
+
+            while True:
+                kind, payload = await messages.get()
+                if kind == "started":
+                    waited = time.perf_counter() - submitted
+                    metrics.QUEUE_WAIT_SECONDS.observe(waited)
+                    metrics.STAGE_SECONDS.observe(waited, "queue_wait")
+                    continue
+                if kind == "stats":
+                    if stats is not None:
+                        stats.update(payload)
+                    continue
+                if kind == "done":
+                    if payload:
+                        raise Exception(payload)
+                    break
+                yield payload
+        finally:
+            self.streams.pop(job_id, None)
+            if release:
+                self.release()
+
+    def _dispatch(self, results):
+        """Route messages from the shared results queue to each job's stream"""
+        while True:
+            message = results.get()
+            if message is None:
+                return
+            job_id, kind, payload = message
+            messages = self.streams.get(job_id)
+            if messages is not None:
+                self._loop.call_soon_threadsafe(messages.put_nowait, (kind, payload))
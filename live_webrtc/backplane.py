@@ -0,0 +1,284 @@
+"""
+Message backplane shared by every signaling worker.
+
+A backplane offers the few operations matchmaking and relay need:
+list push/pop/remove for the waiting queues, an atomic pop-or-push so two
+peers arriving at once can't both end up queued, and publish/subscribe for
+delivering frames to a peer that may be connected to another worker.
+
+    memory           - in-process; fine for a single uvicorn worker
+    redis://host:port - any server speaking the Redis protocol, including
+                        Redis itself or backplane_server.py
+
+Choose with SIGNALING_BACKPLANE (default "memory").
+"""
+import os
+import asyncio
+from collections import deque
+
+SIGNALING_BACKPLANE = os.environ.get("SIGNALING_BACKPLANE", "memory")
+
+# Seconds to wait for the server to confirm a subscription
+SUBSCRIBE_TIMEOUT = float(os.environ.get("BACKPLANE_SUBSCRIBE_TIMEOUT", 5))
+
+# Pause before reconnecting a lost subscription connection, doubling up to the max
+RECONNECT_DELAY = float(os.environ.get("BACKPLANE_RECONNECT_DELAY", 0.1))
+MAX_RECONNECT_DELAY = float(os.environ.get("BACKPLANE_MAX_RECONNECT_DELAY", 5))
+
+# Pop the oldest value other than ARGV[1], or push ARGV[1] if there is none,
+# as one step; Redis runs scripts atomically
+POP_OR_PUSH_SCRIPT = """
+local value = redis.call('RPOP', KEYS[1])
+while value == ARGV[1] do
+    value = redis.call('RPOP', KEYS[1])
+end
+if value then
+    return value
+end
+redis.call('LPUSH', KEYS[1], ARGV[1])
+return false
+"""
+
+
+class InProcessBackplane:
+    """Backplane for a single process; handlers are plain callables"""
+
+    def __init__(self):
+        self.lists = {}
+        self.handlers = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def lpush(self, key, value):
+        self.lists.setdefault(key, deque()).appendleft(value)
+
+    async def rpop(self, key):
+        items = self.lists.get(key)
+        if not items:
+            return None
+        value = items.pop()
+        if not items:
+            del self.lists[key]
+        return value
+
+    async def lrem(self, key, value):
+        items = self.lists.get(key)
+        if items and value in items:
+            items.remove(value)
+
+    async def pop_or_push(self, key, value):
+        """Pop the oldest value other than value, or push value and return None"""
+        while True:
+            other = await self.rpop(key)
+            if other != value:
+                break
+        if other is None:
+            await self.lpush(key, value)
+        return other
+
+    async def publish(self, channel, data: bytes) -> int:
+        """Deliver data to the channel's subscriber; returns how many received it"""
+        handler = self.handlers.get(channel)
+        if handler is None:
+            return 0
+        handler(data)
+        return 1
+
+    async def subscribe(self, channel, handler):
+        self.handlers[channel] = handler
+
+    async def unsubscribe(self, channel):
+        self.handlers.pop(channel, None)
+
+
+def encode_command(*args) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+class ReplyError(Exception):
+    pass
+
+
+async def read_reply(reader):
+    """Read one RESP reply; bulk strings come back as bytes"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Backplane connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise ReplyError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise ReplyError(f"Unexpected reply: {line!r}")
+
+
+class RedisBackplane:
+    """
+    Backplane over the Redis protocol. Commands share one connection behind a
+    lock, reopened by the next command if it drops. Subscriptions use a second
+    connection read by a background task, which reconnects with backoff and
+    subscribes again to every channel that still has a handler.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379):
+        self.host = host
+        self.port = port
+        self.handlers = {}
+        # channel -> future resolved when the server confirms SUBSCRIBE
+        self._confirmations = {}
+        self._lock = asyncio.Lock()
+        self._reader = self._writer = None
+        self._sub_writer = None
+        self._listener = None
+        self.reconnects = 0
+
+    async def start(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        sub_reader = await self._open_subscriptions()
+        self._listener = asyncio.create_task(self._listen(sub_reader))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        for writer in (self._writer, self._sub_writer):
+            if writer is not None:
+                writer.close()
+        self._writer = self._sub_writer = None
+
+    async def _command(self, *args):
+        async with self._lock:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                self._writer.write(encode_command(*args))
+                await self._writer.drain()
+                return await read_reply(self._reader)
+            except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                # Not retried: the command may already have run
+                self._writer.close()
+                self._reader = self._writer = None
+                raise
+
+    async def lpush(self, key, value):
+        await self._command("LPUSH", key, value)
+
+    async def rpop(self, key):
+        value = await self._command("RPOP", key)
+        return value.decode() if value is not None else None
+
+    async def lrem(self, key, value):
+        await self._command("LREM", key, 0, value)
+
+    async def pop_or_push(self, key, value):
+        """Pop the oldest value other than value, or push value and return None"""
+        other = await self._command("EVAL", POP_OR_PUSH_SCRIPT, 1, key, value)
+        return other.decode() if other is not None else None
+
+    async def publish(self, channel, data: bytes) -> int:
+        return await self._command("PUBLISH", channel, data)
+
+    async def subscribe(self, channel, handler):
+        """Return once the server has confirmed the subscription"""
+        self.handlers[channel] = handler
+        confirmed = self._confirmations.get(channel)
+        if confirmed is None or confirmed.done():
+            confirmed = asyncio.get_running_loop().create_future()
+            self._confirmations[channel] = confirmed
+        # While reconnecting, the listener subscribes once it's back
+        await self._send_subscription("SUBSCRIBE", channel)
+        try:
+            await asyncio.wait_for(asyncio.shield(confirmed), SUBSCRIBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.handlers.pop(channel, None)
+            self._confirmations.pop(channel, None)
+            raise ConnectionError(f"Backplane didn't confirm the subscription to {channel}")
+
+    async def unsubscribe(self, channel):
+        self.handlers.pop(channel, None)
+        self._confirmations.pop(channel, None)
+        await self._send_subscription("UNSUBSCRIBE", channel)
+
+    async def _send_subscription(self, *args):
+        if self._sub_writer is None:
+            return
+        try:
+            self._sub_writer.write(encode_command(*args))
+            await self._sub_writer.drain()
+        except (ConnectionError, OSError):
+            # The listener notices the broken connection and reconnects
+            pass
+
+    async def _open_subscriptions(self):
+        """Connect the subscription connection and subscribe to every channel"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self._sub_writer = writer
+        if self.handlers:
+            writer.write(encode_command("SUBSCRIBE", *self.handlers))
+            await writer.drain()
+        return reader
+
+    async def _listen(self, reader):
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                if reader is None:
+                    reader = await self._open_subscriptions()
+                    self.reconnects += 1
+                    print(f"Backplane subscriptions restored ({len(self.handlers)} channels)")
+                reply = await read_reply(reader)
+                delay = RECONNECT_DELAY
+                self._dispatch(reply)
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                print(f"Backplane subscriptions lost ({e}), reconnecting in {delay:.1f}s")
+                if self._sub_writer is not None:
+                    self._sub_writer.close()
+                    self._sub_writer = None
+                reader = None
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _dispatch(self, reply):
+        if not isinstance(reply, list) or len(reply) < 3:
+            return
+        kind, channel = reply[0], reply[1].decode()
+        if kind == b"message":
+            handler = self.handlers.get(channel)
+            if handler is not None:
+                handler(reply[2])
+        elif kind == b"subscribe":
+            confirmed = self._confirmations.pop(channel, None)
+            if confirmed is not None and not confirmed.done():
+                confirmed.set_result(None)
+
+
+def open_backplane(url=SIGNALING_BACKPLANE):
+    if url.startswith("redis://"):
+        host, _, port = url[len("redis://"):].rstrip("/").partition(":")
+        return RedisBackplane(host or "127.0.0.1", int(port or 6379))
+    return InProcessBackplane()
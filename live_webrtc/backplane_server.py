@@ -0,0 +1,124 @@
+"""
+Minimal Redis-protocol server for the signaling backplane.
+
+Implements just the commands backplane.RedisBackplane uses (PING, LPUSH,
+RPOP, LREM, PUBLISH, SUBSCRIBE, UNSUBSCRIBE, and EVAL of the backplane's own
+pop-or-push script, run natively), so several signaling workers on one host
+can share matchmaking without installing Redis:
+
+    python backplane_server.py --port 6379
+    SIGNALING_BACKPLANE=redis://127.0.0.1:6379 uvicorn main:app --workers 4
+"""
+import argparse
+import asyncio
+from collections import deque
+from backplane import encode_command, read_reply, ReplyError, POP_OR_PUSH_SCRIPT
+
+lists = {}
+# channel -> set of subscribed writers
+channels = {}
+
+
+def bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def integer(value):
+    return b":%d\r\n" % value
+
+
+def run_command(args, writer, subscribed):
+    name = args[0].upper().decode()
+    if name == "PING":
+        return b"+PONG\r\n"
+    if name == "LPUSH":
+        items = lists.setdefault(args[1], deque())
+        for value in args[2:]:
+            items.appendleft(value)
+        return integer(len(items))
+    if name == "RPOP":
+        items = lists.get(args[1])
+        if not items:
+            return bulk(None)
+        value = items.pop()
+        if not items:
+            del lists[args[1]]
+        return bulk(value)
+    if name == "LREM":
+        items = lists.get(args[1])
+        removed = 0
+        if items:
+            kept = deque(v for v in items if v != args[3])
+            removed = len(items) - len(kept)
+            lists[args[1]] = kept
+        return integer(removed)
+    if name == "EVAL":
+        if args[1].decode() != POP_OR_PUSH_SCRIPT or args[2] != b"1":
+            return b"-ERR only the backplane's pop-or-push script is supported\r\n"
+        key, value = args[3], args[4]
+        items = lists.get(key)
+        while items:
+            other = items.pop()
+            if other != value:
+                if not items:
+                    del lists[key]
+                return bulk(other)
+        lists.setdefault(key, deque()).appendleft(value)
+        return bulk(None)
+    if name == "PUBLISH":
+        subscribers = channels.get(args[1], ())
+        message = encode_command("message", args[1], args[2])
+        for subscriber in subscribers:
+            subscriber.write(message)
+        return integer(len(subscribers))
+    if name in ("SUBSCRIBE", "UNSUBSCRIBE"):
+        replies = []
+        for channel in args[1:]:
+            if name == "SUBSCRIBE":
+                channels.setdefault(channel, set()).add(writer)
+                subscribed.add(channel)
+            else:
+                channels.get(channel, set()).discard(writer)
+                subscribed.discard(channel)
+            replies.append(encode_command(name.lower(), channel, str(len(subscribed))))
+        return b"".join(replies)
+    return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+
+async def handle_client(reader, writer):
+    subscribed = set()
+    try:
+        while True:
+            args = await read_reply(reader)
+            if not isinstance(args, list) or not args:
+                writer.write(b"-ERR expected a command array\r\n")
+                continue
+            writer.write(run_command(args, writer, subscribed))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ReplyError):
+        pass
+    finally:
+        for channel in subscribed:
+            subscribers = channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(writer)
+                if not subscribers:
+                    del channels[channel]
+        writer.close()
+
+
+async def main(host, port):
+    server = await asyncio.start_server(handle_client, host, port)
+    print(f"Backplane listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    options = parser.parse_args()
+    asyncio.run(main(options.host, options.port))
@@ -0,0 +1,250 @@
+"""
+Load test for the /ws signaling endpoint.
+
+Opens N simulated peers, lets the server pair them, then plays the traffic
+static/client.js produces: the caller sends an offer, the callee answers, and
+both trickle ICE candidates. Every relayed message carries its send time so
+the receiver can measure relay latency.
+
+    uvicorn main:app --port 8000 &
+    python bench_signaling.py --peers 1000 --ice 20 --output results.json \\
+        --server-pid $(pgrep -f "uvicorn main:app")
+
+Needs the `websockets` package.
+"""
+import os
+import json
+import time
+import random
+import string
+import asyncio
+import argparse
+import platform
+from datetime import datetime
+
+try:
+    import websockets
+except ImportError:
+    raise SystemExit("bench_signaling.py needs the websockets package: pip install websockets")
+
+
+def fake_sdp(kind):
+    """An SDP blob about the size of a browser's audio+video offer"""
+    lines = ["v=0", f"o=- {random.randint(10**17, 10**18)} 2 IN IP4 127.0.0.1", "s=-", "t=0 0",
+             "a=group:BUNDLE 0 1"]
+    for mid, media in enumerate(("audio", "video")):
+        lines += [
+            f"m={media} 9 UDP/TLS/RTP/SAVPF 111 96 97 98 99 100 101",
+            "c=IN IP4 0.0.0.0",
+            f"a=mid:{mid}",
+            "a=ice-ufrag:" + "".join(random.choices(string.ascii_letters, k=4)),
+            "a=ice-pwd:" + "".join(random.choices(string.ascii_letters, k=24)),
+            "a=fingerprint:sha-256 " + ":".join(f"{random.randint(0, 255):02X}" for _ in range(32)),
+            "a=setup:" + ("actpass" if kind == "offer" else "active"),
+        ]
+        lines += [f"a=rtpmap:{pt} codec{pt}/90000" for pt in range(96, 120)]
+    return {"type": kind, "sdp": "\r\n".join(lines) + "\r\n"}
+
+
+def fake_candidate(i):
+    port = random.randint(40000, 60000)
+    return {
+        "candidate": f"candidate:{random.randint(1, 2**32)} 1 udp 2122260223 192.168.1.{i % 250 + 2} {port} typ host generation 0",
+        "sdpMid": "0",
+        "sdpMLineIndex": 0,
+    }
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(values[-1], 3),
+    }
+
+
+def rss_kb(pid):
+    """Resident memory of a local process, from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class Stats:
+    def __init__(self):
+        self.pairing_ms = []
+        self.relay_ms = []
+        self.sent = 0
+        self.received = 0
+        self.errors = []
+
+
+async def run_peer(url, options, stats, paired_all, done_all):
+    """One simulated browser; plays caller if it was waiting, callee otherwise"""
+    connected_at = time.perf_counter()
+    expected = options.ice + 1  # candidates plus offer or answer
+    received = 0
+    role = None
+
+    async def send(ws, message):
+        message["sent_at"] = time.perf_counter()
+        await ws.send(json.dumps(message))
+        stats.sent += 1
+
+    async def trickle(ws):
+        for i in range(options.ice):
+            await send(ws, {"type": "ice", "candidate": fake_candidate(i)})
+            if options.ice_interval:
+                await asyncio.sleep(options.ice_interval)
+
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            async for raw in ws:
+                message = json.loads(raw)
+                kind = message.get("type")
+
+                if kind == "waiting":
+                    role = "caller"
+                elif kind == "paired":
+                    stats.pairing_ms.append((time.perf_counter() - connected_at) * 1000)
+                    paired_all.release()
+                    if role == "caller":
+                        await send(ws, {"type": "offer", "offer": fake_sdp("offer")})
+                        await trickle(ws)
+                elif kind in ("offer", "answer", "ice"):
+                    stats.relay_ms.append((time.perf_counter() - message["sent_at"]) * 1000)
+                    stats.received += 1
+                    received += 1
+                    if kind == "offer":
+                        await send(ws, {"type": "answer", "answer": fake_sdp("answer")})
+                        await trickle(ws)
+                elif kind == "peer-disconnected":
+                    break
+
+                if received >= expected:
+                    break
+
+            # Stay connected until every peer has finished so partners
+            # don't see peer-disconnected mid-run
+            done_all.release()
+            await done_all.wait_all()
+    except Exception as e:
+        stats.errors.append(repr(e))
+        done_all.release()
+
+
+class Countdown:
+    """Counts peers past a point; wait_all() returns once all have arrived"""
+
+    def __init__(self, total):
+        self.remaining = total
+        self.event = asyncio.Event()
+        if total <= 0:
+            self.event.set()
+
+    def release(self):
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.event.set()
+
+    async def wait_all(self):
+        await self.event.wait()
+
+
+async def run(options):
+    url = options.url.rstrip("/") + "/ws"
+    stats = Stats()
+    peers = options.peers - options.peers % 2
+    paired_all = Countdown(peers)
+    done_all = Countdown(peers)
+
+    rss_before = rss_kb(options.server_pid) if options.server_pid else None
+    started = time.perf_counter()
+
+    tasks = []
+    for i in range(peers):
+        tasks.append(asyncio.create_task(run_peer(url, options, stats, paired_all, done_all)))
+        # Open connections in bursts so the server sees a ramp, not one spike
+        if options.ramp and (i + 1) % options.ramp == 0:
+            await asyncio.sleep(0)
+
+    try:
+        await asyncio.wait_for(paired_all.wait_all(), timeout=options.timeout)
+    except asyncio.TimeoutError:
+        stats.errors.append(f"only {peers - paired_all.remaining} of {peers} peers paired")
+    paired_at = time.perf_counter()
+    rss_connected = rss_kb(options.server_pid) if options.server_pid else None
+
+    done, pending = await asyncio.wait(tasks, timeout=options.timeout)
+    for task in pending:
+        task.cancel()
+    elapsed = time.perf_counter() - started
+
+    memory = None
+    if rss_before is not None and rss_connected is not None:
+        memory = {
+            "server_rss_before_kb": rss_before,
+            "server_rss_connected_kb": rss_connected,
+            "per_connection_kb": round((rss_connected - rss_before) / max(1, peers), 2),
+        }
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "host": platform.node(),
+        "config": {
+            "url": url,
+            "peers": peers,
+            "ice_candidates": options.ice,
+            "ice_interval": options.ice_interval,
+        },
+        "pairs": len(stats.pairing_ms) // 2,
+        "pairing_time_s": round(paired_at - started, 3),
+        "pairing_latency_ms": percentiles(stats.pairing_ms),
+        "relay_latency_ms": percentiles(stats.relay_ms),
+        "messages_sent": stats.sent,
+        "messages_received": stats.received,
+        "messages_per_sec": round(stats.received / elapsed, 1) if elapsed else None,
+        "elapsed_s": round(elapsed, 3),
+        "memory": memory,
+        "errors": stats.errors[:20],
+        "error_count": len(stats.errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the signaling /ws endpoint")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--peers", type=int, default=100, help="simulated peers (rounded down to even)")
+    parser.add_argument("--ice", type=int, default=10, help="ICE candidates each peer trickles")
+    parser.add_argument("--ice-interval", type=float, default=0.0, help="seconds between candidates")
+    parser.add_argument("--ramp", type=int, default=50, help="connections opened per event loop turn")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each phase")
+    parser.add_argument("--server-pid", type=int, help="local server pid, to measure memory per connection")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    options = parser.parse_args()
+
+    results = asyncio.run(run(options))
+    text = json.dumps(results, indent=2)
+    print(text)
+    if options.output:
+        os.makedirs(os.path.dirname(os.path.abspath(options.output)), exist_ok=True)
+        with open(options.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
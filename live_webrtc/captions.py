@@ -0,0 +1,261 @@
+"""
+Server-side WebRTC peer that captions a signer's video.
+
+A client posts an SDP offer to /captions/offer with its camera track and a
+data channel negotiated as id 0. The server answers, receives the video and
+forwards frames as JPEGs to the translation API's /ws/translate. Each
+recognized sign comes back over the data channel as {"type": "caption", ...},
+and the corrected sentence as {"type": "final", ...} once the track ends or
+the client sends {"type": "end"}.
+
+Frames are never queued. The receive loop keeps only the newest one, and the
+sender takes it at most CAPTION_FPS times a second, skipping it if it is
+older than CAPTION_MAX_LAG, so captions stay close to real time on a slow host.
+
+Needs aiortc and Pillow. No STUN server is configured by default, which is
+enough for loopback and LAN peers; set CAPTION_STUN to add one.
+"""
+import os
+import io
+import json
+import time
+import asyncio
+
+TRANSLATOR_URL = os.environ.get("CAPTION_TRANSLATOR_URL", "ws://127.0.0.1:8000/ws/translate")
+
+# Frames per second sent for translation, and the oldest frame worth sending
+CAPTION_FPS = float(os.environ.get("CAPTION_FPS", 15))
+CAPTION_MAX_LAG = float(os.environ.get("CAPTION_MAX_LAG", 0.5))
+
+# Frames are shrunk to this width before JPEG encoding
+CAPTION_MAX_WIDTH = int(os.environ.get("CAPTION_MAX_WIDTH", 640))
+CAPTION_JPEG_QUALITY = int(os.environ.get("CAPTION_JPEG_QUALITY", 75))
+
+CAPTION_STUN = os.environ.get("CAPTION_STUN", "")
+MAX_CAPTION_PEERS = int(os.environ.get("MAX_CAPTION_PEERS", 8))
+
+# Seconds an error waits for the data channel to open, then to be flushed,
+# before the session is closed
+CHANNEL_TIMEOUT = float(os.environ.get("CAPTION_CHANNEL_TIMEOUT", 5))
+
+DATA_CHANNEL_ID = 0
+
+
+def encode_jpeg(frame, max_width=CAPTION_MAX_WIDTH, quality=CAPTION_JPEG_QUALITY) -> bytes:
+    """JPEG bytes for an av.VideoFrame, scaled down to max_width"""
+    if frame.width > max_width:
+        height = frame.height * max_width // frame.width // 2 * 2
+        frame = frame.reformat(width=max_width, height=height)
+    buffer = io.BytesIO()
+    frame.to_image().save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class RemoteTranslator:
+    """Client for the translation API's /ws/translate live endpoint"""
+
+    def __init__(self, url=TRANSLATOR_URL):
+        self.url = url
+        self.ws = None
+        self._reader = None
+        self._final = None
+
+    async def start(self, on_message):
+        import websockets
+
+        self.ws = await websockets.connect(self.url, max_size=None)
+        ready = json.loads(await self.ws.recv())
+        if ready.get("type") != "ready":
+            raise Exception(ready.get("error", "Translator refused the session"))
+        self._final = asyncio.get_running_loop().create_future()
+        self._reader = asyncio.create_task(self._read(on_message))
+
+    async def _read(self, on_message):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if message.get("type") == "final":
+                    self._final.set_result(message)
+                    return
+                on_message(message)
+        finally:
+            if not self._final.done():
+                self._final.set_result({"type": "final", "text": "", "error": "Translator disconnected"})
+
+    async def send_frame(self, data: bytes):
+        await self.ws.send(data)
+
+    async def finish(self) -> dict:
+        await self.ws.send(json.dumps({"type": "end"}))
+        return await self._final
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+
+
+class CaptionPeer:
+    def __init__(self, translator, on_close=None):
+        from aiortc import RTCPeerConnection, RTCConfiguration, RTCIceServer
+
+        servers = [RTCIceServer(urls=CAPTION_STUN)] if CAPTION_STUN else []
+        self.pc = RTCPeerConnection(RTCConfiguration(iceServers=servers))
+        self.channel = self.pc.createDataChannel("captions", negotiated=True, id=DATA_CHANNEL_ID)
+        self.translator = translator
+        self.on_close = on_close
+        self.tasks = []
+        self.closed = False
+
+        # Newest received frame not yet sent, as (frame, received_at)
+        self.latest = None
+        self.wake = asyncio.Event()
+        self.ended = False
+        self.last_sent_at = None
+
+        self.frames = 0
+        self.sent = 0
+        self.dropped = 0
+
+        self.pc.on("track", self._on_track)
+        self.pc.on("connectionstatechange", self._on_state)
+        self.channel.on("message", self._on_channel_message)
+
+    async def accept(self, sdp: str, kind: str):
+        """Apply the client's offer and return our answer (ICE gathered, no trickle)"""
+        from aiortc import RTCSessionDescription
+
+        await self.pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=kind))
+        await self.pc.setLocalDescription(await self.pc.createAnswer())
+        return self.pc.localDescription
+
+    def _on_track(self, track):
+        if track.kind != "video" or self.tasks:
+            # Audio, or a second camera: read and discard so it doesn't pile up
+            from aiortc.contrib.media import MediaBlackhole
+            blackhole = MediaBlackhole()
+            blackhole.addTrack(track)
+            self.tasks.append(asyncio.ensure_future(blackhole.start()))
+            return
+        self.tasks.append(asyncio.create_task(self._receive(track)))
+        self.tasks.append(asyncio.create_task(self._send()))
+
+    async def _on_state(self):
+        if self.pc.connectionState in ("failed", "closed"):
+            await self.close()
+
+    def _on_channel_message(self, message):
+        try:
+            control = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if isinstance(control, dict) and control.get("type") == "end":
+            self.ended = True
+            self.wake.set()
+
+    async def _receive(self, track):
+        """Read frames as fast as they arrive, keeping only the newest"""
+        from aiortc.mediastreams import MediaStreamError
+
+        try:
+            while not self.ended:
+                frame = await track.recv()
+                self.frames += 1
+                if self.latest is not None:
+                    self.dropped += 1
+                self.latest = (frame, time.monotonic())
+                self.wake.set()
+        except MediaStreamError:
+            pass
+        finally:
+            self.ended = True
+            self.wake.set()
+
+    async def _send(self):
+        """Forward the newest frame at most CAPTION_FPS times a second"""
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / CAPTION_FPS
+        next_at = 0.0
+        try:
+            await self.translator.start(self._on_translation)
+            # Check for a pending frame before waiting, so a last frame that
+            # arrives together with the end is sent and then the loop ends
+            while not (self.ended and self.latest is None):
+                if self.latest is None:
+                    await self.wake.wait()
+                    self.wake.clear()
+                    continue
+
+                delay = next_at - loop.time()
+                if delay > 0:
+                    # Frames arriving meanwhile replace this one
+                    await asyncio.sleep(delay)
+                frame, received_at = self.latest
+                self.latest = None
+                if time.monotonic() - received_at > CAPTION_MAX_LAG:
+                    self.dropped += 1
+                    continue
+
+                data = await loop.run_in_executor(None, encode_jpeg, frame)
+                await self.translator.send_frame(data)
+                self.sent += 1
+                self.last_sent_at = received_at
+                next_at = loop.time() + interval
+
+            final = await self.translator.finish()
+            self._emit({**final, "frames": self.frames, "sent": self.sent, "dropped": self.dropped})
+        except Exception as e:
+            await self._fail(str(e))
+        finally:
+            await self.translator.close()
+
+    async def _fail(self, error):
+        """Tell the client what went wrong, once it can hear it, and end the session"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CHANNEL_TIMEOUT
+        if self.channel.readyState == "connecting":
+            opened = asyncio.Event()
+            self.channel.once("open", opened.set)
+            try:
+                await asyncio.wait_for(opened.wait(), CHANNEL_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        self._emit({"type": "error", "error": error})
+        # Closing the connection drops anything still queued on the channel
+        while self.channel.readyState == "open" and self.channel.bufferedAmount and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        await self.close()
+
+    def _on_translation(self, message):
+        if message.get("type") == "sign":
+            lag = time.monotonic() - self.last_sent_at if self.last_sent_at else None
+            self._emit({
+                "type": "caption",
+                "sign": message["sign"],
+                "sentence": message["sentence"],
+                # From receiving the newest frame sent to having its sign
+                "lag_ms": round(lag * 1000, 1) if lag is not None else None,
+                "dropped": self.dropped,
+            })
+        elif message.get("type") == "error":
+            self._emit(message)
+
+    def _emit(self, message):
+        if self.channel.readyState == "open":
+            self.channel.send(json.dumps(message))
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for task in self.tasks:
+            if task is not asyncio.current_task():
+                task.cancel()
+        await self.pc.close()
+        if self.on_close is not None:
+            self.on_close(self)
+            self.on_close = None
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "sent": self.sent, "dropped": self.dropped}
@@ -0,0 +1,182 @@
+"""
+Loopback check for the caption peer in captions.py.
+
+A local aiortc peer plays a synthetic camera (a square moving across a
+640x480 frame) into a CaptionPeer, without STUN, and records what comes back
+over the captions data channel.
+
+    # whole path in this process; signs come from a stand-in translator
+    python loopback_captions.py --seconds 10
+
+    # real recognition through a running translation API
+    python loopback_captions.py --translator ws://127.0.0.1:8000/ws/translate
+
+    # through the /captions/offer endpoint of a running signaling server
+    python loopback_captions.py --server http://127.0.0.1:8001
+
+Prints frames sent, frames the server dropped and caption lag percentiles as
+JSON. Needs aiortc, numpy and Pillow.
+"""
+import json
+import time
+import asyncio
+import argparse
+import fractions
+import urllib.request
+
+import numpy as np
+from av import VideoFrame
+from aiortc import RTCPeerConnection, RTCConfiguration, RTCSessionDescription, VideoStreamTrack
+
+from captions import CaptionPeer, RemoteTranslator, DATA_CHANNEL_ID
+
+
+class MovingSquare(VideoStreamTrack):
+    """Synthetic camera at a fixed frame rate"""
+
+    def __init__(self, fps=30, width=640, height=480):
+        super().__init__()
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.started = None
+
+    async def recv(self):
+        if self.started is None:
+            self.started = time.monotonic()
+        # Pace in real time, as a camera would
+        delay = self.started + self.count / self.fps - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        image = np.zeros((self.height, self.width, 3), np.uint8)
+        x = (self.count * 8) % (self.width - 80)
+        image[200:280, x:x + 80] = 255
+        frame = VideoFrame.from_ndarray(image, format="bgr24")
+        frame.pts = self.count
+        frame.time_base = fractions.Fraction(1, self.fps)
+        self.count += 1
+        return frame
+
+
+class StandInTranslator:
+    """Emits a sign for every `every` frames it receives, like a quiet signer"""
+
+    def __init__(self, every=10):
+        self.every = every
+        self.received = 0
+        self.signs = []
+        self.on_message = None
+
+    async def start(self, on_message):
+        self.on_message = on_message
+
+    async def send_frame(self, data: bytes):
+        self.received += 1
+        if self.received % self.every == 0:
+            self.signs.append(f"sign{len(self.signs) + 1}")
+            self.on_message({"type": "sign", "sign": self.signs[-1], "sentence": " ".join(self.signs)})
+
+    async def finish(self) -> dict:
+        return {"type": "final", "text": " ".join(self.signs), "raw_text": " ".join(self.signs)}
+
+    async def close(self):
+        pass
+
+
+def post_offer(url, description):
+    request = urllib.request.Request(
+        url.rstrip("/") + "/captions/offer",
+        data=json.dumps({"sdp": description.sdp, "type": description.type}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        answer = json.loads(response.read())
+    return RTCSessionDescription(sdp=answer["sdp"], type=answer["type"])
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(options):
+    client = RTCPeerConnection(RTCConfiguration(iceServers=[]))
+    camera = MovingSquare(fps=options.fps)
+    client.addTrack(camera)
+    channel = client.createDataChannel("captions", negotiated=True, id=DATA_CHANNEL_ID)
+
+    captions, errors = [], []
+    final = asyncio.get_running_loop().create_future()
+
+    @channel.on("message")
+    def on_message(message):
+        message = json.loads(message)
+        if message["type"] == "caption":
+            captions.append(message)
+        elif message["type"] == "final" and not final.done():
+            final.set_result(message)
+        elif message["type"] == "error":
+            errors.append(message["error"])
+
+    await client.setLocalDescription(await client.createOffer())
+
+    server = None
+    if options.server:
+        answer = await asyncio.get_running_loop().run_in_executor(
+            None, post_offer, options.server, client.localDescription)
+    else:
+        translator = RemoteTranslator(options.translator) if options.translator else StandInTranslator()
+        server = CaptionPeer(translator)
+        answer = await server.accept(client.localDescription.sdp, client.localDescription.type)
+    await client.setRemoteDescription(answer)
+
+    await asyncio.sleep(options.seconds)
+    channel.send(json.dumps({"type": "end"}))
+    try:
+        result = await asyncio.wait_for(final, options.timeout)
+    except asyncio.TimeoutError:
+        result = {"error": "No final message"}
+
+    await client.close()
+    if server is not None:
+        await server.close()
+
+    lags = [c["lag_ms"] for c in captions if c.get("lag_ms") is not None]
+    report = {
+        "frames_sent": camera.count,
+        "frames_received": result.get("frames"),
+        "frames_translated": result.get("sent"),
+        "frames_dropped": result.get("dropped"),
+        "captions": len(captions),
+        "lag_ms": {"p50": percentile(lags, 0.5), "p95": percentile(lags, 0.95), "max": max(lags, default=None)},
+        "final": result,
+        "errors": errors,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caption a synthetic video over a local WebRTC connection")
+    parser.add_argument("--seconds", type=float, default=10, help="how long to stream")
+    parser.add_argument("--fps", type=int, default=30, help="synthetic camera frame rate")
+    parser.add_argument("--translator", help="ws:// URL of a translation API's /ws/translate")
+    parser.add_argument("--server", help="http:// URL of a signaling server with /captions/offer")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for the final message")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    options = parser.parse_args()
+
+    report = asyncio.run(run(options))
+    print(json.dumps(report, indent=2))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["errors"] or report["final"].get("error"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ const localVid = document.getElementById("local");
 const remoteVid = document.getElementById("remote");
 const startBtn = document.getElementById("startBtn");
 const answerBtn = document.getElementById("answerBtn");
+const captionsBox = document.getElementById("captions");
 
 const pcConfig = {
   iceServers: [
@@ -97,11 +98,57 @@ async function handleOffer(offer) {
   sendSignal({ type: "answer", answer: pc.localDescription });
 }
 
+// Server-side captions: a second connection sends our camera to the server,
+// which answers over a data channel negotiated as id 0 (see captions.py).
+// The server is reached directly, so no STUN is needed.
+let captionPc;
+
+async function startCaptions() {
+  if (!captionsBox || !localStream) return;
+  captionPc = new RTCPeerConnection();
+  const channel = captionPc.createDataChannel("captions", { negotiated: true, id: 0 });
+  channel.onmessage = (evt) => {
+    const msg = JSON.parse(evt.data);
+    if (msg.type === "caption") {
+      captionsBox.textContent = msg.sentence;
+    } else if (msg.type === "final") {
+      captionsBox.textContent = msg.text || captionsBox.textContent;
+    } else if (msg.type === "error") {
+      console.warn("Captions:", msg.error);
+    }
+  };
+  for (const t of localStream.getVideoTracks()) {
+    captionPc.addTrack(t, localStream);
+  }
+
+  await captionPc.setLocalDescription(await captionPc.createOffer());
+  // The server doesn't trickle ICE, so send the offer with every candidate
+  await new Promise((resolve) => {
+    if (captionPc.iceGatheringState === "complete") return resolve();
+    captionPc.onicegatheringstatechange = () => {
+      if (captionPc.iceGatheringState === "complete") resolve();
+    };
+  });
+
+  const response = await fetch("/captions/offer", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ sdp: captionPc.localDescription.sdp, type: captionPc.localDescription.type })
+  });
+  if (!response.ok) {
+    console.warn("Captions unavailable:", response.status);
+    captionPc.close();
+    return;
+  }
+  await captionPc.setRemoteDescription(await response.json());
+}
+
 // button handlers
 if (startBtn) {
   startBtn.onclick = async () => {
     await initMedia();
     connectWebSocket();
+    startCaptions();
     // Wait a bit for ws to pair, then create offer
     // you can also react to "paired" message
     setTimeout(() => doOffer(), 500);
@@ -112,6 +159,7 @@ if (answerBtn) {
   answerBtn.onclick = async () => {
     await initMedia();
     connectWebSocket();
+    startCaptions();
     // wait: onmessage will handle incoming offer and answer automatically
   };
 }
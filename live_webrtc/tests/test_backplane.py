@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import backplane
+import backplane_server
+from rooms import RoomRegistry, Peer
+
+
+async def start_server():
+    """A backplane_server on a free port; returns (server, port, client writers)"""
+    writers = []
+
+    async def handle(reader, writer):
+        writers.append(writer)
+        await backplane_server.handle_client(reader, writer)
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], writers
+
+
+async def wait_for(condition, timeout=2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_subscribe_returns_once_confirmed():
+    async def run():
+        server, port, _ = await start_server()
+        plane = backplane.RedisBackplane("127.0.0.1", port)
+        await plane.start()
+        received = []
+        await plane.subscribe("peer:a", received.append)
+        # No sleep needed: the server already has the subscription
+        assert await plane.publish("peer:a", b"hello") == 1
+        await wait_for(lambda: asyncio.sleep(0, received))
+        await plane.stop()
+        server.close()
+        return received
+
+    assert asyncio.run(run()) == [b"hello"]
+
+
+def test_listener_reconnects_and_resubscribes(monkeypatch):
+    monkeypatch.setattr(backplane, "RECONNECT_DELAY", 0.01)
+
+    async def run():
+        server, port, writers = await start_server()
+        plane = backplane.RedisBackplane("127.0.0.1", port)
+        await plane.start()
+        received = []
+        await plane.subscribe("peer:b", received.append)
+
+        # Drop every connection, as a backplane restart would
+        for writer in list(writers):
+            writer.close()
+
+        async def delivered():
+            try:
+                return await plane.publish("peer:b", b"again") == 1
+            except ConnectionError:
+                return False
+
+        await wait_for(delivered)
+        await wait_for(lambda: asyncio.sleep(0, b"again" in received))
+        await plane.stop()
+        server.close()
+        return plane.reconnects
+
+    assert asyncio.run(run()) >= 1
+
+
+def test_unconfirmed_subscribe_fails(monkeypatch):
+    monkeypatch.setattr(backplane, "SUBSCRIBE_TIMEOUT", 0.05)
+
+    async def silent(reader, writer):
+        # Accepts commands, never answers
+        await reader.read()
+
+    async def run():
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        plane = backplane.RedisBackplane("127.0.0.1", server.sockets[0].getsockname()[1])
+        await plane.start()
+        with pytest.raises(ConnectionError, match="peer:c"):
+            await plane.subscribe("peer:c", print)
+        assert "peer:c" not in plane.handlers
+        await plane.stop()
+        server.close()
+
+    asyncio.run(run())
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def test_simultaneous_joins_on_two_workers_pair():
+    async def run():
+        server, port, _ = await start_server()
+        planes = [backplane.RedisBackplane("127.0.0.1", port) for _ in range(2)]
+        for plane in planes:
+            await plane.start()
+        workers = [RoomRegistry(plane) for plane in planes]
+
+        for trial in range(20):
+            a, b = Peer(FakeSocket()), Peer(FakeSocket())
+            await asyncio.gather(workers[0].join(a, f"r{trial}"), workers[1].join(b, f"r{trial}"))
+            # One of them claimed the other; the waiting one hears it on its channel
+            waiting = a if a.partner is None else b
+            assert waiting.ws.sent == [{"type": "waiting"}]
+            claimer = b if waiting is a else a
+            assert claimer.partner == waiting.id
+            await wait_for(lambda: asyncio.sleep(0, not waiting.inbox.empty()))
+            assert f"room:r{trial}".encode() not in backplane_server.lists
+
+        for plane in planes:
+            await plane.stop()
+        server.close()
+
+    asyncio.run(run())
@@ -0,0 +1,83 @@
+import sys
+import json
+import time
+import types
+import asyncio
+
+import pytest
+
+
+class FakeChannel:
+    readyState = "open"
+    bufferedAmount = 0
+
+    def __init__(self):
+        self.sent = []
+
+    def on(self, event, handler):
+        pass
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+
+class FakePeerConnection:
+    def __init__(self, configuration):
+        self.channel = FakeChannel()
+
+    def createDataChannel(self, label, negotiated, id):
+        return self.channel
+
+    def on(self, event, handler):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def captions(monkeypatch):
+    aiortc = types.ModuleType("aiortc")
+    aiortc.RTCPeerConnection = FakePeerConnection
+    aiortc.RTCConfiguration = lambda iceServers: None
+    aiortc.RTCIceServer = lambda urls: None
+    monkeypatch.setitem(sys.modules, "aiortc", aiortc)
+    import captions
+    monkeypatch.setattr(captions, "encode_jpeg", lambda frame: b"jpeg")
+    return captions
+
+
+class RecordingTranslator:
+    def __init__(self):
+        self.frames = []
+
+    async def start(self, on_message):
+        pass
+
+    async def send_frame(self, data):
+        self.frames.append(data)
+
+    async def finish(self):
+        return {"type": "final", "text": "hello"}
+
+    async def close(self):
+        pass
+
+
+def test_end_with_a_frame_pending_still_sends_final(captions):
+    async def run():
+        translator = RecordingTranslator()
+        peer = captions.CaptionPeer(translator)
+        sender = asyncio.create_task(peer._send())
+        await asyncio.sleep(0.01)
+
+        # What _receive does for a last frame and the end in one step
+        peer.latest = ("frame", time.monotonic())
+        peer.ended = True
+        peer.wake.set()
+        await asyncio.wait_for(sender, 1)
+        return translator, peer
+
+    translator, peer = asyncio.run(run())
+    assert translator.frames == [b"jpeg"]
+    assert peer.channel.sent == [{"type": "final", "text": "hello", "frames": 0, "sent": 1, "dropped": 0}]
@@ -0,0 +1,111 @@
+import asyncio
+
+from backplane import InProcessBackplane
+from rooms import RoomRegistry, Peer
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def connect():
+    return Peer(FakeSocket())
+
+
+async def deliver_pending(registry, *peers):
+    """Run each peer's delivery loop until its inbox is empty"""
+    for peer in peers:
+        task = asyncio.create_task(registry.deliver(peer))
+        while not peer.inbox.empty():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        task.cancel()
+
+
+def test_second_peer_pairs_with_the_waiting_one():
+    async def run():
+        registry = RoomRegistry(InProcessBackplane())
+        a, b = connect(), connect()
+        await registry.join(a)
+        assert a.ws.sent == [{"type": "waiting"}]
+        await registry.join(b)
+        await deliver_pending(registry, a)
+        return registry, a, b
+
+    registry, a, b = asyncio.run(run())
+    assert b.ws.sent == [{"type": "paired", "peer": a.id}]
+    assert a.ws.sent[-1] == {"type": "paired", "peer": b.id}
+    assert (a.partner, b.partner) == (b.id, a.id)
+    assert registry.stats() == {"connected": 2, "paired": 2, "pairs_formed": 1}
+
+
+def test_rooms_and_lobbies_are_separate():
+    async def run():
+        registry = RoomRegistry(InProcessBackplane())
+        lobby, room, other_lobby = connect(), connect(), connect()
+        await registry.join(lobby)
+        await registry.join(room, room_id="r1")
+        await registry.join(other_lobby, lobby="other")
+        return [p.partner for p in (lobby, room, other_lobby)]
+
+    assert asyncio.run(run()) == [None, None, None]
+
+
+def test_peer_that_left_the_queue_is_not_matched():
+    async def run():
+        plane = InProcessBackplane()
+        registry = RoomRegistry(plane)
+        gone, stale, b = connect(), connect(), connect()
+        await registry.join(gone)
+        await registry.leave(gone)
+        # Queued on another worker that died: still listed, nobody subscribed
+        await plane.lpush("lobby:default", stale.id)
+        await registry.join(b)
+        return plane, b
+
+    plane, b = asyncio.run(run())
+    assert b.partner is None
+    assert b.ws.sent == [{"type": "waiting"}]
+    assert list(plane.lists["lobby:default"]) == [b.id]
+
+
+def test_early_messages_are_flushed_once_paired():
+    async def run():
+        registry = RoomRegistry(InProcessBackplane())
+        a, b = connect(), connect()
+        await registry.join(a, room_id="r1")
+        await registry.relay(a, {"text": "offer"})
+        await registry.join(b, room_id="r1")
+        await deliver_pending(registry, a, b)
+        return b
+
+    b = asyncio.run(run())
+    assert b.ws.sent == [{"type": "paired", "peer": b.partner}, "offer"]
+
+
+def test_partner_leaving_requeues_the_other_peer():
+    async def run():
+        plane = InProcessBackplane()
+        registry = RoomRegistry(plane)
+        a, b = connect(), connect()
+        await registry.join(a)
+        await registry.join(b)
+        await deliver_pending(registry, a)
+        await registry.leave(b)
+        await deliver_pending(registry, a)
+        return plane, a
+
+    plane, a = asyncio.run(run())
+    assert a.partner is None
+    assert a.ws.sent[-2:] == [{"type": "peer-disconnected"}, {"type": "waiting"}]
+    assert list(plane.lists["lobby:default"]) == [a.id]
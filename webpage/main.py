@@ -1,60 +1,70 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 import asyncio
-import uuid
+from rooms import RoomRegistry, Peer
+from backplane import open_backplane
 
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Very simple in-memory room pairing: one waiting peer is stored.
-WAITING = None
+# Matchmaking queues and relay go through the backplane, so peers on
+# different workers or hosts can be paired (SIGNALING_BACKPLANE)
+backplane = open_backplane()
+registry = RoomRegistry(backplane)
 
-# Signaling endpoint
+@app.on_event("startup")
+async def start_backplane():
+    await backplane.start()
+
+@app.on_event("shutdown")
+async def stop_backplane():
+    await backplane.stop()
+
+@app.get("/stats")
+async def stats():
+    return registry.stats()
+
+# Signaling endpoints: /ws pairs with whoever is waiting, /ws/{room_id}
+# joins a specific room
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
+    await signal(ws, None)
+
+@app.websocket("/ws/{room_id}")
+async def room_endpoint(ws: WebSocket, room_id: str):
+    await signal(ws, room_id)
+
+async def signal(ws: WebSocket, room_id):
     await ws.accept()
-    peer_id = str(uuid.uuid4())
-    print("Peer connected:", peer_id)
+    peer = Peer(ws)
+    print("Peer connected:", peer.id)
+
+    async def receive():
+        # Relay frames to the partner as they arrive, without parsing them
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            await registry.relay(peer, message)
 
-    global WAITING
+    sender = None
     try:
-        # If no peer waiting, put this one as waiting and hold
-        if WAITING is None:
-            WAITING = {"ws": ws, "id": peer_id}
-            await ws.send_json({"type": "waiting"})
-            # Wait until disconnected (or second peer pairs)
-            while True:
-                msg = await ws.receive_text()  # keep connection open
-        else:
-            # pair with waiting peer
-            peer = WAITING
-            WAITING = None
-            # notify both peers of pairing
-            await peer["ws"].send_json({"type": "paired", "peer": peer_id})
-            await ws.send_json({"type": "paired", "peer": peer["id"]})
-
-            # now forward messages between ws and peer["ws"]
-            async def forward(src: WebSocket, dst: WebSocket):
-                try:
-                    while True:
-                        data = await src.receive_json()
-                        await dst.send_json(data)
-                except WebSocketDisconnect:
-                    await dst.send_json({"type": "peer-disconnected"})
-                except Exception:
-                    pass
-
-            # run both forwards concurrently
-            await asyncio.gather(
-                forward(ws, peer["ws"]),
-                forward(peer["ws"], ws),
-            )
+        await registry.join(peer, room_id)
+        sender = asyncio.create_task(registry.deliver(peer))
+        receiver = asyncio.create_task(receive())
+        # Either side ending (client gone, send failed) ends the connection
+        done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                print("WS error:", task.exception())
     except WebSocketDisconnect:
-        print("Peer disconnected:", peer_id)
-        # If they were the waiting one, clear it
-        if WAITING and WAITING.get("id") == peer_id:
-            WAITING = None
+        pass
     except Exception as e:
         print("WS error:", e)
-        if WAITING and WAITING.get("id") == peer_id:
-            WAITING = None
\ No newline at end of file
+    finally:
+        if sender is not None:
+            sender.cancel()
+        print("Peer disconnected:", peer.id)
+        await registry.leave(peer)
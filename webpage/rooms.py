@@ -0,0 +1,131 @@
+"""
+Rooms and matchmaking for the signaling server, on top of a backplane.
+
+Every connected peer subscribes to its own channel, peer:<id>. Pairing pops a
+waiting peer id from a shared list (one per lobby or named room), or queues
+the peer if nobody is waiting, in one atomic step, so peers connected to
+different workers or hosts can still meet. Once paired, frames
+go to the partner's channel behind a one-byte tag and are never parsed.
+"""
+import json
+import uuid
+import asyncio
+from collections import deque
+
+# Messages held for a peer that has no partner yet (e.g. an early offer)
+MAX_BUFFERED = 32
+
+TEXT, BINARY, CONTROL = b"T", b"B", b"C"
+
+
+def channel(peer_id):
+    return f"peer:{peer_id}"
+
+
+def control(kind, peer_id) -> bytes:
+    return CONTROL + json.dumps({"type": kind, "peer": peer_id}).encode()
+
+
+def encode(message) -> bytes:
+    """Tag a received ASGI websocket message for the backplane"""
+    if message.get("bytes") is not None:
+        return BINARY + message["bytes"]
+    return TEXT + message["text"].encode()
+
+
+class Peer:
+    def __init__(self, ws):
+        self.id = str(uuid.uuid4())
+        self.ws = ws
+        self.partner = None
+        self.queue_key = None
+        # Frames and control messages from the backplane, sent in order
+        self.inbox = asyncio.Queue()
+        self.buffered = deque(maxlen=MAX_BUFFERED)
+
+
+class RoomRegistry:
+    def __init__(self, backplane):
+        self.backplane = backplane
+        self.peers = {}
+        self.pairs_formed = 0
+
+    async def join(self, peer, room_id=None, lobby="default"):
+        """Register a peer and pair it, or queue it in its room or lobby"""
+        peer.queue_key = f"room:{room_id}" if room_id else f"lobby:{lobby}"
+        self.peers[peer.id] = peer
+        await self.backplane.subscribe(channel(peer.id), peer.inbox.put_nowait)
+        await self.match(peer)
+
+    async def match(self, peer):
+        """Claim a waiting peer or join the queue; returns the partner id or None"""
+        while True:
+            other = await self.backplane.pop_or_push(peer.queue_key, peer.id)
+            if other is None:
+                await peer.ws.send_json({"type": "waiting"})
+                return None
+            # Nobody received it: that peer left while queued, try the next
+            if await self.backplane.publish(channel(other), control("paired", peer.id)):
+                peer.partner = other
+                self.pairs_formed += 1
+                await peer.ws.send_json({"type": "paired", "peer": other})
+                await self._flush(peer)
+                return other
+
+    async def relay(self, peer, message):
+        """Forward a frame from this peer's socket to its partner"""
+        if peer.partner is None:
+            peer.buffered.append(message)
+            return
+        await self.backplane.publish(channel(peer.partner), encode(message))
+
+    async def deliver(self, peer):
+        """Send everything arriving on the peer's channel to its socket"""
+        while True:
+            data = await peer.inbox.get()
+            tag, body = data[:1], data[1:]
+            if tag == TEXT:
+                await peer.ws.send_text(body.decode())
+            elif tag == BINARY:
+                await peer.ws.send_bytes(body)
+            else:
+                await self._on_control(peer, json.loads(body))
+
+    async def _on_control(self, peer, event):
+        if event["type"] == "paired":
+            peer.partner = event["peer"]
+            await peer.ws.send_json({"type": "paired", "peer": peer.partner})
+            await self._flush(peer)
+        elif event["type"] == "left" and event["peer"] == peer.partner:
+            peer.partner = None
+            await peer.ws.send_json({"type": "peer-disconnected"})
+            # Wait for a new partner in the same room or lobby
+            await self.match(peer)
+
+    async def _flush(self, peer):
+        while peer.buffered and peer.partner is not None:
+            await self.relay(peer, peer.buffered.popleft())
+
+    async def leave(self, peer):
+        self.peers.pop(peer.id, None)
+        await self.backplane.unsubscribe(channel(peer.id))
+
+        # A pairing may have landed after the socket closed
+        while not peer.inbox.empty():
+            data = peer.inbox.get_nowait()
+            if data[:1] == CONTROL:
+                event = json.loads(data[1:])
+                if event["type"] == "paired":
+                    peer.partner = event["peer"]
+
+        if peer.partner is not None:
+            await self.backplane.publish(channel(peer.partner), control("left", peer.id))
+        else:
+            await self.backplane.lrem(peer.queue_key, peer.id)
+
+    def stats(self):
+        return {
+            "connected": len(self.peers),
+            "paired": sum(1 for p in self.peers.values() if p.partner is not None),
+            "pairs_formed": self.pairs_formed,
+        }